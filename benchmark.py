@@ -0,0 +1,250 @@
+# Benchmark suite. Runs the same seeded scenarios headless at a few network sizes and writes everything it measured to
+# JSON, so a change to flooding or SPF can be checked against the last commit instead of guessed at.
+#
+#   python benchmark.py                                  everything, written to benchmark.json
+#   python benchmark.py --sizes 10 100 --output old.json
+#
+# Scenarios:
+#   cold   brand new network, every router starts from nothing
+#   cut    converged network, one random link gets blown up
+#   add    converged network, one random link gets created
+#   churn  converged network, a storm of random cuts and adds a couple of ticks apart
+#   storm  converged network, a correlated failure: a batch of routers crash at once and come back later (STORM, a
+#          scenario.py script)
+#
+# --areas N splits every network into N OSPF areas, so per router LSDB sizes (meanLSDB, maxLSDB) can be compared.
+# --profile DIR also writes each scenario's per tick time series (see profiler.py) to DIR/<scenario>-<routers>.csv.
+#
+# Every scenario runs in its own process so peak RSS is just that scenario's, and only the time spent stepping the
+# network counts as wall time (checking for convergence is the benchmark's job, not the simulation's).
+
+## IMPORTS ##
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+import multiprocessing
+from time import perf_counter
+
+try:
+    import resource  # Not there on Windows, peak RSS just gets left out
+except ImportError:
+    resource = None
+
+from simulation import Network
+from eventlog import eventLog, LEVEL_OFF
+from topologies import TopologyGenerators
+from profiler import Profiler
+from scenario import Scenario
+
+## CONSTANTS ##
+
+SIZES = [10, 100, 1000, 10000]
+SCENARIOS = ["cold", "cut", "add", "churn", "storm"]
+SEED = 1
+GENERATOR = "ba"  # Connected, sparse and hub heavy, like the networks this is meant to model
+EDGES_PER_ROUTER = 2
+AREAS = 1  # More than one splits every network into that many OSPF areas
+
+# A scenario gives up after this many ticks or this many seconds, whichever comes first
+MAX_TICKS = 10000
+TIME_BUDGET = 600
+
+# A churn storm is this many changes, CHURN_SPACING ticks apart
+CHURN_CHANGES = 20
+CHURN_SPACING = 2
+
+# What the storm scenario plays, see scenario.py
+STORM = """
+0 fail random 5%
++30 restart all
+"""
+
+
+def peakRSS():
+    # Peak resident memory of this process in bytes, or None if the platform can't say
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS says bytes, everyone else kilobytes
+
+
+def commitID():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def converge(network, maxTicks, deadline):
+    '''
+    Steps network the same way run_until_converged does, but stops at deadline (a perf_counter time) too.
+    Returns (tick it converged on or None, seconds spent stepping).
+    '''
+    stepping = 0.0
+    end = network.T + maxTicks
+    while network.T < end and perf_counter() < deadline:
+        nextTime = network.events.nextTime()
+        if nextTime is None or nextTime >= end:
+            nextTime = network.timers.nextDue()
+            if nextTime is None or nextTime >= end:
+                break
+        started = perf_counter()
+        network.advance(nextTime + 1)
+        stepping += perf_counter() - started
+        if network.isConverged():
+            return network.T, stepping
+    if perf_counter() < deadline:
+        # Nothing left before end but quiet ticks, which still have to be run so no timer gets left behind
+        started = perf_counter()
+        network.advance(end)
+        stepping += perf_counter() - started
+    return None, stepping
+
+
+def cutRandomLink(network):
+    slot = network.links.randomSlot(network.rng)
+    if slot is not None:
+        link = network.links.slots[slot]
+        network.blowUpConnection(link.R1, network.Connections[link.R1][link.P1])
+
+
+def runScenario(scenario, size, generator, seed, maxTicks, budget, profileDir=None, areas=AREAS):
+    '''
+    Runs one scenario on one network size and returns what it measured as a dict.
+    With profileDir, the scenario itself (not getting the network converged first) gets profiled into there too.
+    '''
+    eventLog.level = LEVEL_OFF
+    deadline = perf_counter() + budget
+    started = perf_counter()
+    network = Network(size, size * EDGES_PER_ROUTER, TopologyGenerators[generator], seed, areas)
+    result = {
+        "scenario": scenario,
+        "routers": network.size,
+        "links": len(network.links),
+        "buildSeconds": perf_counter() - started
+    }
+
+    if scenario != "cold":
+        convergedAt, _ = converge(network, maxTicks, deadline)
+        if convergedAt is None:
+            result["error"] = "never converged before the topology change"
+            result["peakRSS"] = peakRSS()
+            return result
+
+    profiler = Profiler(network) if profileDir is not None else None
+    startTick = network.T
+    startMessages = network.messagesSent
+    startDuplicates = network.duplicateLSPs
+    startRetransmits = network.retransmittedLSPs
+    stepping = 0.0
+    if scenario == "cut":
+        cutRandomLink(network)
+    elif scenario == "add":
+        network.createRandomConnection()
+    elif scenario == "churn":
+        for _ in range(CHURN_CHANGES):
+            if network.rng.random() < 0.5:
+                cutRandomLink(network)
+            else:
+                network.createRandomConnection()
+            before = perf_counter()
+            network.advance(network.T + CHURN_SPACING)
+            stepping += perf_counter() - before
+    elif scenario == "storm":
+        storm = Scenario(STORM, seed, "storm")
+        storm.applyDue(network)
+        while not storm.done() and perf_counter() < deadline:
+            before = perf_counter()
+            network.tick()
+            storm.applyDue(network)
+            stepping += perf_counter() - before
+
+    convergedAt, seconds = converge(network, maxTicks, deadline)
+    stepping += seconds
+    ticks = network.T - startTick
+    messages = network.messagesSent - startMessages
+    result.update({
+        "ticks": ticks,
+        "ticksToConvergence": None if convergedAt is None else convergedAt - startTick,
+        "timedOut": convergedAt is None and perf_counter() >= deadline,
+        "wallSeconds": stepping,
+        "wallPerTick": stepping / ticks if ticks else None,
+        "messages": messages,
+        "messagesPerSecond": messages / stepping if stepping else None,
+        "duplicateLSPs": network.duplicateLSPs - startDuplicates,
+        "retransmittedLSPs": network.retransmittedLSPs - startRetransmits,
+        # What areas are supposed to keep down: how much of the network every router has to hold on to
+        "meanLSDB": sum(len(R.nodeLSPs) for R in network.Routers) / network.size,
+        "maxLSDB": max(len(R.nodeLSPs) for R in network.Routers),
+        "peakRSS": peakRSS()
+    })
+    if profiler is not None:
+        profiler.close()
+        result["profile"] = os.path.join(profileDir, f"{scenario}-{network.size}.csv")
+        profiler.export(result["profile"])
+    return result
+
+
+def describe(result):
+    if "error" in result:
+        return f"{result['scenario']:>5} {result['routers']:>6} routers  {result['error']}"
+    converged = result["ticksToConvergence"]
+    perTick = result["wallPerTick"]
+    rate = result["messagesPerSecond"]
+    rss = result["peakRSS"]
+    return (f"{result['scenario']:>5} {result['routers']:>6} routers  "
+            f"{'converged in ' + str(converged) + ' ticks' if converged is not None else 'did not converge':>24}  "
+            f"{perTick * 1000 if perTick is not None else 0:>10.3f} ms/tick  "
+            f"{rate if rate is not None else 0:>12.0f} msg/s  "
+            f"{rss / 2 ** 20 if rss is not None else 0:>8.1f} MiB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless, seeded OSPF simulator benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="router counts to run at")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--generator", default=GENERATOR, choices=sorted(TopologyGenerators))
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--areas", type=int, default=AREAS, help="OSPF areas to split every network into")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET, help="seconds per scenario before giving up")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--profile", default=None, help="directory to write per tick profiles of every scenario to")
+    args = parser.parse_args()
+    if args.profile is not None:
+        os.makedirs(args.profile, exist_ok=True)
+
+    report = {
+        "commit": commitID(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+        "generator": args.generator,
+        "seed": args.seed,
+        "edgesPerRouter": EDGES_PER_ROUTER,
+        "areas": args.areas,
+        "maxTicks": args.max_ticks,
+        "budget": args.budget,
+        "results": []
+    }
+    context = multiprocessing.get_context()
+    for size in args.sizes:
+        for scenario in args.scenarios:
+            # A fresh process for every scenario, so nothing left over from the last one shows up in peak RSS
+            with context.Pool(1, maxtasksperchild=1) as pool:
+                result = pool.apply(runScenario, (scenario, size, args.generator, args.seed,
+                                                  args.max_ticks, args.budget, args.profile, args.areas))
+            report["results"].append(result)
+            print(describe(result), flush=True)
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+# Checkpoint and restore of a whole Network.
+# save() writes everything a run depends on (links, events still in the queue, rng state, every router's ports,
+# neighbors and neighbor states, LSDB, shortest path tree and counters) into one binary file. load() maps that file into memory and builds
+# the Network back around it, but routers only get read out of the file the first time something touches them, so
+# even a huge snapshot is ready to go right away. A restored network carries on exactly like the one that got saved.
+#
+# Layout (all little endian, everything after the header is found through the offsets in it):
+#   header        see HEADER
+#   rng           gauss flag, gauss value, the 625 words of the Mersenne Twister state
+#   positions     x, y for every router
+#   areas         the area every router is in
+#   links         cost, R1, P1, R2, P2, delay for every slot (R1 of 0 means the slot is free), then the free slot list
+#   down links    how many, then router, cost, far router, delay for every link a failed router gets back on restart
+#   convergence   [topology change tick, converged tick] pairs
+#   sync targets  the digest every router should have
+#   events        the event heap in heap order, so it doesn't need heapifying again
+#   timers        the timing wheel's clock and how many entries it has, then every entry's key and the tick it's due on
+#   routers       an offset per router, then one record per router, see ROUTER
+#   LSPs          how many, an offset per LSP, then one record per LSP. Routers and events point at these by number, so an LSP
+#                 that sat in a hundred LSDBs is still only stored (and loaded) once
+# Ports are stored by number (see portNumber).
+# Anything new that gets added to Network or Router has to get added here too, and FORMAT_VERSION bumped.
+
+## IMPORTS ##
+import sys
+import mmap
+import struct
+from array import array
+from random import Random
+
+from simulation import (Network, Router, EventQueue, TimingWheel, LinkTable, Link, LSP, entryDigest, portName,
+                        portNumber, EVENT_DELIVER, SUMMARY_LSP, ORIGIN_MASK)
+
+## CONSTANTS ##
+MAGIC = b"OSPFSNAP"
+FORMAT_VERSION = 6
+
+# magic, version, router count, area count, tick, topologyVersion, messagesSent, duplicateLSPs, retransmittedLSPs, changedAt,
+# mismatches, syncDirty,
+# then the offset of every section: rng, positions, areas, links, down links, convergence, sync targets, events, timers,
+# routers, LSPs
+HEADER = struct.Struct("<8sIIIqQQQQqIB11Q")
+
+RNG = struct.Struct("<Bd")  # has a gauss value waiting, the value. Followed by the 625 state words
+LINKS = struct.Struct("<II")  # slot count, free slot count
+COUNT = struct.Struct("<I")
+
+EVENT = struct.Struct("<qIqQB")  # tick, target, origin, origin's counter, event type
+DELIVERY = struct.Struct("<IIB")  # sending port, recieving port, message type
+HELLO = struct.Struct("<II")  # router ID saying hello (or acking one), router it has heard on that link
+FLOODED_LSP = struct.Struct("<Ih")  # LSP number, age
+# LSACKs are a COUNT, then that many (originator ID, sequence number) pairs
+TIMERS = struct.Struct("<qI")  # wheel clock, entry count
+
+# portsUsed, currentCounter, LSDBVersion, SPFRuns, fullSPFRuns, eventCounter, digest, flags,
+# then how many active ports, neighbors, neighbor states, retransmit list entries, pending acks, LSDB entries, shortest
+# path tree nodes and routes follow
+ROUTER = struct.Struct("<IIQQQQQBIIIIIIII")
+ACTIVE = 1
+IN_SYNC = 2
+
+LSP_HEADER = struct.Struct("<III")  # sequence number, originator ID, neighbor count
+
+NO_PORT = 0xFFFFFFFF  # Routing table entries that don't have a port yet
+
+BIG_ENDIAN = sys.byteorder == "big"
+
+
+def packArray(typecode, values):
+    data = array(typecode, values)
+    if BIG_ENDIAN:
+        data.byteswap()
+    return data.tobytes()
+
+
+def unpackArray(typecode, buffer, offset, count):
+    # (array of count values, offset right after them)
+    data = array(typecode)
+    end = offset + count * data.itemsize
+    data.frombytes(buffer[offset:end])
+    if BIG_ENDIAN:
+        data.byteswap()
+    return data, end
+
+
+def save(network, path):
+    '''
+    Writes network to path. Only works between ticks (not from inside an event), which is the only time anything
+    outside the network gets to run anyway.
+    '''
+    Routers = network.Routers  # Touching every router reads in any that were still waiting in a snapshot
+    if any(R.SPFScheduled or R.LSPScheduled or R.floodScheduled for R in Routers):
+        raise ValueError("Can only checkpoint a network between ticks")
+    if type(network.events) is not EventQueue:
+        raise ValueError("Can only checkpoint a plain Network")
+
+    lsps = {}  # LSP : its number in the file
+
+    def lspIndex(lsp):
+        index = lsps.get(lsp)
+        if index is None:
+            index = lsps[lsp] = len(lsps)
+        return index
+
+    with open(path, "wb") as file:
+        file.write(bytes(HEADER.size))
+        offsets = []
+
+        offsets.append(file.tell())
+        version, state, gauss = network.rng.getstate()
+        file.write(RNG.pack(gauss is not None, gauss or 0.0))
+        file.write(packArray("I", state))
+
+        offsets.append(file.tell())
+        file.write(packArray("i", (v for position in network.RouterPositions for v in position)))
+
+        offsets.append(file.tell())
+        file.write(packArray("H", network.areas[1:]))
+
+        offsets.append(file.tell())
+        links = network.links
+        file.write(LINKS.pack(len(links.slots), len(links.freeSlots)))
+        columns = []
+        for link in links.slots:
+            if link is None:
+                columns += (0, 0, 0, 0, 0, 0)
+            else:
+                columns += (link.cost, link.R1, portNumber(link.P1), link.R2, portNumber(link.P2), link.delay)
+        file.write(packArray("I", columns))
+        file.write(packArray("I", links.freeSlots))
+
+        offsets.append(file.tell())
+        down = [(ID, cost, far, delay) for ID, lost in network.downLinks.items() for cost, far, delay in lost]
+        file.write(COUNT.pack(len(down)))
+        file.write(packArray("I", (v for entry in down for v in entry)))
+
+        offsets.append(file.tell())
+        file.write(COUNT.pack(len(network.convergenceTimes)))
+        file.write(packArray("q", (t for pair in network.convergenceTimes for t in pair)))
+
+        offsets.append(file.tell())
+        file.write(packArray("Q", (target or 0 for target in network.syncTargets)))
+
+        offsets.append(file.tell())
+        heap = network.events.heap
+        file.write(COUNT.pack(len(heap)))
+        for time, target, origin, counter, eventType, args in heap:
+            file.write(EVENT.pack(time, target, origin, counter, eventType))
+            if eventType == EVENT_DELIVER:
+                fromPort, toPort, messageType, data = args
+                file.write(DELIVERY.pack(portNumber(fromPort), portNumber(toPort), messageType))
+                if messageType < 2:
+                    file.write(HELLO.pack(*data))
+                elif messageType == 2:
+                    file.write(FLOODED_LSP.pack(lspIndex(data[0]), data[1]))
+                elif messageType == 3:
+                    file.write(COUNT.pack(len(data)))
+                    file.write(packArray("I", (v for pair in data for v in pair)))
+
+        offsets.append(file.tell())
+        due = network.timers.due
+        file.write(TIMERS.pack(network.timers.time, len(due)))
+        file.write(packArray("Q", due.keys()))
+        file.write(packArray("q", due.values()))
+
+        offsets.append(file.tell())
+        indexAt = file.tell()
+        file.write(bytes(8 * len(Routers)))
+        routerOffsets = []
+        for R in Routers:
+            routerOffsets.append(file.tell())
+            saveRouter(file, R, lspIndex)
+
+        offsets.append(file.tell())
+        ordered = list(lsps)
+        file.write(COUNT.pack(len(ordered)))
+        lspIndexAt = file.tell()
+        file.write(bytes(8 * len(ordered)))
+        lspOffsets = []
+        for lsp in ordered:
+            lspOffsets.append(file.tell())
+            SeqN, NeighborData, SenderID = lsp
+            file.write(LSP_HEADER.pack(SeqN, SenderID, len(NeighborData)))
+            file.write(packArray("I", (v for port, adj, cost in NeighborData for v in (portNumber(port), adj, cost))))
+
+        file.seek(indexAt)
+        file.write(packArray("Q", routerOffsets))
+        file.seek(lspIndexAt)
+        file.write(packArray("Q", lspOffsets))
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, network.size, network.areaCount, network.T, network.topologyVersion,
+                               network.messagesSent, network.duplicateLSPs, network.retransmittedLSPs,
+                               network.changedAt, network.mismatches, network.syncDirty,
+                               *offsets))
+
+
+def saveRouter(file, R, lspIndex):
+    flags = (ACTIVE if R.Active else 0) | (IN_SYNC if R.inSync else 0)
+    tree = [node for node in R.dist if node != R.ID]
+    retransmits = [(port, origin, entry) for port, waiting in R.retransmits.items() for origin, entry in waiting.items()]
+    acks = [(port, ack) for port, pending in R.pendingAcks.items() for ack in pending]
+    file.write(ROUTER.pack(R.portsUsed, R.currentCounter, R.LSDBVersion, R.SPFRuns, R.fullSPFRuns, R.eventCounter,
+                           R.digest, flags, len(R.ActivePorts), len(R.neighbors), len(R.neighborStates),
+                           len(retransmits), len(acks), len(R.nodeLSPs), len(tree), len(R.routingTable)))
+    file.write(packArray("I", map(portNumber, R.ActivePorts)))
+    file.write(packArray("I", (v for port, (adj, cost) in R.neighbors.items() for v in (portNumber(port), adj, cost))))
+    file.write(packArray("I", (v for port, (state, adj) in R.neighborStates.items()
+                               for v in (portNumber(port), state, adj))))
+    file.write(packArray("I", (v for port, origin, (lsp, _) in retransmits
+                               for v in (portNumber(port), origin, lspIndex(lsp)))))
+    file.write(packArray("q", (sentAt for _, _, (_, sentAt) in retransmits)))
+    file.write(packArray("I", (v for port, (origin, SeqN) in acks for v in (portNumber(port), origin, SeqN))))
+    file.write(packArray("I", (v for origin, lsp in R.nodeLSPs.items() for v in (origin, lspIndex(lsp)))))
+    file.write(packArray("I", (v for node in tree for v in (node, R.parent[node], R.firstHop[node]))))
+    file.write(packArray("q", (R.dist[node] for node in tree)))
+    routes = R.routingTable.items()
+    file.write(packArray("I", (v for node, (_, hop, port) in routes
+                               for v in (node, hop, NO_PORT if port is None else portNumber(port)))))
+    file.write(packArray("q", (cost for cost, _, _ in R.routingTable.values())))
+
+
+class Snapshot:
+    '''
+    An open snapshot file. Keeps the file mapped so routers and LSPs can be read out of it whenever they're needed.
+    '''
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.map)
+        if len(self.buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a network snapshot")
+        header = HEADER.unpack_from(self.buffer, 0)
+        if header[0] != MAGIC:
+            raise ValueError(f"{path} is not a network snapshot")
+        if header[1] != FORMAT_VERSION:
+            raise ValueError(f"{path} is snapshot format {header[1]}, this only reads format {FORMAT_VERSION}")
+        (_, _, self.size, self.areaCount, self.T, self.topologyVersion, self.messagesSent, self.duplicateLSPs,
+         self.retransmittedLSPs, self.changedAt, self.mismatches, self.syncDirty) = header[:12]
+        (self.rngAt, self.positionsAt, self.areasAt, self.linksAt, self.downLinksAt, self.convergenceAt, self.syncAt,
+         self.eventsAt, self.timersAt, self.routersAt, self.lspsAt) = header[12:]
+        self.routerOffsets = unpackArray("Q", self.buffer, self.routersAt, self.size)[0]
+        lspCount = COUNT.unpack_from(self.buffer, self.lspsAt)[0]
+        self.lspOffsets = unpackArray("Q", self.buffer, self.lspsAt + COUNT.size, lspCount)[0]
+        self.lsps = [None] * lspCount  # LSPs already read, so every router gets the same object
+
+    def lsp(self, index):
+        lsp = self.lsps[index]
+        if lsp is None:
+            offset = self.lspOffsets[index]
+            SeqN, SenderID, count = LSP_HEADER.unpack_from(self.buffer, offset)
+            values = unpackArray("I", self.buffer, offset + LSP_HEADER.size, 3 * count)[0]
+            neighbors = tuple((portName(values[i]), values[i + 1], values[i + 2]) for i in range(0, 3 * count, 3))
+            lsp = self.lsps[index] = LSP(SenderID, neighbors, SeqN)
+        return lsp
+
+
+class LazyRouter:
+    '''
+    Stands in for a router that is still sitting in the snapshot. The first time anything other than its ID gets
+    looked at, it reads itself in and turns into a real Router, so from then on it costs nothing extra.
+    '''
+
+    def __init__(self, ID, network, snapshot):
+        self.ID = ID
+        self.network = network
+        self.snapshot = snapshot
+
+    def __getattr__(self, name):
+        snapshot = self.__dict__.get("snapshot")
+        if snapshot is None:
+            raise AttributeError(name)
+        del self.snapshot
+        self.__class__ = Router
+        loadRouter(self, snapshot)
+        return getattr(self, name)
+
+
+def loadRouter(R, snapshot):
+    # Fills in everything Router.__init__ would have, from the router's record
+    buffer = snapshot.buffer
+    offset = snapshot.routerOffsets[R.ID - 1]
+    (R.portsUsed, R.currentCounter, R.LSDBVersion, R.SPFRuns, R.fullSPFRuns, R.eventCounter, R.digest, flags,
+     activeCount, neighborCount, stateCount, retransmitCount, ackCount, lspCount, treeCount,
+     routeCount) = ROUTER.unpack_from(buffer, offset)
+    offset += ROUTER.size
+    R.Active = bool(flags & ACTIVE)
+    R.inSync = bool(flags & IN_SYNC)
+    R.SPFScheduled = False
+    R.LSPScheduled = False
+    R.floodScheduled = False
+    R.floodQueue = {}
+    R.dirtyLSPs = set()
+
+    values, offset = unpackArray("I", buffer, offset, activeCount)
+    R.ActivePorts = dict.fromkeys(map(portName, values))
+
+    values, offset = unpackArray("I", buffer, offset, 3 * neighborCount)
+    R.neighbors = {portName(values[i]): (values[i + 1], values[i + 2]) for i in range(0, 3 * neighborCount, 3)}
+
+    values, offset = unpackArray("I", buffer, offset, 3 * stateCount)
+    R.neighborStates = {portName(values[i]): (values[i + 1], values[i + 2]) for i in range(0, 3 * stateCount, 3)}
+
+    values, offset = unpackArray("I", buffer, offset, 3 * retransmitCount)
+    sentAt, offset = unpackArray("q", buffer, offset, retransmitCount)
+    R.retransmits = {port: {} for port in R.neighbors}  # Every Full neighbor has one, even if it's empty
+    for i in range(retransmitCount):
+        R.retransmits[portName(values[3 * i])][values[3 * i + 1]] = (
+            snapshot.lsp(values[3 * i + 2]), sentAt[i])
+
+    values, offset = unpackArray("I", buffer, offset, 3 * ackCount)
+    R.pendingAcks = {}
+    for i in range(0, 3 * ackCount, 3):
+        R.pendingAcks.setdefault(portName(values[i]), []).append((values[i + 1], values[i + 2]))
+
+    values, offset = unpackArray("I", buffer, offset, 2 * lspCount)
+    R.nodeLSPs = {values[i]: snapshot.lsp(values[i + 1]) for i in range(0, 2 * lspCount, 2)}
+
+    # The areas it's in go by its Full neighbors, in the order they went Full (which is the order neighbors is in)
+    R.area = R.network.areas[R.ID]
+    R.areas = {R.area: {}}
+    for port, (adj, _) in R.neighbors.items():
+        R.areas.setdefault(R.network.areaBetween(R.ID, adj), {})[port] = None
+    R.areas = dict(sorted(R.areas.items()))
+    R.summaryIDs = {ID for ID in R.nodeLSPs if ID & SUMMARY_LSP}
+    R.adjMatrix = {}
+    for ID in R.nodeLSPs:
+        if not ID & SUMMARY_LSP and ID & ORIGIN_MASK not in R.adjMatrix:
+            R.adjMatrix[ID & ORIGIN_MASK] = R.nodeAdjacencies(ID & ORIGIN_MASK)
+
+    # Between ticks the last SPF run always saw the whole LSDB, so the graphs come straight out of it
+    R.graph = {}
+    R.reverseGraph = {}
+    for node, adjacencies in R.adjMatrix.items():
+        edges = {}
+        for adj, cost in adjacencies:
+            if cost < edges.get(adj, cost + 1):
+                edges[adj] = cost
+        if edges:
+            R.graph[node] = edges
+            for adj, cost in edges.items():
+                R.reverseGraph.setdefault(adj, {})[node] = cost
+
+    values, offset = unpackArray("I", buffer, offset, 3 * treeCount)
+    dists, offset = unpackArray("q", buffer, offset, treeCount)
+    R.dist = {R.ID: 0}
+    R.parent = {}
+    R.children = {R.ID: set()}
+    R.firstHop = {}
+    for i in range(treeCount):
+        node, via, hop = values[3 * i], values[3 * i + 1], values[3 * i + 2]
+        R.dist[node] = dists[i]
+        R.parent[node] = via
+        R.firstHop[node] = hop
+        R.children.setdefault(node, set())
+        R.children.setdefault(via, set()).add(node)
+
+    values, offset = unpackArray("I", buffer, offset, 3 * routeCount)
+    costs, offset = unpackArray("q", buffer, offset, routeCount)
+    R.routingTable = {}
+    for i in range(routeCount):
+        port = values[3 * i + 2]
+        R.routingTable[values[3 * i]] = (costs[i], values[3 * i + 1], None if port == NO_PORT else portName(port))
+
+    # Inter-area routes only ever come out of the tree and the summaries, so they get worked out again instead of saved
+    R.areaRoutes = {}
+    R.areaTable = None
+    R.farthest = {}
+    if R.network.areaCount > 1:
+        R.interAreaRouting()
+
+
+def load(path):
+    '''
+    Builds the Network saved in path back up. Routers get read in lazily, see LazyRouter.
+    '''
+    snapshot = Snapshot(path)
+    buffer = snapshot.buffer
+    network = Network.__new__(Network)
+    size = network.size = snapshot.size
+    network.T = snapshot.T
+    network.topologyVersion = snapshot.topologyVersion
+    network.messagesSent = snapshot.messagesSent
+    network.duplicateLSPs = snapshot.duplicateLSPs
+    network.retransmittedLSPs = snapshot.retransmittedLSPs
+    network.trace = None
+    network.profiler = None
+    network.dataplane = None
+
+    gaussWaiting, gauss = RNG.unpack_from(buffer, snapshot.rngAt)
+    state = unpackArray("I", buffer, snapshot.rngAt + RNG.size, 625)[0]
+    network.rng = Random()
+    network.rng.setstate((3, tuple(state), gauss if gaussWaiting else None))
+
+    values = unpackArray("i", buffer, snapshot.positionsAt, 2 * size)[0]
+    network.RouterPositions = [(values[2 * i], values[2 * i + 1]) for i in range(size)]
+    network.RITTP = {x: (network.RouterPositions[x - 1][0] - 9, network.RouterPositions[x - 1][1] - 22)
+                     for x in range(1, size + 1)}
+
+    network.areaCount = snapshot.areaCount
+    network.areas = [0] + list(unpackArray("H", buffer, snapshot.areasAt, size)[0])
+
+    # Links, and the views of them the network keeps
+    network.links = LinkTable()
+    network.Connections = {x: {} for x in range(1, size + 1)}
+    network.SimplifiedConnections = {x: set() for x in range(1, size + 1)}
+    network.truthDigests = [0] + [entryDigest(x, ()) for x in range(1, size + 1)]
+    slotCount, freeCount = LINKS.unpack_from(buffer, snapshot.linksAt)
+    values, offset = unpackArray("I", buffer, snapshot.linksAt + LINKS.size, 6 * slotCount)
+    for slot in range(slotCount):
+        cost, R1, P1, R2, P2, delay = values[6 * slot:6 * slot + 6]
+        if R1 == 0:
+            network.links.slots.append(None)
+            continue
+        P1, P2 = portName(P1), portName(P2)
+        network.links.slots.append(Link(cost, R1, P1, R2, P2, delay))
+        network.links.ports[(R1, P1)] = slot
+        network.links.ports[(R2, P2)] = slot
+        network.links.pairs[(min(R1, R2), max(R1, R2))] = slot
+        network.Connections[R1][P1] = [cost, P1, P2, R2, delay]
+        network.Connections[R2][P2] = [cost, P2, P1, R1, delay]
+        network.SimplifiedConnections[R1].add(R2)
+        network.SimplifiedConnections[R2].add(R1)
+        network.truthChanged(R1, R2, cost, 1)
+    network.links.freeSlots = list(unpackArray("I", buffer, offset, freeCount)[0])
+
+    network.downLinks = {}
+    count = COUNT.unpack_from(buffer, snapshot.downLinksAt)[0]
+    values = unpackArray("I", buffer, snapshot.downLinksAt + COUNT.size, 4 * count)[0]
+    for i in range(0, 4 * count, 4):
+        network.downLinks.setdefault(values[i], []).append((values[i + 1], values[i + 2], values[i + 3]))
+
+    count = COUNT.unpack_from(buffer, snapshot.convergenceAt)[0]
+    values = unpackArray("q", buffer, snapshot.convergenceAt + COUNT.size, 2 * count)[0]
+    network.convergenceTimes = [[values[2 * i], values[2 * i + 1]] for i in range(count)]
+
+    network.syncTargets = list(unpackArray("Q", buffer, snapshot.syncAt, size + 1)[0])
+    network.syncDirty = bool(snapshot.syncDirty)
+    network.mismatches = snapshot.mismatches
+    network.changedAt = snapshot.changedAt
+
+    network.events = EventQueue()
+    heap = network.events.heap
+    count = COUNT.unpack_from(buffer, snapshot.eventsAt)[0]
+    offset = snapshot.eventsAt + COUNT.size
+    for _ in range(count):
+        time, target, origin, counter, eventType = EVENT.unpack_from(buffer, offset)
+        offset += EVENT.size
+        args = ()
+        if eventType == EVENT_DELIVER:
+            fromPort, toPort, messageType = DELIVERY.unpack_from(buffer, offset)
+            offset += DELIVERY.size
+            data = None
+            if messageType < 2:
+                data = HELLO.unpack_from(buffer, offset)
+                offset += HELLO.size
+            elif messageType == 2:
+                index, age = FLOODED_LSP.unpack_from(buffer, offset)
+                offset += FLOODED_LSP.size
+                data = (snapshot.lsp(index), age)
+            elif messageType == 3:
+                count = COUNT.unpack_from(buffer, offset)[0]
+                values, offset = unpackArray("I", buffer, offset + COUNT.size, 2 * count)
+                data = tuple((values[i], values[i + 1]) for i in range(0, 2 * count, 2))
+            args = (portName(fromPort), portName(toPort), messageType, data)
+        heap.append((time, target, origin, counter, eventType, args))
+
+    time, count = TIMERS.unpack_from(buffer, snapshot.timersAt)
+    keys, offset = unpackArray("Q", buffer, snapshot.timersAt + TIMERS.size, count)
+    ticks = unpackArray("q", buffer, offset, count)[0]
+    network.timers = TimingWheel(time)
+    for key, tick in zip(keys, ticks):
+        network.timers.schedule(key, tick)
+
+    network.Routers = [LazyRouter(x, network, snapshot) for x in range(1, size + 1)]
+    return network
@@ -0,0 +1,2 @@
+# Nothing in here, it just being next to the modules gets pytest to put this directory on sys.path, so the tests can
+# import them when running plain `pytest`.
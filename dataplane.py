@@ -0,0 +1,400 @@
+# Data plane. A DataPlane hooks itself into a network and pushes traffic through it: flows put packets in at their
+# source router every tick, and every router forwards them one hop at a time by whatever route it has to the destination
+# right then (see Router.getRoute). While the network is reconverging that means packets go wherever the routers' tables
+# say, straight into dead links and routing loops, which is the point: it counts what got delivered, what got
+# blackholed (no route, or a route out of a port with nothing on it anymore), what went around in circles until its TTL
+# ran out and what was on a link when it got blown up, and how loaded every link is.
+#
+# Nothing is a packet object. Packets travel in batches (every packet one flow sends on one tick, which all go the same
+# way), and every batch in flight is one row across a handful of numpy arrays that all get forwarded at once each tick:
+# one lookup into the forwarding table, one bincount for the link loads, one mask for each way a batch can end.
+# The forwarding table only has a column for each router some flow goes to, and a router's row only gets looked up again
+# after it runs SPF. Links don't queue or drop anything, a link carrying more than it can shows up as utilization over 1.
+#
+#   plane = DataPlane(network)
+#   plane.addRandomFlows(1000, rate=100)
+#   plane.run(200)
+#   plane.export("traffic.csv")
+
+## IMPORTS ##
+import csv
+import json
+from array import array
+from random import Random
+from time import perf_counter
+
+import numpy
+
+## CONSTANTS ##
+
+# Packets per tick a link of cost 1 carries each way. Cost is the reference bandwidth over the link's bandwidth, like
+# OSPF works it out, so a link of cost c carries REFERENCE_BANDWIDTH / c.
+REFERENCE_BANDWIDTH = 10000
+
+# Hops a packet gets before it's counted as looped and dropped
+DEFAULT_TTL = 64
+
+# Forwarding table entry for no route at all
+NO_ROUTE = -1
+
+## FORMATS ##
+# (column, array type) for every column of the time series, in order
+COLUMNS = [
+    ("tick", "q"),
+    ("seconds", "d"),  # Wall time spent forwarding the tick
+    ("injected", "q"),  # Packets the flows put in
+    ("delivered", "q"),  # Packets that got to their destination
+    ("blackholed", "q"),  # Packets dropped by a router with no way to send them on
+    ("looped", "q"),  # Packets dropped when their TTL ran out
+    ("lost", "q"),  # Packets that were on a link when it got blown up
+    ("inFlight", "q"),  # Packets still on their way at the end of the tick
+    ("batches", "q"),  # Batches those are in
+    ("maxUtilization", "d"),  # Busiest direction of any link, over what it can carry
+    ("overloaded", "q")  # Link directions carrying more than they can
+]
+
+
+class DataPlane:
+    '''
+    Forwards traffic over network from now on. It hooks itself in as network.dataplane until close(), and has to be
+    stepped with its own run()/advance() instead of the network's, since packets move every tick whether or not the
+    control plane has anything going on.
+    Flows are (source router, destination router, packets per tick), see addFlow.
+    '''
+
+    def __init__(self, network, ttl=DEFAULT_TTL):
+        self.network = network
+        self.ttl = ttl
+
+        # Flows, one entry each
+        self.flowSources = numpy.zeros(0, numpy.int32)
+        self.flowColumns = numpy.zeros(0, numpy.int32)
+        self.flowRates = numpy.zeros(0, numpy.int64)
+
+        # Forwarding table. fib[router ID, column] is the slot of the link router ID sends packets for destinations[column]
+        # out of, or NO_ROUTE. columns is destination router ID : its column.
+        self.destinations = numpy.zeros(0, numpy.int32)
+        self.columns = {}
+        self.fib = numpy.full((network.size + 1, 0), NO_ROUTE, numpy.int32)
+        self.stale = set()  # Routers whose routes changed since their row was filled in
+
+        # Batches in flight: the router each one is at (or on its way to), its destination's column, how many packets,
+        # the tick it gets there, hops so far and the slot of the link it last went over (-1 for none yet)
+        self.at = numpy.zeros(0, numpy.int32)
+        self.column = numpy.zeros(0, numpy.int32)
+        self.count = numpy.zeros(0, numpy.int64)
+        self.ready = numpy.zeros(0, numpy.int64)
+        self.hops = numpy.zeros(0, numpy.int32)
+        self.via = numpy.zeros(0, numpy.int32)
+
+        # Every link slot: the routers on each end, its delay, and what it can carry each way (index 2 * slot for
+        # R1 to R2, 2 * slot + 1 for R2 to R1). An empty slot can't carry anything.
+        self.ends = numpy.zeros((0, 2), numpy.int32)
+        self.delays = numpy.zeros(0, numpy.int64)
+        self.capacity = numpy.zeros(0, numpy.float64)
+        self.load = numpy.zeros(0, numpy.float64)  # Packets over each link direction last tick
+        self.totalLoad = numpy.zeros(0, numpy.float64)  # And since the start
+        self.lostThisTick = 0
+        self.linksChanged(range(len(network.links.slots)))
+
+        self.totals = {name: 0 for name in ("injected", "delivered", "blackholed", "looped", "lost")}
+        self.series = {name: array(kind) for name, kind in COLUMNS}
+        network.dataplane = self
+
+    def close(self):
+        if self.network.dataplane is self:
+            self.network.dataplane = None
+
+    ## Flows ##
+
+    def addFlow(self, source, destination, rate):
+        '''
+        Has router source send rate packets a tick to router destination from now on.
+        '''
+        self.addFlows([(source, destination, rate)])
+
+    def addFlows(self, flows):
+        '''
+        addFlow for every (source, destination, rate) in flows, all at once.
+        '''
+        sources, columns, rates = [], [], []
+        for source, destination, rate in flows:
+            if source == destination:
+                raise ValueError(f"Flow from router {source} to itself")
+            column = self.columns.get(destination)
+            if column is None:
+                column = self.addDestination(destination)
+            sources.append(source)
+            columns.append(column)
+            rates.append(rate)
+        self.flowSources = numpy.concatenate([self.flowSources, numpy.array(sources, numpy.int32)])
+        self.flowColumns = numpy.concatenate([self.flowColumns, numpy.array(columns, numpy.int32)])
+        self.flowRates = numpy.concatenate([self.flowRates, numpy.array(rates, numpy.int64)])
+
+    def addRandomFlows(self, count, rate, seed=None, destinations=None):
+        '''
+        count flows of rate packets a tick between random pairs of routers. destinations limits how many different
+        routers they go to (every router can be one if it's None), which is what keeps the forwarding table small.
+        Picked with their own rng, so adding traffic doesn't change how the network itself runs.
+        '''
+        size = self.network.size
+        if size < 2 or destinations == 0:
+            # Not a single pair of routers to put a flow between
+            return None
+        rng = Random(seed)
+        targets = None if destinations is None else rng.sample(range(1, size + 1), min(destinations, size))
+        flows = []
+        for _ in range(count):
+            destination = rng.randint(1, size) if targets is None else rng.choice(targets)
+            source = rng.randint(1, size - 1)
+            if source >= destination:
+                source += 1
+            flows.append((source, destination, rate))
+        self.addFlows(flows)
+
+    def addDestination(self, destination):
+        # A new column in the forwarding table, filled in for every router
+        column = len(self.destinations)
+        self.columns[destination] = column
+        self.destinations = numpy.append(self.destinations, numpy.int32(destination))
+        self.fib = numpy.hstack([self.fib, numpy.full((self.network.size + 1, 1), NO_ROUTE, numpy.int32)])
+        for ID in range(1, self.network.size + 1):
+            self.fib[ID, column] = self.route(ID, destination)
+        return column
+
+    ## Hooks, called by the simulation ##
+
+    def routesChanged(self, ID):
+        # Called by Router.handleEvent after router ID runs SPF
+        self.stale.add(ID)
+
+    def linksChanged(self, slots):
+        '''
+        Called by the network with every slot a link just got built in, blown up out of or had its cost changed, however
+        many there are in one go. Anything on a link that just got blown up is lost, and every route out of it goes
+        nowhere until the router on that end runs SPF again.
+        '''
+        slots = list(slots)
+        if not slots:
+            return None
+        grow = max(slots) + 1 - len(self.delays)
+        if grow > 0:
+            self.ends = numpy.vstack([self.ends, numpy.zeros((grow, 2), numpy.int32)])
+            self.delays = numpy.append(self.delays, numpy.zeros(grow, numpy.int64))
+            self.capacity = numpy.append(self.capacity, numpy.zeros(2 * grow))
+            self.load = numpy.append(self.load, numpy.zeros(2 * grow))
+            self.totalLoad = numpy.append(self.totalLoad, numpy.zeros(2 * grow))
+        gone = []
+        for slot in slots:
+            link = self.network.links.slots[slot]
+            if link is not None:
+                self.ends[slot] = (link.R1, link.R2)
+                self.delays[slot] = link.delay
+                self.capacity[2 * slot:2 * slot + 2] = REFERENCE_BANDWIDTH / link.cost
+            else:
+                self.ends[slot] = (0, 0)
+                self.capacity[2 * slot:2 * slot + 2] = 0
+                gone.append(slot)
+        if not gone:
+            return None
+        # One pass over the forwarding table and the batches in flight for all of them, not one per link
+        gone = numpy.array(gone, numpy.int32)
+        self.fib[numpy.isin(self.fib, gone)] = NO_ROUTE
+        onLink = numpy.isin(self.via, gone) & (self.ready > self.network.T)
+        if onLink.any():
+            self.lostThisTick += int(self.count[onLink].sum())
+            self.keep(~onLink)
+
+    ## Forwarding ##
+
+    def route(self, ID, destination):
+        # The slot router ID sends packets for destination out of right now, or NO_ROUTE
+        route = self.network.getRouter(ID).getRoute(destination)
+        if route is None or route[2] is None:
+            return NO_ROUTE
+        slot = self.network.links.ports.get((ID, route[2]))
+        return NO_ROUTE if slot is None else slot
+
+    def refreshRoutes(self):
+        # Fills in the row of every router that ran SPF since the last tick
+        for ID in self.stale:
+            self.fib[ID] = [self.route(ID, destination) for destination in self.destinations.tolist()]
+        self.stale.clear()
+
+    def keep(self, mask):
+        # Throws out every batch in flight but the ones in mask
+        self.at = self.at[mask]
+        self.column = self.column[mask]
+        self.count = self.count[mask]
+        self.ready = self.ready[mask]
+        self.hops = self.hops[mask]
+        self.via = self.via[mask]
+
+    def forward(self, T):
+        '''
+        One tick of traffic: the flows put in their packets, then every batch sitting at a router on tick T either gets
+        delivered, dropped or sent over its next link.
+        '''
+        started = perf_counter()
+        if self.stale:
+            self.refreshRoutes()
+        flows = len(self.flowSources)
+        self.at = numpy.concatenate([self.at, self.flowSources])
+        self.column = numpy.concatenate([self.column, self.flowColumns])
+        self.count = numpy.concatenate([self.count, self.flowRates])
+        self.ready = numpy.concatenate([self.ready, numpy.full(flows, T, numpy.int64)])
+        self.hops = numpy.concatenate([self.hops, numpy.zeros(flows, numpy.int32)])
+        self.via = numpy.concatenate([self.via, numpy.full(flows, -1, numpy.int32)])
+
+        here = self.ready <= T
+        at = self.at[here]
+        column = self.column[here]
+        count = self.count[here]
+        hops = self.hops[here]
+        slot = self.fib[at, column]
+        delivered = at == self.destinations[column]
+        blackholed = ~delivered & (slot == NO_ROUTE)
+        looped = ~delivered & ~blackholed & (hops >= self.ttl)
+        moving = ~(delivered | blackholed | looped)
+        row = {
+            "tick": T,
+            "injected": int(self.flowRates.sum()),
+            "delivered": int(count[delivered].sum()),
+            "blackholed": int(count[blackholed].sum()),
+            "looped": int(count[looped].sum()),
+            "lost": self.lostThisTick
+        }
+        self.lostThisTick = 0
+
+        at, column, count, hops, slot = at[moving], column[moving], count[moving], hops[moving], slot[moving]
+        ends = self.ends[slot]
+        backwards = at == ends[:, 1]  # Going from R2 to R1
+        # bincount hands back ints instead when there's nothing to count at all
+        self.load = numpy.bincount(2 * slot + backwards, weights=count, minlength=len(self.capacity)).astype(
+            numpy.float64, copy=False)
+        self.totalLoad += self.load
+
+        waiting = ~here
+        self.at = numpy.concatenate([self.at[waiting], numpy.where(backwards, ends[:, 0], ends[:, 1])])
+        self.column = numpy.concatenate([self.column[waiting], column])
+        self.count = numpy.concatenate([self.count[waiting], count])
+        self.ready = numpy.concatenate([self.ready[waiting], T + self.delays[slot]])
+        self.hops = numpy.concatenate([self.hops[waiting], hops + 1])
+        self.via = numpy.concatenate([self.via[waiting], slot])
+
+        utilization = self.utilization()
+        row["seconds"] = perf_counter() - started
+        row["inFlight"] = int(self.count.sum())
+        row["batches"] = len(self.count)
+        row["maxUtilization"] = float(utilization.max()) if len(utilization) else 0.0
+        row["overloaded"] = int((utilization > 1).sum())
+        for name in self.totals:
+            self.totals[name] += row[name]
+        for name, values in self.series.items():
+            values.append(row[name])
+
+    def advance(self, until):
+        '''
+        Runs the network and its traffic up to tick until, one tick at a time: everything the routers do on a tick
+        happens first, then the packets move by the tables they ended the tick with.
+        '''
+        network = self.network
+        while network.T < until:
+            T = network.T
+            network.advance(T + 1)
+            self.forward(T)
+        return network.T
+
+    def run(self, ticks):
+        return self.advance(self.network.T + ticks)
+
+    def run_until_converged(self, maxTicks=10000):
+        '''
+        Network.run_until_converged, with traffic flowing the whole way. Returns the tick the network converged on, or
+        None if it never did.
+        '''
+        end = self.network.T + maxTicks
+        while self.network.T < end:
+            self.advance(self.network.T + 1)
+            if self.network.isConverged():
+                return self.network.T
+        return None
+
+    ## Summaries ##
+
+    def __len__(self):
+        return len(self.series["tick"])
+
+    def utilization(self):
+        '''
+        What every link direction carried last tick over what it can (2 * slot for R1 to R2, 2 * slot + 1 back), 0 for
+        empty slots.
+        '''
+        return numpy.divide(self.load, self.capacity, out=numpy.zeros_like(self.load), where=self.capacity > 0)
+
+    def busiestLinks(self, count=5):
+        '''
+        [(slot, from router, to router, utilization), ...] for the count busiest link directions last tick.
+        '''
+        utilization = self.utilization()
+        busiest = numpy.argsort(utilization, kind="stable")[::-1][:count]
+        result = []
+        for index in busiest.tolist():
+            if utilization[index] > 0:
+                slot, backwards = divmod(index, 2)
+                R1, R2 = self.ends[slot].tolist()
+                result.append((slot, R2, R1, float(utilization[index])) if backwards
+                              else (slot, R1, R2, float(utilization[index])))
+        return result
+
+    def timeSeries(self):
+        '''
+        The time series as column name : list of values.
+        '''
+        return {name: values.tolist() for name, values in self.series.items()}
+
+    def export(self, path):
+        '''
+        Writes the time series to path, one row per tick. JSON (column name : values) if path ends in .json, CSV
+        otherwise.
+        '''
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump(self.timeSeries(), file)
+            return None
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow([name for name, _ in COLUMNS])
+            writer.writerows(zip(*self.series.values()))
+
+
+if __name__ == "__main__":
+    # What blowing up the busiest link costs: converge, get traffic going, cut it, count the damage until it's converged
+    # again. python dataplane.py [routers] [flows]
+    import sys
+    from simulation import Network, ROUTERCOUNT
+    from topologies import TopologyGenerators
+    from eventlog import eventLog, LEVEL_WARNING
+
+    eventLog.level = LEVEL_WARNING
+    eventLog.start()
+    routers = int(sys.argv[1]) if len(sys.argv) > 1 else ROUTERCOUNT * 100
+    flows = int(sys.argv[2]) if len(sys.argv) > 2 else routers * 10
+    FullNetwork = Network(routers, routers * 2, TopologyGenerators["waxman"], seed=1)
+    FullNetwork.run_until_converged()
+    plane = DataPlane(FullNetwork)
+    plane.addRandomFlows(flows, rate=10, seed=1, destinations=100)
+    plane.run(50)
+    before = dict(plane.totals)
+    slot, R1, R2, utilization = plane.busiestLinks(1)[0]
+    print(f"Blowing up the link from {R1} to {R2} at tick {FullNetwork.T}, {utilization:.0%} utilized")
+    FullNetwork.blowUpLink(slot)
+    started = perf_counter()
+    convergedAt = plane.run_until_converged()
+    plane.run(50)
+    seconds = perf_counter() - started
+    after = {name: plane.totals[name] - before[name] for name in plane.totals}
+    print(f"Converged again at tick {convergedAt}" if convergedAt is not None else "Never converged again")
+    print(f"{after['injected']} packets sent, {after['delivered']} delivered, {after['blackholed']} blackholed, "
+          f"{after['looped']} looped, {after['lost']} lost on the link")
+    print(f"{after['injected'] / seconds:.0f} packets/s forwarded (with the control plane running)")
@@ -0,0 +1,173 @@
+# Event log for the simulator.
+# Routers just append a record (tick, level, message template, args) to a ring buffer. A background thread does the
+# formatting and writes everything that piled up in one go, so logging never holds up the simulation the way
+# prettyPrint's sleep(0.1) after every single message did.
+
+## IMPORTS ##
+import sys
+import atexit
+import threading
+from collections import deque
+from time import monotonic
+
+## LEVELS ##
+LEVEL_VERBOSE = 0  # E.G. Denial of LSP, notification on Routers saying Hello, longer LSP accept messages, etc.
+LEVEL_DEBUG = 1  # E.G. Acceptance of LSP, notification of successful HELLOs, etc.
+LEVEL_WARNING = 2  # Stuff breaking: failed messages, ports declared down, edges cut
+LEVEL_OFF = 3  # Log nothing at all
+
+LevelToHumanReadable = {
+    LEVEL_VERBOSE: "VERBOSE",
+    LEVEL_DEBUG: "DEBUG",
+    LEVEL_WARNING: "WARNING",
+    LEVEL_OFF: "OFF"
+}
+
+# SGR color constants
+# rene-d 2018
+# Taken from https://gist.github.com/rene-d/9e584a7dd2935d0f461904b9f2950007
+
+
+class C:
+    """ ANSI color codes, to make those pretty status messages. """
+    BLACK = "\033[0;30m"
+    RED = "\033[0;31m"
+    GREEN = "\033[0;32m"
+    BROWN = "\033[0;33m"
+    BLUE = "\033[0;34m"
+    PURPLE = "\033[0;35m"
+    CYAN = "\033[0;36m"
+    LIGHT_GRAY = "\033[0;37m"
+    DARK_GRAY = "\033[1;30m"
+    LIGHT_RED = "\033[1;31m"
+    LIGHT_GREEN = "\033[1;32m"
+    YELLOW = "\033[1;33m"
+    LIGHT_BLUE = "\033[1;34m"
+    LIGHT_PURPLE = "\033[1;35m"
+    LIGHT_CYAN = "\033[1;36m"
+    LIGHT_WHITE = "\033[1;37m"
+    BOLD = "\033[1m"
+    FAINT = "\033[2m"
+    ITALIC = "\033[3m"
+    UNDERLINE = "\033[4m"
+    BLINK = "\033[5m"
+    NEGATIVE = "\033[7m"
+    CROSSED = "\033[9m"
+    END = "\033[0m"
+    # cancel SGR codes if we don't write to a terminal
+    if not __import__("sys").stdout.isatty():
+        for _ in dir():
+            if isinstance(_, str) and _[0] != "_":
+                locals()[_] = ""
+    else:
+        # set Windows console in VT mode
+        if __import__("platform").system() == "Windows":
+            kernel32 = __import__("ctypes").windll.kernel32
+            kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
+            del kernel32
+
+
+class EventLog:
+    '''
+    records is a bounded ring buffer: if nothing drains it (or the simulation outruns the writer) the oldest records
+    fall off the end instead of memory growing forever. Nothing gets written anywhere until start() is called, so a
+    batch job can just leave the log off or look at records itself.
+    '''
+
+    def __init__(self, level=LEVEL_DEBUG, size=100000, batchInterval=0.05):
+        self.level = level
+        self.records = deque(maxlen=size)  # (tick, level, message template, args)
+        self.batchInterval = batchInterval  # Seconds the writer waits between batches
+        self.stream = sys.stdout
+        self.ownsStream = False
+
+        # Human pacing: at most this many lines per second reach the output, so a class can actually read along.
+        # 0 means write as fast as possible.
+        self.pacing = 0
+        self.paceBudget = 0.0
+        self.paceTime = monotonic()
+
+        self.writer = None
+        self.stopping = False
+        self.wake = threading.Event()
+        self.writeLock = threading.Lock()  # So flush() and the writer thread don't write the same batch twice
+
+    def log(self, level, tick, template, *args):
+        # This is the only part that runs on the simulation's side, keep it cheap.
+        if level >= self.level:
+            self.records.append((tick, level, template, args))
+
+    def openFile(self, path):
+        '''
+        Send output to a file instead of the console.
+        '''
+        with self.writeLock:
+            if self.ownsStream:
+                self.stream.close()
+            self.stream = open(path, "a")
+            self.ownsStream = True
+
+    def start(self, pacing=None):
+        '''
+        Starts the background writer. pacing is lines per second for classroom demos, 0 to write as fast as possible.
+        '''
+        if pacing is not None:
+            self.pacing = pacing
+            self.paceBudget = 0.0
+            self.paceTime = monotonic()
+        if self.writer is None:
+            self.stopping = False
+            self.writer = threading.Thread(target=self.writeLoop, name="EventLogWriter", daemon=True)
+            self.writer.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        '''
+        Stops the writer and writes out whatever is left, ignoring pacing.
+        '''
+        if self.writer is not None:
+            self.stopping = True
+            self.wake.set()
+            self.writer.join()
+            self.writer = None
+        self.flush()
+
+    def flush(self):
+        '''
+        Writes out everything in the buffer right now, ignoring pacing.
+        '''
+        self.writeBatch(len(self.records))
+
+    def writeLoop(self):
+        while not self.stopping:
+            self.wake.wait(self.batchInterval)
+            self.wake.clear()
+            if self.pacing:
+                now = monotonic()
+                # Don't let the budget build up while nothing is happening, or the next burst just floods out at once
+                self.paceBudget = min(self.paceBudget + (now - self.paceTime) * self.pacing, max(1.0, self.pacing))
+                self.paceTime = now
+                count = int(self.paceBudget)
+                self.paceBudget -= count
+            else:
+                count = len(self.records)
+            self.writeBatch(count)
+
+    def writeBatch(self, count):
+        records = self.records
+        with self.writeLock:
+            lines = []
+            for _ in range(count):
+                try:
+                    tick, level, template, args = records.popleft()
+                except IndexError:
+                    break
+                lines.append(template.format(*args, T=tick))
+            if lines:
+                lines.append("")
+                self.stream.write("\n".join(lines))
+                self.stream.flush()
+
+
+# The log everything in the simulator writes to.
+eventLog = EventLog()
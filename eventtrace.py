@@ -0,0 +1,534 @@
+# Event trace. Records everything that happens to a network while it runs (every message coming off the wire, every LSP
+# accepted, denied or aged out, ports going down, links coming and going) into append-only columns of fixed width values, so a
+# run can be looked back over tick by tick without simulating it again.
+#
+# A trace is a directory:
+#   one file per column in COLUMNS, value number n of every column together making up record n. Records are in the
+#   order things happened
+#   ticks        (tick, number of its first record) for every tick that has records, so a tick can be found without
+#                reading everything before it
+#   checkpoints  (tick, number of the first record after it) for every snapshot taken
+#   <tick>.snap  a checkpoint.save() snapshot of the network as it was at the start of that tick
+#   lsps         neighbor count, then (port, router ID, cost) for each neighbor, for every LSP any record points at
+#   lspindex     (originator ID, sequence number, offset into lsps) for every LSP in lsps
+# Records only say which LSP moved around (originator and sequence number), what was in it gets written to lsps once.
+#
+# What the columns of a record mean depends on its kind:
+#   DELIVER/LOST + message type   src sent it, dst got it (or didn't), srcPort/dstPort are the two ends of the wire.
+#                                 LSPs fill in origin, seq and age too, HELLOs and HELLO-ACKs fill in origin with the
+#                                 router the sender has heard on that link (0 for nobody), LSACKs fill in seq with how
+#                                 many LSPs they ack
+#   ACCEPT/DENY/FLUSH             dst took in (turned down, or threw out because it came in at MaxAge) origin's LSP
+#                                 seq, which came in on dstPort at age
+#   EXPIRE                        dst aged out origin's LSP seq
+#   ORIGINATE                     src made LSP seq
+# origin is always the LSP's ID (see simulation.lspID), which is just the originator's router ID without areas.
+#   NEIGHBOR                      src went Full with dst on srcPort, seq is the cost
+#   NEIGHBOR_DOWN                 src dropped the adjacency on srcPort (dead interval ran out, or the neighbor forgot src)
+#   PORT_DOWN                     src declared srcPort down
+#   LINK_UP/LINK_DOWN             link between src srcPort and dst dstPort was built or blown up, seq is the cost and
+#                                 age the delay
+#   LINK_COST                     link between src srcPort and dst dstPort got its cost changed to seq
+#   ROUTER_DOWN/ROUTER_UP         src failed (forgetting everything) or restarted. The links it loses or gets back have
+#                                 their own records right after
+#
+# Recording packs each record into a bytes object and appends it to a list (bytes aren't something the garbage collector
+# has to keep looking at, a list of tuples that size would set it off over and over). Those get turned into columns and
+# written out in batches. Reading maps the columns with numpy.memmap, so a trace with hundreds of millions of records never has to fit in
+# memory, and looking for one kind of record only ever reads the kind column. Seeking to a tick loads the checkpoint
+# before it and plays the records in between over it.
+
+## IMPORTS ##
+import os
+import mmap
+import struct
+
+import numpy
+
+import checkpoint
+from simulation import LSP, EventQueue, portName, portNumber
+
+## CONSTANTS ##
+
+# Ticks between the snapshots a trace takes. Seeking never has to replay more than this many ticks of records.
+CHECKPOINT_INTERVAL = 100
+
+# Records that pile up before they get written out
+FLUSH_RECORDS = 1 << 16
+
+# Records looked at in one go while replaying
+REPLAY_CHUNK = 1 << 22
+
+## FORMATS ##
+# (column, type). All little endian.
+COLUMNS = [
+    ("tick", "<i8"),
+    ("kind", "u1"),
+    ("src", "<u4"),
+    ("dst", "<u4"),
+    ("origin", "<u4"),
+    ("srcPort", "<u4"),
+    ("dstPort", "<u4"),
+    ("seq", "<u4"),
+    ("age", "<i2")
+]
+# How a record sits while it waits to be written out, one row with every column in it
+RECORD = struct.Struct("<qBIIIIIIh")
+RECORD_DTYPE = numpy.dtype(COLUMNS)
+
+TICK = struct.Struct("<qQ")  # tick, first record (same for checkpoints)
+LSP_INDEX = struct.Struct("<IIQ")  # originator ID, sequence number, offset
+COUNT = struct.Struct("<I")
+LSP_NEIGHBOR = struct.Struct("<III")  # port, router ID, cost
+
+NO_PORT = 0xFFFFFFFF
+
+TICK_DTYPE = numpy.dtype([("tick", "<i8"), ("first", "<u8")])
+LSP_INDEX_DTYPE = numpy.dtype([("origin", "<u4"), ("seq", "<u4"), ("offset", "<u8")])
+
+## RECORD KINDS ##
+TRACE_DELIVER = 0  # + message type
+TRACE_LOST = 4  # + message type
+TRACE_ACCEPT = 8
+TRACE_DENY = 9
+TRACE_FLUSH = 10
+TRACE_ORIGINATE = 11
+TRACE_NEIGHBOR = 12
+TRACE_PORT_DOWN = 13
+TRACE_LINK_UP = 14
+TRACE_LINK_DOWN = 15
+TRACE_EXPIRE = 16
+TRACE_NEIGHBOR_DOWN = 17
+TRACE_LINK_COST = 18
+TRACE_ROUTER_DOWN = 19
+TRACE_ROUTER_UP = 20
+
+KindToHumanReadable = {
+    TRACE_DELIVER: "DELIVER HELLO-ACK",
+    TRACE_DELIVER + 1: "DELIVER HELLO",
+    TRACE_DELIVER + 2: "DELIVER LSP",
+    TRACE_DELIVER + 3: "DELIVER LSACK",
+    TRACE_LOST: "LOST HELLO-ACK",
+    TRACE_LOST + 1: "LOST HELLO",
+    TRACE_LOST + 2: "LOST LSP",
+    TRACE_LOST + 3: "LOST LSACK",
+    TRACE_ACCEPT: "ACCEPT",
+    TRACE_DENY: "DENY",
+    TRACE_FLUSH: "FLUSH",
+    TRACE_ORIGINATE: "ORIGINATE",
+    TRACE_NEIGHBOR: "NEIGHBOR",
+    TRACE_PORT_DOWN: "PORT DOWN",
+    TRACE_LINK_UP: "LINK UP",
+    TRACE_LINK_DOWN: "LINK DOWN",
+    TRACE_EXPIRE: "EXPIRE",
+    TRACE_NEIGHBOR_DOWN: "NEIGHBOR DOWN",
+    TRACE_LINK_COST: "LINK COST",
+    TRACE_ROUTER_DOWN: "ROUTER DOWN",
+    TRACE_ROUTER_UP: "ROUTER UP"
+}
+
+# The kinds that change what the network looks like, everything else is just there to be looked at
+STATE_KINDS = [TRACE_ACCEPT, TRACE_FLUSH, TRACE_EXPIRE, TRACE_ORIGINATE, TRACE_NEIGHBOR, TRACE_NEIGHBOR_DOWN,
+               TRACE_PORT_DOWN, TRACE_LINK_UP, TRACE_LINK_DOWN, TRACE_LINK_COST, TRACE_ROUTER_DOWN, TRACE_ROUTER_UP]
+
+
+def snapshotPath(path, tick):
+    return os.path.join(path, f"{tick}.snap")
+
+
+class PortNumbers(dict):
+    # port name : port number, working them out the first time each one shows up
+    def __missing__(self, port):
+        number = self[port] = portNumber(port)
+        return number
+
+
+class TraceWriter:
+    '''
+    Records everything that happens to network into a new trace at path, starting now. It hooks itself in as
+    network.trace, and the network takes a snapshot through checkpoint() every checkpointInterval ticks.
+    Has to be started between ticks, and close()d at the end or the last batch never gets written.
+    '''
+
+    def __init__(self, path, network, checkpointInterval=CHECKPOINT_INTERVAL):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.network = network
+        self.checkpointInterval = checkpointInterval
+        self.columns = [open(os.path.join(path, name), "wb") for name, _ in COLUMNS]
+        self.ticks = open(os.path.join(path, "ticks"), "wb")
+        self.checkpoints = open(os.path.join(path, "checkpoints"), "wb")
+        self.lsps = open(os.path.join(path, "lsps"), "wb")
+        self.lspIndex = open(os.path.join(path, "lspindex"), "wb")
+
+        # Packed records that haven't been written out yet. Only deliveries (which everything else follows from) check
+        # if it's time to write them out.
+        self.pending = []
+        self.append = self.pending.append
+        self.pack = RECORD.pack
+        self.pendingLSPs = []
+        self.written = 0  # Records already in the files
+        self.lspsAt = 0  # Where the next LSP goes in lsps
+        self.known = set()  # (originator ID, sequence number) of every LSP already in lsps
+        self.lastTick = None
+        self.portNumbers = PortNumbers({None: NO_PORT})
+
+        network.trace = self
+        self.nextCheckpoint = network.T
+        self.checkpoint(network)
+
+    def checkpoint(self, network):
+        '''
+        Snapshots network. Called by Network.advance between ticks.
+        '''
+        checkpoint.save(network, snapshotPath(self.path, network.T))
+        self.checkpoints.write(TICK.pack(network.T, self.written + len(self.pending)))
+        self.nextCheckpoint = network.T + self.checkpointInterval
+
+    def keepLSP(self, lsp):
+        # Makes sure what's in lsp ends up in the trace, so records can just point at it
+        key = (lsp[2], lsp[0])
+        if key not in self.known:
+            self.known.add(key)
+            self.pendingLSPs.append(lsp)
+
+    def delivered(self, T, sender, reciever, args):
+        fromPort, toPort, messageType, data = args
+        ports = self.portNumbers
+        if messageType == 2:
+            self.append(self.pack(T, TRACE_DELIVER + 2, sender, reciever, data[0][2], ports[fromPort], ports[toPort],
+                                  data[0][0], data[1]))
+        elif messageType == 3:
+            self.append(self.pack(T, TRACE_DELIVER + 3, sender, reciever, 0, ports[fromPort], ports[toPort],
+                                  len(data), 0))
+        else:
+            self.append(self.pack(T, TRACE_DELIVER + messageType, sender, reciever, data[1], ports[fromPort],
+                                  ports[toPort], 0, 0))
+        if len(self.pending) >= FLUSH_RECORDS:
+            self.flush()
+
+    def lost(self, T, sender, reciever, args):
+        fromPort, toPort, messageType, data = args
+        ports = self.portNumbers
+        if messageType == 2:
+            self.append(self.pack(T, TRACE_LOST + 2, sender, reciever, data[0][2], ports[fromPort], ports[toPort],
+                                  data[0][0], data[1]))
+        elif messageType == 3:
+            self.append(self.pack(T, TRACE_LOST + 3, sender, reciever, 0, ports[fromPort], ports[toPort],
+                                  len(data), 0))
+        else:
+            self.append(self.pack(T, TRACE_LOST + messageType, sender, reciever, data[1], ports[fromPort],
+                                  ports[toPort], 0, 0))
+        if len(self.pending) >= FLUSH_RECORDS:
+            self.flush()
+
+    def accepted(self, T, router, port, lsp, age):
+        self.keepLSP(lsp)
+        self.append(self.pack(T, TRACE_ACCEPT, 0, router, lsp[2], NO_PORT, self.portNumbers[port], lsp[0], age))
+
+    def denied(self, T, router, port, lsp, age):
+        self.append(self.pack(T, TRACE_DENY, 0, router, lsp[2], NO_PORT, self.portNumbers[port], lsp[0], age))
+
+    def flushed(self, T, router, port, lsp, age):
+        self.append(self.pack(T, TRACE_FLUSH, 0, router, lsp[2], NO_PORT, self.portNumbers[port], lsp[0], age))
+
+    def expired(self, T, router, lsp):
+        self.append(self.pack(T, TRACE_EXPIRE, 0, router, lsp[2], NO_PORT, NO_PORT, lsp[0], 0))
+
+    def originated(self, T, router, lsp):
+        self.keepLSP(lsp)
+        self.append(self.pack(T, TRACE_ORIGINATE, router, 0, lsp[2], NO_PORT, NO_PORT, lsp[0], 0))
+
+    def neighborUp(self, T, router, port, neighbor, cost):
+        self.append(self.pack(T, TRACE_NEIGHBOR, router, neighbor, 0, self.portNumbers[port], NO_PORT, cost, 0))
+
+    def neighborDown(self, T, router, port):
+        self.append(self.pack(T, TRACE_NEIGHBOR_DOWN, router, 0, 0, self.portNumbers[port], NO_PORT, 0, 0))
+
+    def portDown(self, T, router, port):
+        self.append(self.pack(T, TRACE_PORT_DOWN, router, 0, 0, self.portNumbers[port], NO_PORT, 0, 0))
+
+    def linkUp(self, T, link):
+        self.append(self.pack(T, TRACE_LINK_UP, link.R1, link.R2, 0, self.portNumbers[link.P1],
+                              self.portNumbers[link.P2], link.cost, link.delay))
+
+    def linkDown(self, T, link):
+        self.append(self.pack(T, TRACE_LINK_DOWN, link.R1, link.R2, 0, self.portNumbers[link.P1],
+                              self.portNumbers[link.P2], link.cost, link.delay))
+
+    def linkCost(self, T, link):
+        self.append(self.pack(T, TRACE_LINK_COST, link.R1, link.R2, 0, self.portNumbers[link.P1],
+                              self.portNumbers[link.P2], link.cost, link.delay))
+
+    def routerDown(self, T, router):
+        self.append(self.pack(T, TRACE_ROUTER_DOWN, router, 0, 0, NO_PORT, NO_PORT, 0, 0))
+
+    def routerUp(self, T, router):
+        self.append(self.pack(T, TRACE_ROUTER_UP, router, 0, 0, NO_PORT, NO_PORT, 0, 0))
+
+    def flush(self):
+        '''
+        Turns everything that piled up into columns and writes them out.
+        '''
+        for lsp in self.pendingLSPs:
+            SeqN, NeighborData, SenderID = lsp
+            data = bytearray(COUNT.size + LSP_NEIGHBOR.size * len(NeighborData))
+            COUNT.pack_into(data, 0, len(NeighborData))
+            offset = COUNT.size
+            for port, adj, cost in NeighborData:
+                LSP_NEIGHBOR.pack_into(data, offset, self.portNumbers[port], adj, cost)
+                offset += LSP_NEIGHBOR.size
+            self.lsps.write(data)
+            self.lspIndex.write(LSP_INDEX.pack(SenderID, SeqN, self.lspsAt))
+            self.lspsAt += len(data)
+        self.pendingLSPs = []
+
+        if not self.pending:
+            return None
+        rows = numpy.frombuffer(b"".join(self.pending), RECORD_DTYPE)
+        for file, (name, _) in zip(self.columns, COLUMNS):
+            file.write(rows[name].tobytes())
+
+        ticks = rows["tick"]
+        starts = numpy.flatnonzero(ticks[1:] != ticks[:-1]) + 1
+        if ticks[0] != self.lastTick:
+            starts = numpy.concatenate(([0], starts))
+        index = numpy.empty(len(starts), TICK_DTYPE)
+        index["tick"] = ticks[starts]
+        index["first"] = starts + self.written
+        self.ticks.write(index.tobytes())
+        self.lastTick = int(ticks[-1])
+        self.written += len(rows)
+        self.pending.clear()
+
+    def close(self):
+        '''
+        Writes out whatever is left and stops recording.
+        '''
+        self.flush()
+        if self.lastTick is None or self.network.T > self.lastTick:
+            # So a reader knows how far the trace goes even if nothing happened at the end
+            self.ticks.write(TICK.pack(self.network.T, self.written))
+        for file in self.columns + [self.ticks, self.checkpoints, self.lsps, self.lspIndex]:
+            file.close()
+        if self.network.trace is self:
+            self.network.trace = None
+
+
+def mapFile(path, dtype):
+    # Maps a whole file of dtype values read only. An empty file can't be mapped, so that's just an empty array.
+    if os.path.getsize(path) == 0:
+        return numpy.zeros(0, dtype)
+    return numpy.memmap(path, dtype=dtype, mode="r")
+
+
+class TraceReader:
+    '''
+    An open trace. networkAt(tick) gives back the network as it was at the start of tick, built from the checkpoint
+    before it plus every record in between, and records(start, end) the raw records of a range of ticks.
+    The networks it hands out are for looking at, stepping them doesn't carry on the recorded run.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = {name: mapFile(os.path.join(path, name), dtype) for name, dtype in COLUMNS}
+        ticks = numpy.fromfile(os.path.join(path, "ticks"), TICK_DTYPE)
+        self.tickTimes = numpy.array(ticks["tick"])
+        self.tickFirsts = numpy.array(ticks["first"])
+        checkpoints = numpy.fromfile(os.path.join(path, "checkpoints"), TICK_DTYPE)
+        if len(checkpoints) == 0:
+            raise ValueError(f"{path} has no checkpoints, it isn't a trace")
+        self.checkpointTimes = numpy.array(checkpoints["tick"])
+        self.checkpointFirsts = numpy.array(checkpoints["first"])
+
+        # Sorted by (originator, sequence number) packed into one key, so finding an LSP is a binary search
+        index = numpy.fromfile(os.path.join(path, "lspindex"), LSP_INDEX_DTYPE)
+        keys = (index["origin"].astype(numpy.uint64) << numpy.uint64(32)) | index["seq"].astype(numpy.uint64)
+        order = numpy.argsort(keys, kind="stable")
+        self.lspKeys = keys[order]
+        self.lspOffsets = index["offset"][order]
+        lspPath = os.path.join(path, "lsps")
+        if os.path.getsize(lspPath):
+            with open(lspPath, "rb") as file:
+                self.lspMap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.lspMap = b""
+        self.lspCache = {}  # (originator, sequence number) : LSP, so every router gets the same object
+
+        self.firstTick = int(self.checkpointTimes[0])
+        self.lastTick = int(self.checkpointTimes[-1])
+        if len(self.tickTimes):
+            self.lastTick = max(self.lastTick, int(self.tickTimes[-1]))
+        if len(self):
+            self.lastTick = max(self.lastTick, int(self.columns["tick"][-1]) + 1)
+
+        # The last network handed out, so scrubbing forward only has to play the records since then
+        self.network = None
+        self.networkCheckpoint = None
+        self.networkTick = None
+        self.networkEnd = None
+
+    def __len__(self):
+        return len(self.columns["kind"])
+
+    def recordAt(self, tick):
+        '''
+        Number of the first record on or after tick.
+        '''
+        i = numpy.searchsorted(self.tickTimes, tick, "left")
+        if i == len(self.tickTimes):
+            return len(self)
+        return int(self.tickFirsts[i])
+
+    def records(self, start, end=None):
+        '''
+        The records from tick start up to (not including) tick end (just tick start without one), as column : numpy
+        array. The arrays are still mapped from the files, nothing gets read until it's looked at.
+        '''
+        first = self.recordAt(start)
+        last = self.recordAt(start + 1 if end is None else end)
+        return {name: column[first:last] for name, column in self.columns.items()}
+
+    def lsp(self, origin, seq):
+        key = (origin, seq)
+        lsp = self.lspCache.get(key)
+        if lsp is None:
+            packed = numpy.uint64((origin << 32) | seq)
+            i = numpy.searchsorted(self.lspKeys, packed)
+            if i == len(self.lspKeys) or self.lspKeys[i] != packed:
+                raise ValueError(f"trace {self.path} is missing router {origin}'s LSP {seq}")
+            offset = int(self.lspOffsets[i])
+            count = COUNT.unpack_from(self.lspMap, offset)[0]
+            offset += COUNT.size
+            neighbors = []
+            for _ in range(count):
+                port, adj, cost = LSP_NEIGHBOR.unpack_from(self.lspMap, offset)
+                offset += LSP_NEIGHBOR.size
+                neighbors.append((portName(port), adj, cost))
+            lsp = self.lspCache[key] = LSP(origin, tuple(neighbors), seq)
+        return lsp
+
+    def networkAt(self, tick):
+        '''
+        The network as it was at the start of tick (clamped to the ticks the trace covers).
+        Going forward from the last network this handed out just plays the records since then over that same network,
+        anything else starts over from the checkpoint before tick.
+        '''
+        tick = min(max(tick, self.firstTick), self.lastTick)
+        i = int(numpy.searchsorted(self.checkpointTimes, tick, "right")) - 1
+        end = self.recordAt(tick)
+        if self.network is None or i != self.networkCheckpoint or tick < self.networkTick:
+            self.network = checkpoint.load(snapshotPath(self.path, int(self.checkpointTimes[i])))
+            self.networkCheckpoint = i
+            self.networkEnd = int(self.checkpointFirsts[i])
+        self.replay(self.network, self.networkEnd, end)
+        self.network.T = tick
+        self.networkTick = tick
+        self.networkEnd = end
+        return self.network
+
+    def replay(self, network, start, end):
+        '''
+        Plays records start to end over network. Only the kinds that change something get read past the kind column.
+        Shortest path trees get worked out once at the end, for whoever's LSDB changed.
+        Whatever the routers schedule while this goes on (SPF runs, LSPs to put out) already has its own records, so it
+        goes into a scratch queue that gets thrown away, and network.events keeps just what the checkpoint had.
+        '''
+        events, network.events = network.events, EventQueue()
+        try:
+            self.playRecords(network, start, end)
+        finally:
+            network.events = events
+
+    def playRecords(self, network, start, end):
+        '''
+        The actual replay, see replay.
+        '''
+        touched = set()
+        names = [name for name, _ in COLUMNS]
+        for chunk in range(start, end, REPLAY_CHUNK):
+            kinds = self.columns["kind"][chunk:min(end, chunk + REPLAY_CHUNK)]
+            rows = numpy.flatnonzero(numpy.isin(kinds, STATE_KINDS)) + chunk
+            columns = [self.columns[name][rows].tolist() for name in names]
+            for T, kind, src, dst, origin, srcPort, dstPort, seq, age in zip(*columns):
+                network.T = T
+                if kind == TRACE_ACCEPT:
+                    R = network.getRouter(dst)
+                    R.nodeLSPs[origin] = self.lsp(origin, seq)
+                    R.recalculateRouting(origin)
+                    touched.add(dst)
+                elif kind == TRACE_FLUSH or kind == TRACE_EXPIRE:
+                    R = network.getRouter(dst)
+                    del R.nodeLSPs[origin]
+                    R.recalculateRouting(origin)
+                    touched.add(dst)
+                elif kind == TRACE_ORIGINATE:
+                    R = network.getRouter(src)
+                    R.nodeLSPs[origin] = self.lsp(origin, seq)
+                    R.currentCounter = seq + 1
+                    R.recalculateRouting(origin)
+                    touched.add(src)
+                elif kind == TRACE_NEIGHBOR:
+                    R = network.getRouter(src)
+                    port = portName(srcPort)
+                    R.neighbors[port] = (dst, seq)
+                    R.trackArea(port, dst)
+                elif kind == TRACE_NEIGHBOR_DOWN or kind == TRACE_PORT_DOWN:
+                    R = network.getRouter(src)
+                    port = portName(srcPort)
+                    if kind == TRACE_PORT_DOWN:
+                        R.ActivePorts.pop(port, None)
+                    neighbor = R.neighbors.pop(port, None)
+                    if neighbor is not None:
+                        # Leaving an area drops its LSPs without any records, same as in the run
+                        R.untrackArea(port, neighbor[0])
+                        touched.add(src)
+                elif kind == TRACE_LINK_UP:
+                    network.buildConnection(seq, src, portName(srcPort), dst, portName(dstPort), age)
+                elif kind == TRACE_LINK_DOWN:
+                    network.blowUpLink(network.links.ports[(src, portName(srcPort))])
+                elif kind == TRACE_LINK_COST:
+                    P1, P2 = portName(srcPort), portName(dstPort)
+                    network.setLinkCost(network.links.ports[(src, P1)], seq)
+                    for R, port in ((network.getRouter(src), P1), (network.getRouter(dst), P2)):
+                        neighbor = R.neighbors.get(port)
+                        if neighbor is not None:
+                            R.neighbors[port] = (neighbor[0], seq)
+                elif kind == TRACE_ROUTER_DOWN:
+                    # Just the router, its links come down with the LINK_DOWN records after this one
+                    network.takeDown(src)
+                elif kind == TRACE_ROUTER_UP:
+                    network.bringUp(src)
+                    # The LSP it puts out when it comes back up has its own ORIGINATE record
+                    network.getRouter(src).LSPScheduled = False
+
+        for ID in sorted(touched):
+            R = network.getRouter(ID)
+            if R.SPFScheduled:
+                R.SPFScheduled = False
+                R.runSPF()
+                if network.areaCount > 1:
+                    R.interAreaRouting()
+                network.updateSync(R)
+
+
+if __name__ == "__main__":
+    # Records a headless run until it converges, then reads it back. python eventtrace.py [trace directory]
+    import sys
+    from collections import Counter
+    from simulation import Network, ROUTERCOUNT, EDGECOUNT
+    from eventlog import eventLog, LEVEL_WARNING
+
+    eventLog.level = LEVEL_WARNING
+    eventLog.start()
+    path = sys.argv[1] if len(sys.argv) > 1 else "ospf.trace"
+    FullNetwork = Network(ROUTERCOUNT, EDGECOUNT, seed=1)
+    writer = TraceWriter(path, FullNetwork)
+    FullNetwork.run_until_converged()
+    writer.close()
+
+    reader = TraceReader(path)
+    kinds = Counter(reader.columns["kind"].tolist())
+    print(f"{len(reader)} records over ticks {reader.firstTick} to {reader.lastTick} in {path}")
+    for kind in sorted(kinds):
+        print(f"{KindToHumanReadable[kind]:>18} {kinds[kind]}")
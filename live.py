@@ -0,0 +1,333 @@
+# Live mode: every router gets its own UDP socket on 127.0.0.1 and messages actually go over loopback, so the protocol
+# runs under real I/O scheduling (and real packet loss, if the socket buffers ever fill up) instead of the event queue
+# handing messages straight to the next router.
+#
+# The network still runs on ticks, each one TICK_SECONDS of wall time. Timers (hellos, LSP refreshes, SPF, acks, the
+# timing wheel) work the same as always, only messages are different: a router sending one doesn't put an
+# EVENT_DELIVER in the queue, LiveQueue packs it (with wire.py, straight into a datagram sized buffer) to go out of the
+# sender's socket at the end of the tick, along with everything else it sent the same router that tick. Whatever
+# comes in on a router's socket gets decoded right out of the datagram and handled on the next tick. Link delays don't
+# mean anything here, a message takes however long loopback takes.
+#
+#   python live.py                              a small network, live until it converges plus a bit
+#   python live.py --routers 200 --edges 600 --ticks 500
+#
+# Every router is a socket, so the process needs a file descriptor each (ulimit -n).
+
+## IMPORTS ##
+import socket
+import struct
+import asyncio
+import argparse
+from array import array
+from heapq import heappush, heapify
+from time import perf_counter
+
+from simulation import Network, EventQueue, EVENT_DELIVER, ROUTERCOUNT, EDGECOUNT
+from eventlog import eventLog, LEVEL_OFF, LEVEL_WARNING
+from topologies import randomGraph, TopologyGenerators
+import wire
+
+## CONSTANTS ##
+
+# Wall time per tick. Anything that takes longer than this to process just makes that tick run long.
+TICK_SECONDS = 0.01
+
+# Biggest datagram a router sends. Messages for the same router past this go in another one.
+DATAGRAM_SIZE = 1 << 14
+
+# Receive buffer every router's socket asks for, so a burst (E.G. every router flooding its LSDB at once on a cold
+# start) doesn't get dropped on the floor before the loop gets around to reading it
+RECEIVE_BUFFER = 1 << 20
+
+HOST = "127.0.0.1"
+
+## FORMATS ##
+# Every datagram starts with this, then that many wire.py records. All little endian.
+DATAGRAM = struct.Struct("<dI")  # perf_counter() when it was sent, record count
+
+
+class LiveQueue(EventQueue):
+    '''
+    The network's event queue in live mode. Deliveries get set aside in outgoing[(sender, reciever)] to go out over the
+    sockets at the end of the tick, everything else goes in the heap like normal.
+    '''
+
+    def __init__(self, heap=()):
+        self.heap = list(heap)
+        heapify(self.heap)
+        self.outgoing = {}
+
+    def push(self, time, target, origin, counter, eventType, args=()):
+        if eventType == EVENT_DELIVER:
+            batch = self.outgoing.get((origin, target))
+            if batch is None:
+                batch = self.outgoing[(origin, target)] = []
+            batch.append((time, target, origin, counter, args))
+        else:
+            heappush(self.heap, (time, target, origin, counter, eventType, args))
+
+
+class RouterEndpoint(asyncio.DatagramProtocol):
+    '''
+    One router's socket. Anything that comes in gets decoded straight out of the datagram into the network's queue.
+    '''
+
+    def __init__(self, live, ID):
+        self.live = live
+        self.ID = ID
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+
+    def datagram_received(self, data, addr):
+        live = self.live
+        received = perf_counter()
+        view = memoryview(data)
+        sentAt, count = DATAGRAM.unpack_from(view, 0)
+        live.latencies.append(received - sentAt)
+        live.packetsReceived += 1
+        live.messagesReceived += count
+        # It gets handled on whatever tick the network is about to run
+        T = live.network.T
+        heap = live.events.heap
+        for _, target, origin, counter, eventType, args in wire.decode(view, DATAGRAM.size, len(view), live.lsps):
+            heappush(heap, (T, target, origin, counter, eventType, args))
+
+    def error_received(self, exc):
+        self.live.errors += 1
+
+
+class LiveNetwork:
+    '''
+    A Network whose routers talk over UDP. Same arguments as Network plus how long a tick is. start() opens every
+    router's socket, run() steps the network in real time, close() shuts the sockets again.
+
+    addresses[router ID] is the (host, port) of the router's socket, and which router is on the other end of a port
+    still comes out of the link table, so together they take a router and a port to a socket address (see address).
+    '''
+
+    def __init__(self, RouterCount, ConnectionCount, generator=randomGraph, seed=None, areas=1,
+                 tickSeconds=TICK_SECONDS):
+        self.network = Network(RouterCount, ConnectionCount, generator, seed, areas)
+        self.events = LiveQueue(self.network.events.heap)
+        self.network.events = self.events
+        self.tickSeconds = tickSeconds
+        self.endpoints = [None] * (self.network.size + 1)  # router ID : RouterEndpoint
+        self.addresses = [None] * (self.network.size + 1)  # router ID : (host, port)
+        self.lsps = {}  # Last LSP decoded from each originator, see wire.decode
+        self.buffer = bytearray(DATAGRAM_SIZE)  # Every datagram gets packed in here before it goes out
+
+        # What actually happened on the sockets
+        self.packetsSent = 0
+        self.packetsReceived = 0
+        self.messagesSent = 0
+        self.messagesReceived = 0
+        self.bytesSent = 0
+        self.errors = 0
+        self.latencies = array("d")  # Seconds from sendto to datagram_received, for every datagram
+        self.lateTicks = 0  # Ticks that took longer than tickSeconds to run
+        self.seconds = 0.0  # Wall time spent in run
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for ID in range(1, self.network.size + 1):
+            transport, endpoint = await loop.create_datagram_endpoint(
+                lambda ID=ID: RouterEndpoint(self, ID), local_addr=(HOST, 0))
+            self.endpoints[ID] = endpoint
+            self.addresses[ID] = transport.get_extra_info("sockname")
+
+    def close(self):
+        for endpoint in self.endpoints:
+            if endpoint is not None and endpoint.transport is not None:
+                endpoint.transport.close()
+
+    def address(self, router, port):
+        # The socket address of whoever is on the other end of router's port, or None if nothing is plugged in
+        link = self.network.links.get(router, port)
+        if link is None:
+            return None
+        return self.addresses[link.far(router)[0]]
+
+    def flush(self):
+        '''
+        Sends everything the routers sent this tick. Everything from one router to another goes in as few datagrams as
+        it fits in, each one packed straight into self.buffer.
+        '''
+        outgoing = self.events.outgoing
+        self.events.outgoing = {}
+        buffer = self.buffer
+        view = memoryview(buffer)
+        for (origin, target), batch in outgoing.items():
+            transport = self.endpoints[origin].transport
+            address = self.addresses[target]
+            offset = DATAGRAM.size
+            count = 0
+            for time, target, origin, counter, args in batch:
+                size = wire.recordSize(args)
+                if count and offset + size > DATAGRAM_SIZE:
+                    self.send(transport, address, view, offset, count)
+                    offset = DATAGRAM.size
+                    count = 0
+                if offset + size > len(buffer):
+                    # One message bigger than a whole datagram (an LSP from a router with thousands of neighbors)
+                    view.release()  # A bytearray can't grow while anything is looking at it
+                    buffer.extend(bytes(offset + size - len(buffer)))
+                    view = memoryview(buffer)
+                offset = wire.encodeInto(buffer, offset, time, target, origin, counter, args)
+                count += 1
+            self.send(transport, address, view, offset, count)
+            self.messagesSent += len(batch)
+        view.release()
+
+    def send(self, transport, address, view, end, count):
+        DATAGRAM.pack_into(view, 0, perf_counter(), count)
+        transport.sendto(view[:end], address)  # Copied out right away (or into asyncio's own buffer if it can't be)
+        self.packetsSent += 1
+        self.bytesSent += end
+
+    async def run(self, ticks):
+        '''
+        Steps the network ticks ticks, one every tickSeconds. Returns the tick it ended on.
+        '''
+        loop = asyncio.get_running_loop()
+        network = self.network
+        started = loop.time()
+        startTick = network.T
+        for _ in range(ticks):
+            network.advance(network.T + 1)
+            self.flush()
+            # Sleeping (even for 0) is what lets the loop read the sockets, but it only reads one datagram per socket
+            # each time around, so keep going around until a pass comes back with nothing. Otherwise a tick that runs
+            # long leaves everything it sent sitting in the socket buffers and the next one sends even more.
+            received = -1
+            while received != self.packetsReceived:
+                received = self.packetsReceived
+                await asyncio.sleep(0)
+            wait = started + (network.T - startTick) * self.tickSeconds - loop.time()
+            if wait < 0:
+                self.lateTicks += 1
+            await asyncio.sleep(max(wait, 0))
+        self.seconds += loop.time() - started
+        return network.T
+
+    async def run_until_converged(self, maxTicks=10000):
+        '''
+        Steps the network until every router is in sync, or maxTicks. Returns the tick it converged on, or None.
+        '''
+        for _ in range(maxTicks):
+            if self.network.isConverged():
+                return self.network.T
+            await self.run(1)
+        return None
+
+    def report(self):
+        '''
+        What happened on the sockets, as a dict: packets and messages per second of run time, and datagram latency.
+        '''
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else None
+
+        seconds = self.seconds or None
+        return {
+            "routers": self.network.size,
+            "ticks": self.network.T,
+            "seconds": self.seconds,
+            "lateTicks": self.lateTicks,
+            "packetsSent": self.packetsSent,
+            "packetsReceived": self.packetsReceived,
+            "packetsLost": self.packetsSent - self.packetsReceived,
+            "messagesSent": self.messagesSent,
+            "messagesPerPacket": self.messagesSent / self.packetsSent if self.packetsSent else None,
+            "packetsPerSecond": self.packetsSent / seconds if seconds else None,
+            "messagesPerSecond": self.messagesSent / seconds if seconds else None,
+            "bytesPerSecond": self.bytesSent / seconds if seconds else None,
+            "latencyMean": sum(latencies) / len(latencies) if latencies else None,
+            "latencyP50": percentile(0.5),
+            "latencyP99": percentile(0.99),
+            "latencyMax": latencies[-1] if latencies else None,
+            "socketErrors": self.errors
+        }
+
+
+def codecThroughput(network, rounds=20):
+    '''
+    How fast wire.py packs and unpacks messages, with no sockets involved: one of every LSP in router 1's LSDB plus a
+    hello and an ack for each, encoded into a datagram sized buffer over and over and decoded back out.
+    Returns (messages encoded per second, messages decoded per second, bytes per message).
+    '''
+    lsps = list(network.getRouter(1).nodeLSPs.values())
+    messages = []
+    for ThisLSP in lsps:
+        messages.append(("A", "B", 2, (ThisLSP, 1)))
+        messages.append(("A", "B", 1, (ThisLSP[2], 1)))
+        messages.append(("A", "B", 3, ((ThisLSP[2], ThisLSP[0]),)))
+    size = sum(wire.recordSize(args) for args in messages)
+    buffer = bytearray(size)
+
+    started = perf_counter()
+    for _ in range(rounds):
+        offset = 0
+        for counter, args in enumerate(messages):
+            offset = wire.encodeInto(buffer, offset, 0, 1, 2, counter, args)
+    encodeSeconds = perf_counter() - started
+
+    view = memoryview(buffer)
+    decoded = {}
+    started = perf_counter()
+    for _ in range(rounds):
+        for _ in wire.decode(view, 0, size, decoded):
+            pass
+    decodeSeconds = perf_counter() - started
+
+    total = rounds * len(messages)
+    return total / encodeSeconds, total / decodeSeconds, size / len(messages)
+
+
+async def main(args):
+    live = LiveNetwork(args.routers, args.edges, TopologyGenerators[args.generator], args.seed, args.areas,
+                       args.tick_seconds)
+    await live.start()
+    try:
+        convergedAt = await live.run_until_converged(args.ticks)
+        if args.extra:
+            await live.run(args.extra)
+        # One last look at the sockets for anything still in flight
+        await asyncio.sleep(live.tickSeconds)
+    finally:
+        live.close()
+    report = live.report()
+    print(f"{report['routers']} routers over UDP, converged at tick {convergedAt}, ran {report['ticks']} ticks in "
+          f"{report['seconds']:.2f}s ({report['lateTicks']} ran long)")
+    print(f"{report['packetsSent']} packets ({report['packetsLost']} lost), {report['messagesSent']} messages, "
+          f"{report['messagesPerPacket'] or 0:.2f} messages per packet")
+    print(f"{report['packetsPerSecond'] or 0:.0f} packets/s, {report['messagesPerSecond'] or 0:.0f} messages/s, "
+          f"{(report['bytesPerSecond'] or 0) / 2 ** 20:.2f} MiB/s")
+    if report["latencyMean"] is not None:
+        print(f"latency mean {report['latencyMean'] * 1e3:.3f} ms, p50 {report['latencyP50'] * 1e3:.3f} ms, "
+              f"p99 {report['latencyP99'] * 1e3:.3f} ms, max {report['latencyMax'] * 1e3:.3f} ms")
+    encodeRate, decodeRate, perMessage = codecThroughput(live.network)
+    print(f"codec: {encodeRate:.0f} messages/s encoding, {decodeRate:.0f} messages/s decoding, "
+          f"{perMessage:.1f} bytes per message")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the OSPF simulator with routers on loopback UDP sockets")
+    parser.add_argument("--routers", type=int, default=ROUTERCOUNT)
+    parser.add_argument("--edges", type=int, default=EDGECOUNT)
+    parser.add_argument("--generator", default="random", choices=sorted(TopologyGenerators))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--areas", type=int, default=1, help="OSPF areas to split the network into")
+    parser.add_argument("--ticks", type=int, default=1000, help="most ticks to wait for convergence")
+    parser.add_argument("--extra", type=int, default=100, help="ticks to keep running after converging")
+    parser.add_argument("--tick-seconds", type=float, default=TICK_SECONDS)
+    parser.add_argument("--log", action="store_true", help="print the event log too")
+    args = parser.parse_args()
+    eventLog.level = LEVEL_WARNING if args.log else LEVEL_OFF
+    eventLog.start()
+    asyncio.run(main(args))
@@ -1,42 +1,101 @@
 # Bootleg packet tracer (Real)
 
+# This is the pygame viewer. All the actual simulation stuff lives in simulation.py, this file just draws it
+# and steps it when you press space (or every frame, with AUTO). SCENARIO plays a scenario.py script of cuts, failures
+# and cost changes against it as it goes.
+# It can also play back a run recorded with eventtrace.py instead (see REPLAY): the arrow keys move through it a tick
+# (left/right) or ten ticks (down/up) at a time, page down/up a hundred, home and end jump to the start and the end.
+# P turns the performance overlay (ticks/sec, messages/tick and the slowest routers, see profiler.py) on and off.
+# Clicking a router selects it (clicking it again, or nothing, goes back to the full network). The mouse wheel or + and -
+# zoom, dragging with the right or middle button pans, F zooms to fit everything and L turns the force directed layout
+# on and off.
+
 ## IMPORTS ##
 import pygame
 from pygame.locals import *
-from time import sleep
-from random import randint, sample, choice
 import sys
+from collections import OrderedDict
+
+from simulation import Network, DX, DY, ROUTERCOUNT, EDGECOUNT
+from eventlog import eventLog, LEVEL_DEBUG
+from topologies import TopologyGenerators
+from profiler import Profiler
+from viewport import Viewport, GridIndex, LinkIndex, ForceLayout, palette
 
 ## CONSTANTS ##
 
-# The number of ticks between HELLOs for the Router. Routers start with a random offset.
-ROUTER_HELLO_INTERVAL = 5
+# Run the sim automatically without user input, a tick every frame, blowing up and building random connections as it
+# goes. They get picked with the network's rng, so with a SEED the same frames make the same run.
+AUTO = False
 
-# The number of ticks between auto generated LSPs for the Router.
-ROUTER_LSP_INTERVAL = 50
+FPS = 15  # Guess.
 
-# Display verbose console messages (E.G. Denial of LSP, notification on Routers saying Hello, longer LSP accept messages, etc.)
-VERBOSE = False
+# What shape of network to build, any name out of topologies.TopologyGenerators (random, tree, star, ring, grid,
+# waxman, ba, fattree).
+TOPOLOGY = "random"
 
-# Display non-critical console messages (E.G. Acceptance of LSP, notification of successful HELLOs, etc.)
-DEBUG = True
+# Same seed, same network (and the same run). None for a different one every time.
+SEED = None
 
-# Run the sim automatically without user input. I don't think this one works, actually.
-AUTO = False
+# How many OSPF areas to split the network into (see topologies.assignAreas). With more than one, routers and the links
+# in a router's view get colored by area instead of by router.
+AREAS = 1
 
-FPS = 15  # Guess.
-DX = 750  # X resolution
-DY = 750  # Y resolutoin
+# How many routers' views to keep drawn in memory, so flipping between a few routers doesn't redraw them every time
+OVERLAY_CACHE_SIZE = 8
+
+# Console messages per second, so the output can actually be read along with the sim. 0 to print as fast as possible.
+LOG_PACING = 10
+
+# How much gets printed. LEVEL_VERBOSE for everything (E.G. Denial of LSP, routers saying hello), LEVEL_DEBUG for the
+# normal stuff (E.G. Acceptance of LSP, new connections), LEVEL_WARNING for only things breaking.
+LOG_LEVEL = LEVEL_DEBUG
+
+# Directory to record the run into (see eventtrace.py), or None to not record anything
+TRACE = None
+
+# Directory of a recorded run to play back instead of running a new network, or None
+REPLAY = None
+
+# Scenario file (see scenario.py) to play against the network as it ticks, or None. Its cuts, failures and cost changes
+# happen on the ticks it says, whether those come from space or AUTO.
+SCENARIO = None
 
-ROUTERCOUNT = 6
-EDGECOUNT = 12
+# Start with the performance overlay on. It can still be turned on and off with P, it just costs a little while it's on.
+PROFILE = False
+
+# File to write the per tick profile out to (CSV, or JSON if it ends in .json) whenever the overlay gets turned off or
+# the window gets closed, or None. It only has the ticks from the last time the overlay was on.
+PROFILE_EXPORT = None
+
+# How many of the slowest routers the overlay lists
+SLOWEST_ROUTERS = 3
+
+# Radius of a router, in world units
+NODE_RADIUS = 20
+
+# Networks with more routers than this start zoomed out to fit, smaller ones start at 1 to 1 like they always did
+FIT_ABOVE = 16
+
+# Zoomed out past this, routers are just dots and links get bundled. Past TEXT_ZOOM router IDs stop getting drawn.
+DETAIL_ZOOM = 0.25
+TEXT_ZOOM = 0.6
+
+# Size of the screen squares links get bundled by when zoomed out, and the widest a bundle gets drawn
+BUNDLE_PIXELS = 16
+MAX_BUNDLE_WIDTH = 8
+
+# How close a click has to be to a router to select it, in screen pixels (or NODE_RADIUS, if that's bigger on screen)
+PICK_PIXELS = 8
+
+# How much one notch of the mouse wheel (or + and -) zooms
+ZOOM_STEP = 1.25
+
+# Start with the force directed layout running (L turns it on and off)
+LAYOUT = False
 
 ## REFERENCE DICTONARIES ##
-MessageTypeToHumanReadable = {
-    0: "HELLO-ACK",
-    1: "HELLO",
-    2: "LSP"
-}
+# The first 16 routers keep the colors they always had, any past that get theirs from viewport.palette
 IDToColorTuples = {
     1: (255, 0, 0),
     2: (255, 128, 0),
@@ -57,472 +116,445 @@ IDToColorTuples = {
 }
 ## VARIABLES ##
 SelectedRouter = 0
-T = 0  # Tick
-
-# SGR color constants
-# rene-d 2018
-# Taken from https://gist.github.com/rene-d/9e584a7dd2935d0f461904b9f2950007
-
-
-class C:
-    """ ANSI color codes, to make those pretty status messages. """
-    BLACK = "\033[0;30m"
-    RED = "\033[0;31m"
-    GREEN = "\033[0;32m"
-    BROWN = "\033[0;33m"
-    BLUE = "\033[0;34m"
-    PURPLE = "\033[0;35m"
-    CYAN = "\033[0;36m"
-    LIGHT_GRAY = "\033[0;37m"
-    DARK_GRAY = "\033[1;30m"
-    LIGHT_RED = "\033[1;31m"
-    LIGHT_GREEN = "\033[1;32m"
-    YELLOW = "\033[1;33m"
-    LIGHT_BLUE = "\033[1;34m"
-    LIGHT_PURPLE = "\033[1;35m"
-    LIGHT_CYAN = "\033[1;36m"
-    LIGHT_WHITE = "\033[1;37m"
-    BOLD = "\033[1m"
-    FAINT = "\033[2m"
-    ITALIC = "\033[3m"
-    UNDERLINE = "\033[4m"
-    BLINK = "\033[5m"
-    NEGATIVE = "\033[7m"
-    CROSSED = "\033[9m"
-    END = "\033[0m"
-    # cancel SGR codes if we don't write to a terminal
-    if not __import__("sys").stdout.isatty():
-        for _ in dir():
-            if isinstance(_, str) and _[0] != "_":
-                locals()[_] = ""
-    else:
-        # set Windows console in VT mode
-        if __import__("platform").system() == "Windows":
-            kernel32 = __import__("ctypes").windll.kernel32
-            kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
-            del kernel32
 
 
-def prettyPrint(toPrint):
+class Renderer:
     '''
-    Print function, but with a sleep command so that the entire console output isnt instantly filled with 852 messages.
+    Draws the part of the network inside the viewport in layers, and only redraws the layers that actually changed:
+    - the topology is only redrawn when a connection gets built or blown up, or the view moves
+    - a router's view of the network is only redrawn when that router's LSDB changes or the view moves (and a few are
+      kept around)
+    - routers and their IDs only get redrawn when the view or the layout moves
+    - the tick and view text only get rendered again when they say something different
+    Only routers and links on screen get drawn at all, found through a GridIndex and a LinkIndex. Zoomed out past
+    DETAIL_ZOOM routers turn into dots and links get bundled: every link between the same two BUNDLE_PIXELS squares of
+    the screen becomes one line, thicker the more links it stands for.
+    draw() returns the rects of the screen that changed, for pygame.display.update.
     '''
-    print(toPrint)
-    sleep(0.1)
-
-
-'''
-SIMULATION LIMITATIONS:
-
-Can only select routers 1 - 9. Technically you can add more routers, you just cant look at their network view.
-Routers themselves dont go offline and come back online. (this is usually one of the reasons why LSP aging is important)
-Routers don't age LSPs that are stored.
-Routers themselves are not added or subtracted from the network.
-The tick system is... imperfect, to say the least.
-This sim doesn't account for connection reliability even with a functional connection between routers,
-IRL there need to be more ACKS because a packet or two being dropped shouldn't instantly lead to the conncetion being declared down
-It also doesn't account for travel time of packets
-The routers don't actually calculate fastest paths...
-The methods used to generate a random graph are really scuffed and create topologies that arn't very common in IRL networks
-(i.e. no tree, star, etc.)
-
-'''
-
-
-def sendMessage(routerFrom, portTo, messageType, data=None):
-    '''
-    Attempts to send the message to the router connected to the specified port.
-    Returns if it was successful or not.
-    '''
-
-
-    for x in FullNetwork.Connections[routerFrom]:
-        if x[1] == portTo:
-            FullNetwork.getRouter(x[3]).recieveMessage(x[2], messageType, data)
-            return True
-    prettyPrint(
-        f"{C.RED}[- {T}] Failed {MessageTypeToHumanReadable[messageType]} message from router {routerFrom} on port {portTo}{C.END}")
-    return False
-
-
-class LSP:
-    # The LSP class is just a fancy data holder with built in TTL decrement.
-
-    def __init__(self, originatorID, directNeighbors, SeqNum, TTL):
-        self.origin = originatorID
-        self.neighbors = directNeighbors
-        self.seqNum = SeqNum
-        self.TTL = TTL
-
-    def decrementTTL(self, b=False):
-        self.TTL -= 1
-
-
-class Router:
-    def __init__(self, ID):
-        self.ID = ID
-        self.ActivePorts = set()
-        self.currentCounter = 0
-        self.neighbors = dict()  # port : (router ID, Cost)
-        self.nodeLSPs = dict()  # router ID: (highest SQ num, neighborData)
-        
-        # adjMatrix[node] -> node : (cost, this routers port, adj router port, adj router ID)
-        self.adjMatrix = dict()
-
-        self.Active = True
-        self.HelloInterval = randint(1, ROUTER_HELLO_INTERVAL)
-        self.LSPInterval = randint(0, ROUTER_LSP_INTERVAL)
-
-        self.nextTickActions = [] 
-        # Filled with Lambda functions (basically temporary function objects) that just call the relevent function lmao
-        
-        self.IDTextObject = None  # The pygame text object diplaying the ID of the router
-        # Generate LSP
-
-    def tick(self):
-
-        self.HelloInterval += 1
-        self.LSPInterval += 1
-
-        if self.HelloInterval % ROUTER_HELLO_INTERVAL == 0:
-            self.getNeigbors()
-        if self.LSPInterval % ROUTER_LSP_INTERVAL == 0:
-            self.genAndFloodLSP()
-        for act in self.nextTickActions:
-            act(0)
 
-        self.nextTickActions = []
-
-    def connectPort(self, port):
-
-        self.ActivePorts.add(port)
-
-    def floodMessage(self, messageType, data, avoid=None):
-
-        kill = set()
-
-        if messageType == 2:
-            if DEBUG:
-                if data.origin == self.ID:
-                    prettyPrint(
-                        f"[i {T}] Router {self.ID} broadcasting latest LSP ({data.seqNum})")
-                elif VERBOSE:
-                    prettyPrint(
-                        f"[vi {T}] Router {self.ID} forwarding Router {data.origin}'s LSP (SEQ {data.seqNum})")
-
-        for p in self.ActivePorts:
-            if p != avoid and p not in kill:
-
-                # Check if the message went through.
-                if not sendMessage(self.ID, p, messageType, data):
-
-                    # Send a test HELLO message to confirm a dead port
-                    if not sendMessage(self.ID, p, 1, self.ID):
-                        kill.add(p)
-
-        # Can only remove ports outside of the loop becaues changing set size
-        # in a loop leads to a error
-
-        if len(kill) > 0:
-            for k in kill:
-
-                prettyPrint(
-                    f"{C.YELLOW}[! {T}] Removing port {k} from router {self.ID}'s active ports{C.END}")
-                self.ActivePorts.remove(k)
-
-                if self.neighbors.get(k, False):
-                    del self.neighbors[k]
-
-                self.recalculateRouting()
-
-    def recieveMessage(self, toPort, messageType, data=None):
-        if not self.Active:
+    def __init__(self, surface, network, font):
+        self.surface = surface
+        self.network = network
+        self.font = font
+        self.rect = surface.get_rect()
+        self.viewport = Viewport(self.rect.width, self.rect.height)
+        if network.size > FIT_ABOVE:
+            self.viewport.fit(network.RouterPositions)
+
+        # Colors for every router and area, however many there are
+        self.routerColors = [None] + [IDToColorTuples.get(ID) for ID in range(1, network.size + 1)]
+        extra = palette(max(0, network.size - len(IDToColorTuples)))
+        for ID in range(len(IDToColorTuples) + 1, network.size + 1):
+            self.routerColors[ID] = extra[ID - len(IDToColorTuples) - 1]
+        self.areaColors = [(0, 0, 0)] + palette(network.areaCount - 1)  # The backbone is black
+
+        # The pygame text objects diplaying the ID of each router, rendered the first time each one is on screen
+        self.IDTextObjects = {}
+        self.layout = None  # viewport.ForceLayout moving the routers around, while it's on
+        self.positionsVersion = 0  # Goes up every time the routers move
+        self.grid = None  # (positionsVersion, GridIndex)
+        self.linkIndex = None  # ((topologyVersion, positionsVersion), LinkIndex)
+        self.topologies = {}  # True/False (viewing a router or not) : (key it was drawn for, surface)
+        self.overlays = OrderedDict()  # router ID : (key it was drawn for, surface)
+        self.nodes = (None, None)  # (key it was drawn for, surface)
+        self.scene = pygame.Surface(self.rect.size)  # Everything but the text, put together
+        self.sceneKey = None
+
+        self.title = "Tick"  # What the tick text starts with
+        self.tickText = (None, None)  # ((tick, routers out of sync), surface)
+        self.viewTexts = {}  # selected router : surface
+        self.textKey = None  # ((tick, routers out of sync), selected router, profile rows) the text is showing
+        self.textRects = []  # Where the text went, so it can be painted over
+
+        self.profiler = None  # profiler.Profiler to show the numbers of, if the overlay is on
+
+    def setNetwork(self, network):
+        '''
+        Switches over to drawing a different network with the same routers (E.G. another tick of a replay), throwing
+        out everything that got drawn for the old one. The routers stay wherever the layout put them.
+        '''
+        network.RouterPositions = self.network.RouterPositions
+        network.RITTP = self.network.RITTP
+        if self.layout is not None:
+            self.layout.network = network
+        self.network = network
+        self.topologies = {}
+        self.overlays.clear()
+        self.sceneKey = None
+        self.tickText = (None, None)
+        self.textKey = None
+
+    ## Where things are ##
+
+    def viewKey(self):
+        # Changes whenever something on screen moved
+        return self.viewport.key() + (self.positionsVersion,)
+
+    def detailed(self):
+        return self.viewport.zoom >= DETAIL_ZOOM
+
+    def routerIndex(self):
+        if self.grid is None or self.grid[0] != self.positionsVersion:
+            self.grid = (self.positionsVersion, GridIndex(self.network.RouterPositions))
+        return self.grid[1]
+
+    def visibleLinks(self):
+        key = (self.network.topologyVersion, self.positionsVersion)
+        if self.linkIndex is None or self.linkIndex[0] != key:
+            self.linkIndex = (key, LinkIndex(self.network.links, self.network.RouterPositions))
+        slots = self.network.links.slots
+        return [slots[slot] for slot in sorted(self.linkIndex[1].inRect(*self.viewport.worldRect(NODE_RADIUS)))]
+
+    def routerAt(self, sx, sy):
+        '''
+        The router under screen point (sx, sy), or 0 if there isn't one close enough.
+        '''
+        x, y = self.viewport.toWorld(sx, sy)
+        radius = max(NODE_RADIUS, PICK_PIXELS / self.viewport.zoom)
+        return self.routerIndex().nearest(x, y, radius) or 0
+
+    def screenPosition(self, ID):
+        return self.viewport.toScreen(*self.network.getRouterPosition(ID))
+
+    ## Moving the view ##
+
+    def pan(self, dx, dy):
+        self.viewport.pan(dx, dy)
+
+    def zoomAt(self, sx, sy, factor):
+        self.viewport.zoomAt(sx, sy, factor)
+
+    def fit(self):
+        self.viewport.fit(self.network.RouterPositions)
+
+    def toggleLayout(self):
+        if self.layout is not None:
+            self.layout = None
             return None
-        # 0 means "This is an ACK, do not respond with an ACK"
-        if messageType == 1 or 0:  # Hello packet, there would be some like time calculations here normally but lets just say doing this gives the router knowlege of the edge weight
-            if self.neighbors.get(toPort, -1) == - 1:  # This neighbor has not been considered yet
-                # Find the edge weight and update self.neighbors
-                for adj in FullNetwork.Connections[self.ID]:
-                    if adj[1] == toPort:
-                        self.neighbors[toPort] = (data, adj[0])
-                        break
-                if messageType == 1:
-                    if DEBUG:
-                        if VERBOSE:
-                            prettyPrint(
-                                f"{C.GREEN}[v+ {T}] Router {self.ID} port {toPort} recieved new HELLO: connected to router {self.neighbors[toPort][0]} with cost {self.neighbors[toPort][1]}{C.END}")
-                        else:
-                            prettyPrint(
-                                f"{C.GREEN}[+ {T}] Router {self.ID} connected to router {self.neighbors[toPort][0]} on port {toPort}{C.END}")
-                    # Return an ACK. Not sure why I made it only ACK on a new connection, but whatever,
-                    self.nextTickActions.append(
-                        lambda x: sendMessage(self.ID, toPort, 0))
-                else:
-                    if DEBUG:
-                        if VERBOSE:
-                            prettyPrint(
-                                f"{C.GREEN}[v+ {T}] Router {self.ID} port {toPort} HELLO recieved new ACK: connected to router {self.neighbors[toPort][0]} with cost {self.neighbors[toPort][1]}{C.END}")
-                        else:
-                            prettyPrint(
-                                f"{C.GREEN}[+ {T}] Router {self.ID} connected to router {self.neighbors[toPort][0]} on port {toPort}{C.END}")
-                self.genAndFloodLSP()
-
-        elif messageType == 2:  # Recieving a LSP.
-
-            SenderID = data.origin
-            NeighborData = data.neighbors
-            SeqN = data.seqNum
-            LSPTTL = data.TTL
-
-            # THIS IS NOT HOW THIS SHOULD BE HANDLED!!!
-            
-            if LSPTTL <= 0:
-                # The LSP is stale, remove.
-                if SenderID in self.nodeLSPs and self.nodeLSPs[SenderID][0] == SeqN:
-                    prettyPrint(
-                        f"{C.BLUE}[! {T}] Router {self.ID} recieved and is flooding a 0 TTL LSP message (SRC {SenderID} SEQ {SeqN} FWD {self.neighbors.get(toPort, ('UNKNOWN', 0))[0]}){C.END}")
-                    del self.nodeLSPs[SenderID]
-                    self.recalculateRouting()
-                    self.nextTickActions.append(
-                        lambda x: self.floodMessage(
-                            2, data, toPort))
-                return None
-
-            if SenderID not in self.nodeLSPs or SeqN > self.nodeLSPs[SenderID][0]:
-                if VERBOSE:
-                    prettyPrint(
-                        f"{C.GREEN}[v+ {T}] Router {self.ID} accepts LSP with SRC {SenderID} SEQ {SeqN} FWD {self.neighbors.get(toPort, ('UNKNOWN', 0))[0]} TTL {LSPTTL} (Contains {len(NeighborData)} ADJ){C.END}")
+        self.layout = ForceLayout(self.network)
+        if self.layout.version:
+            # It spread the routers out to start with, so they'd mostly be off screen otherwise
+            self.positionsVersion += 1
+            self.fit()
+
+    def stepLayout(self):
+        # One step of the force directed layout, if it's on and hasn't settled yet
+        if self.layout is not None and self.layout.step():
+            self.positionsVersion += 1
+
+    ## Colors ##
+
+    def routerColor(self, ID):
+        # By area if there are any, otherwise by router
+        if self.network.areaCount > 1:
+            return self.areaColors[self.network.areas[ID]]
+        return self.routerColors[ID]
+
+    def linkColor(self, R1, R2):
+        if self.network.areaCount > 1:
+            return self.areaColors[self.network.areaBetween(R1, R2)]
+        return self.routerColors[R1]
+
+    ## Layers ##
+
+    def IDText(self, ID):
+        text = self.IDTextObjects.get(ID)
+        if text is None:
+            text = self.IDTextObjects[ID] = self.font.render(str(ID), False, (0, 0, 0))
+        return text
+
+    def drawNodes(self):
+        key = (self.network.topologyVersion,) + self.viewKey()
+        if self.nodes[0] == key:
+            return self.nodes[1]
+        nodes = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        visible = self.routerIndex().inRect(*self.viewport.worldRect(NODE_RADIUS))
+        areas = self.network.areaCount > 1
+        if self.detailed():
+            radius = max(2, round(NODE_RADIUS * self.viewport.zoom))
+            text = self.viewport.zoom >= TEXT_ZOOM
+            for o in visible:
+                position = self.screenPosition(o)
+                # The outline says what area the router is in
+                pygame.draw.circle(nodes, self.areaColors[self.network.areas[o]] if areas else (0, 0, 0),
+                                   position, radius)
+                # Failed routers get filled in gray until they restart
+                pygame.draw.circle(nodes, (255, 255, 255) if self.network.getRouter(o).Active else (160, 160, 160),
+                                   position, max(1, radius - 2))
+                if text:
+                    nodes.blit(self.IDText(o), self.viewport.toScreen(*self.network.getRITTP(o)))
+        else:
+            for o in visible:
+                pygame.draw.circle(nodes, self.routerColor(o) if areas else (0, 0, 0), self.screenPosition(o), 2)
+        self.nodes = (key, nodes)
+        return nodes
+
+    def drawLinks(self, surface, lines, color=None):
+        '''
+        Draws every (R1, R2, color) in lines, one line each when zoomed in and bundled when zoomed out. color overrides
+        the color of every one of them.
+        '''
+        if self.detailed():
+            width = max(1, round(3 * self.viewport.zoom))
+            for R1, R2, lineColor in lines:
+                pygame.draw.line(surface, color or lineColor, self.screenPosition(R1), self.screenPosition(R2),
+                                 width=width)
+            return None
+        bundles = {}  # (square, square) : [how many links, color of the first one]
+        for R1, R2, lineColor in lines:
+            x1, y1 = self.screenPosition(R1)
+            x2, y2 = self.screenPosition(R2)
+            a = (x1 // BUNDLE_PIXELS, y1 // BUNDLE_PIXELS)
+            b = (x2 // BUNDLE_PIXELS, y2 // BUNDLE_PIXELS)
+            if a == b:
+                continue  # Inside one square, too small to see anyway
+            bundle = bundles.get((min(a, b), max(a, b)))
+            if bundle is None:
+                bundles[(min(a, b), max(a, b))] = [1, lineColor]
+            else:
+                bundle[0] += 1
+        half = BUNDLE_PIXELS // 2
+        for (a, b), (count, lineColor) in bundles.items():
+            pygame.draw.line(surface, color or lineColor,
+                             (a[0] * BUNDLE_PIXELS + half, a[1] * BUNDLE_PIXELS + half),
+                             (b[0] * BUNDLE_PIXELS + half, b[1] * BUNDLE_PIXELS + half),
+                             width=min(MAX_BUNDLE_WIDTH, count.bit_length()))
+
+    def topology(self, viewingRouter):
+        key = (self.network.topologyVersion,) + self.viewKey()
+        drawnFor, surface = self.topologies.get(viewingRouter, (None, None))
+        if drawnFor != key:
+            surface = pygame.Surface(self.rect.size)
+            surface.fill((255, 255, 255))
+            color = (200, 200, 200) if viewingRouter else None
+            # Straight from the link index so every edge on screen only gets drawn once
+            lines = [(link.R1, link.R2, (0, 0, 0)) for link in self.visibleLinks()]
+            self.drawLinks(surface, lines, color)
+            self.topologies[viewingRouter] = (key, surface)
+        return surface
+
+    def overlay(self, routerID):
+        router = self.network.getRouter(routerID)
+        key = (router.LSDBVersion, self.network.topologyVersion) + self.viewKey()
+        cached = self.overlays.get(routerID)
+        if cached is not None and cached[0] == key:
+            self.overlays.move_to_end(routerID)
+            return cached[1]
+
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        left, top, right, bottom = self.viewport.worldRect(NODE_RADIUS)
+        positions = self.network.RouterPositions
+        real, stale = [], []
+        v = router.adjMatrix
+        for routerKey in v:
+            x1, y1 = positions[routerKey - 1]
+            for edge in v[routerKey]:
+                # Anything that can't be on screen gets skipped
+                x2, y2 = positions[edge[0] - 1]
+                if max(x1, x2) < left or min(x1, x2) > right or max(y1, y2) < top or min(y1, y2) > bottom:
+                    continue
+                if edge[0] not in self.network.SimplifiedConnections[routerKey]:
+                    stale.append((routerKey, edge[0], (80, 0, 0)))
                 else:
-                    senderRouter = self.neighbors.get(
-                        toPort, ('UNKNOWN', 0))[0]
-                    if DEBUG:
-                        if SenderID == senderRouter:
-                            prettyPrint(
-                                f"{C.GREEN}[+ {T}] Router {self.ID} accepts LSP broadcasted by {SenderID}{C.END}")
-                        else:
-                            prettyPrint(
-                                f"{C.GREEN}[+ {T}] Router {self.ID} accepts LSP sourced from {SenderID} and forwarded by {senderRouter}{C.END}")
-
-                self.nodeLSPs[SenderID] = (SeqN, NeighborData)
-                self.recalculateRouting()
-
+                    real.append((routerKey, edge[0], self.linkColor(routerKey, edge[0])))
+        self.drawLinks(surface, stale)
+        self.drawLinks(surface, real)
+        self.overlays[routerID] = (key, surface)
+        self.overlays.move_to_end(routerID)
+        if len(self.overlays) > OVERLAY_CACHE_SIZE:
+            self.overlays.popitem(last=False)
+        return surface
+
+    def buildScene(self, selected):
+        self.scene.blit(self.topology(selected != 0), (0, 0))
+        if selected != 0:
+            self.scene.blit(self.overlay(selected), (0, 0))
+        self.scene.blit(self.drawNodes(), (0, 0))
+        if selected != 0:
+            pygame.draw.circle(
+                self.scene,
+                self.routerColor(selected),
+                self.screenPosition(selected),
+                max(4, round(NODE_RADIUS * self.viewport.zoom)))
+            if self.viewport.zoom >= TEXT_ZOOM:
+                self.scene.blit(self.IDText(selected), self.viewport.toScreen(*self.network.getRITTP(selected)))
+
+    def viewText(self, selected):
+        if selected not in self.viewTexts:
+            if selected == 0:
+                self.viewTexts[selected] = self.font.render("Viewing full network", False, (0, 0, 0))
             else:
-                if VERBOSE:
-                    prettyPrint(
-                        f"{C.RED}[v- {T}] Router {self.ID} denies LSP with SRC {SenderID} SEQ {SeqN} FWD {self.neighbors.get(toPort, ('UNKNOWN', 0))[0]} (More recent or equal LSP of SEQ {self.nodeLSPs[SenderID][0]}){C.END}")
-                return None # Do not flood this LSP
-
-            # Continue to flood the LSP on all ports that are not the one that
-            # this router recieved it from
-            data.decrementTTL(self.ID)
-            self.nextTickActions.append(
-                lambda x: self.floodMessage(
-                    2, data, toPort))
-
-    def getNeigbors(self):
-
-        if VERBOSE:
-            prettyPrint(f"[vi {T}] Router {self.ID} saying hello")
-        change = False
-        kill = []
-        for p in self.ActivePorts:
-            if not sendMessage(self.ID, p, 1, self.ID):
-                # Declare port P down
-                kill.append(p)
-                change = True
-
-        if change:
-            for k in kill:
-                prettyPrint(
-                    f"{C.YELLOW}[i {T}] Declaring port {k} on router {self.ID} down{C.END}")
-                self.ActivePorts.remove(k)
-                if self.neighbors.get(k, False):
-                    del self.neighbors[k]
-            self.genAndFloodLSP()
-            # Generate new LSP
-
-    def genAndFloodLSP(self):
-
-        if VERBOSE:
-            prettyPrint(
-                f"[i {T}] Router {self.ID} generating new LSP (SEQ {self.currentCounter})")
-        ThisLSP = LSP(
-            self.ID,
-            self.neighbors,
-            self.currentCounter,
-            255)  # Usually TTL is set to 255
-        self.currentCounter += 1
-        self.nextTickActions.append(lambda x: self.floodMessage(2, ThisLSP))
-
-        self.nodeLSPs[self.ID] = (self.currentCounter - 1, self.neighbors)
-        self.recalculateRouting()
-
-    def recalculateRouting(self):
-        self.adjMatrix = {}
-        for LSP in self.nodeLSPs:
-            self.adjMatrix[LSP] = list(self.nodeLSPs[LSP][1].values())
-
-
-class Network:
-
-    def __init__(self, RouterCount, ConnectionCount):
-
-        self.size = RouterCount
-        self.Routers = []
-        self.RouterPositions = []
-        self.Connections = {}
-        self.SimplifiedConnections = {}
-        searchconnect = set()
-
-        for x in range(1, RouterCount + 1):
-            self.Routers.append(Router(x))
-            self.Routers[-1].IDTextObject = Font.render(
-                str(x), False, (0, 0, 0))
-            self.RouterPositions.append(
-                (randint(0, DX - 100), randint(100, DY - 100)))
-            self.Connections[x] = []
-            self.SimplifiedConnections[x] = set()
-
-        for _ in range(ConnectionCount):
-            R1, R2 = sample(list(range(1, RouterCount + 1)), 2)
-            if (R1, R2) not in searchconnect and (R2, R1) not in searchconnect:
-                searchconnect.add((R1, R2))
-                P1 = chr(len(self.getRouter(R1).ActivePorts) + 65)
-                P2 = chr(len(self.getRouter(R2).ActivePorts) + 65)
-                cost = randint(1, 50)
-                self.buildConnection(cost, R1, P1, R2, P2)
-
-        self.RITTP = {o +
-                      1: (self.getRouterPosition(o +
-                                                 1)[0] -
-                          9, self.getRouterPosition(o +
-                                                    1)[1] -
-                          22) for o in range(RouterCount)}
-
-    def buildConnection(self, cost, R1, P1, R2, P2):
-
-        self.Connections[R1].append([cost, P1, P2, R2])
-        self.Connections[R2].append([cost, P2, P1, R1])
-        self.SimplifiedConnections[R1].add(R2)
-        self.SimplifiedConnections[R2].add(R1)
-        self.getRouter(R1).connectPort(P1)
-        self.getRouter(R2).connectPort(P2)
-
-    def blowUpConnection(self, R1, Connection):
-
-        self.Connections[R1].remove(Connection)
-        rev = [Connection[0], Connection[2], Connection[1], R1]
-        self.Connections[Connection[3]].remove(rev)
-        self.SimplifiedConnections[R1].remove(Connection[3])
-        self.SimplifiedConnections[Connection[3]].remove(R1)
-
-    def getRouter(self, ID):
-        return self.Routers[ID - 1]
-
-    def getRouterPosition(self, ID):
-        return self.RouterPositions[ID - 1]
-
-    def getRITTP(self, ID):
-        return self.RITTP[ID]
-
-    def blowUpRandomConnection(self):
-        randomStartNode = choice(list(self.Connections.keys()))
-        randomConnection = choice(self.Connections[randomStartNode])
-        self.blowUpConnection(randomStartNode, randomConnection)
-        prettyPrint(
-            f"{C.YELLOW}[! {T}] Edge from node {randomStartNode} to {randomConnection[3]} cut{C.END}")
-
-    def createRandomConnection(self):
-
-        while True:
-            randomStartNode = choice(list(self.Connections.keys()))
-            randomEndNode = choice(list(set(range(
-                1, self.size + 1)).difference({x[0] for x in self.Connections[randomStartNode]})))
-
-            if randomStartNode == randomEndNode:
-                continue
-
-            unique = True
-            for conn in self.Connections[randomStartNode]:
-                if conn[3] == randomEndNode:
-                    unique = False
-                    break
-
-            if not unique:
-                continue
-
-            randomWeight = randint(1, 50)
-            AP1 = self.getRouter(randomStartNode).ActivePorts
-            AP2 = self.getRouter(randomEndNode).ActivePorts
-            P1 = 65
-            P2 = 65
-            while chr(P1) in AP1:
-                P1 += 1
-            while chr(P2) in AP2:
-                P2 += 1
-            P1 = chr(P1)
-            P2 = chr(P2)
-
-            self.buildConnection(
-                randomWeight,
-                randomStartNode,
-                P1,
-                randomEndNode,
-                P2)
-
-            prettyPrint(
-                f"{C.YELLOW}[! {T}] Edge from router {randomStartNode} port {P1} to {randomEndNode} port {P2} created with weight {randomWeight}{C.END}")
-            break
-
+                self.viewTexts[selected] = self.font.render(
+                    f"Router {selected} view",
+                    False,
+                    self.routerColor(selected))
+        return self.viewTexts[selected]
+
+    def profileTexts(self):
+        # The overlay's lines of text, going by the last few ticks the profiler counted
+        ticksPerSecond = self.profiler.ticksPerSecond()
+        messagesPerTick = self.profiler.messagesPerTick()
+        slowest = ", ".join(f"{ID} ({seconds * 1000:.2f} ms)"
+                            for ID, seconds in self.profiler.slowestRouters(SLOWEST_ROUTERS))
+        lines = [
+            f"{ticksPerSecond:.0f} ticks/sec" if ticksPerSecond is not None else "- ticks/sec",
+            f"{messagesPerTick:.1f} messages/tick" if messagesPerTick is not None else "- messages/tick",
+            f"Slowest: {slowest or '-'}"
+        ]
+        return [self.font.render(line, False, (0, 0, 128)) for line in lines]
+
+    def draw(self, selected):
+        dirty = []
+        sceneKey = (self.network.topologyVersion, selected,
+                    selected and self.network.getRouter(selected).LSDBVersion) + self.viewKey()
+        if sceneKey != self.sceneKey:
+            self.buildScene(selected)
+            self.sceneKey = sceneKey
+            self.surface.blit(self.scene, (0, 0))
+            dirty.append(self.rect)
+            self.textKey = None
+
+        tickKey = (self.network.T, self.network.outOfSync())
+        if self.tickText[0] != tickKey:
+            status = "converged" if tickKey[1] == 0 else f"{tickKey[1]} out of sync"
+            self.tickText = (tickKey, self.font.render(f"{self.title} {self.network.T} ({status})", False, (0, 0, 0)))
+        profileKey = len(self.profiler) if self.profiler is not None else None
+        if self.textKey != (tickKey, selected, profileKey):
+            self.textKey = (tickKey, selected, profileKey)
+            # Paint the scene back over the old text before putting the new text down
+            dirty.extend(self.textRects)
+            for rect in self.textRects:
+                self.surface.blit(self.scene, rect, rect)
+            self.textRects = [
+                self.surface.blit(self.tickText[1], (0, 0)),
+                self.surface.blit(self.viewText(selected), (0, 30))
+            ]
+            if self.profiler is not None:
+                for line, text in enumerate(self.profileTexts()):
+                    self.textRects.append(self.surface.blit(text, (0, 60 + 30 * line)))
+            dirty.extend(self.textRects)
+        return dirty
+
+
+eventLog.level = LOG_LEVEL
+eventLog.start(pacing=LOG_PACING)
 
 pygame.init()
 Font = pygame.font.SysFont('Cambria', 30)
-TickCount = Font.render("Tick 0", False, (0, 0, 0))
-RouterView = Font.render("Viewing true map", False, (0, 0, 0))
 
 DISPLAYSURF = pygame.display.set_mode((DX, DY), flags=pygame.SCALED)
 
 NumKeys = set([K_0, K_1, K_2, K_3, K_4, K_5, K_6, K_7, K_8, K_9])
 
-FullNetwork = Network(ROUTERCOUNT, EDGECOUNT)
+# Ticks each key moves a replay by
+ScrubKeys = {K_LEFT: -1, K_RIGHT: 1, K_DOWN: -10, K_UP: 10, K_PAGEDOWN: -100, K_PAGEUP: 100}
+
+Recorder = None
+if REPLAY is not None:
+    from eventtrace import TraceReader
+    Replay = TraceReader(REPLAY)
+    FullNetwork = Replay.networkAt(Replay.firstTick)
+else:
+    FullNetwork = Network(ROUTERCOUNT, EDGECOUNT, TopologyGenerators[TOPOLOGY], SEED, AREAS)
+    if TRACE is not None:
+        from eventtrace import TraceWriter
+        Recorder = TraceWriter(TRACE, FullNetwork)
+
+Playing = None
+if SCENARIO is not None and REPLAY is None:
+    from scenario import Scenario
+    Playing = Scenario.load(SCENARIO, SEED)
+    Playing.applyDue(FullNetwork)
+
+View = Renderer(DISPLAYSURF, FullNetwork, Font)
+if REPLAY is not None:
+    View.title = "Replay tick"
+elif PROFILE:
+    View.profiler = Profiler(FullNetwork)
+
+if LAYOUT:
+    View.toggleLayout()
 
 FramesPerSec = pygame.time.Clock()
 
+# Zoom keys : how much they zoom by
+ZoomKeys = {K_EQUALS: ZOOM_STEP, K_PLUS: ZOOM_STEP, K_KP_PLUS: ZOOM_STEP,
+            K_MINUS: 1 / ZOOM_STEP, K_KP_MINUS: 1 / ZOOM_STEP}
 
-while True:
-    DISPLAYSURF.fill((255, 255, 255))
-    TickCount = Font.render(f"Tick {T}", False, (0, 0, 0))
-    if SelectedRouter == 0:
-        RouterView = Font.render("Viewing full network", False, (0, 0, 0))
+
+def handleViewEvent(event):
+    '''
+    Selecting, zooming and panning, the same whether it's a replay or not. True if event was one of those.
+    '''
+    global SelectedRouter
+    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+        clicked = View.routerAt(*event.pos)
+        SelectedRouter = 0 if clicked == SelectedRouter else clicked
+    elif event.type == pygame.MOUSEMOTION and (event.buttons[1] or event.buttons[2]):
+        View.pan(*event.rel)
+    elif event.type == pygame.MOUSEWHEEL:
+        View.zoomAt(*pygame.mouse.get_pos(), ZOOM_STEP ** event.y)
+    elif event.type == pygame.KEYDOWN and event.key in ZoomKeys:
+        View.zoomAt(DX // 2, DY // 2, ZoomKeys[event.key])
+    elif event.type == pygame.KEYDOWN and event.key == K_f:
+        View.fit()
+    elif event.type == pygame.KEYDOWN and event.key == K_l:
+        View.toggleLayout()
     else:
-        RouterView = Font.render(
-            f"Router {SelectedRouter} view",
-            False,
-            IDToColorTuples[SelectedRouter])
-    DISPLAYSURF.blit(TickCount, (0, 0))
-    DISPLAYSURF.blit(RouterView, (0, 30))
+        return False
+    return True
+
+
+def step():
+    FullNetwork.tick()
+    if Playing is not None:
+        Playing.applyDue(FullNetwork)
+
+
+while True:
     for event in pygame.event.get():
         if event.type == QUIT:
+            if Recorder is not None:
+                Recorder.close()
+            if View.profiler is not None and PROFILE_EXPORT is not None:
+                View.profiler.close()
+                View.profiler.export(PROFILE_EXPORT)
             pygame.quit()
             sys.exit()
-        if AUTO:
-            if randint(1, 100) < 10:
-                FullNetwork.blowUpRandomConnection()
-            if randint(1, 100) > 90:
-                FullNetwork.createRandomConnection()
-            for R in FullNetwork.Routers:
-                R.tick()
-            T += 1
+        if handleViewEvent(event):
+            continue
+        if REPLAY is not None:
+            if event.type == pygame.KEYDOWN:
+                tick = None
+                if event.key in ScrubKeys:
+                    tick = FullNetwork.T + ScrubKeys[event.key]
+                elif event.key == K_HOME:
+                    tick = Replay.firstTick
+                elif event.key == K_END:
+                    tick = Replay.lastTick
+                if tick is not None:
+                    FullNetwork = Replay.networkAt(tick)
+                    if FullNetwork is not View.network:
+                        View.setNetwork(FullNetwork)
+                elif event.key in NumKeys and event.key - 48 <= FullNetwork.size:
+                    SelectedRouter = 0 if event.key - 48 == SelectedRouter else event.key - 48
+            continue
         if event.type == pygame.KEYDOWN:
             if event.key == K_c:
                 FullNetwork.createRandomConnection()
             elif event.key == K_b:
                 FullNetwork.blowUpRandomConnection()
+            elif event.key == K_p:
+                if View.profiler is None:
+                    View.profiler = Profiler(FullNetwork)
+                else:
+                    View.profiler.close()
+                    if PROFILE_EXPORT is not None:
+                        View.profiler.export(PROFILE_EXPORT)
+                    View.profiler = None
 
             if not AUTO and event.key == K_SPACE:
-                for R in FullNetwork.Routers:
-                    R.tick()
-                T += 1
+                step()
             elif event.key in NumKeys:
                 if event.key - 48 <= FullNetwork.size:
                     if event.key - 48 == SelectedRouter:
@@ -530,43 +562,13 @@ while True:
                     else:
                         SelectedRouter = event.key - 48
 
-    for node in FullNetwork.Connections:
-        for edge in FullNetwork.Connections[node]:
-            if SelectedRouter == 0:
-                pygame.draw.line(DISPLAYSURF, (0, 0, 0), FullNetwork.getRouterPosition(
-                    node), FullNetwork.getRouterPosition(edge[3]), width=3)
-            else:
-                pygame.draw.line(DISPLAYSURF, (200, 200, 200), FullNetwork.getRouterPosition(
-                    node), FullNetwork.getRouterPosition(edge[3]), width=3)
-    if SelectedRouter != 0:
-        v = FullNetwork.getRouter(SelectedRouter).adjMatrix
-        for routerKey in v:
-            for edge in v[routerKey]:
-                if edge[0] not in FullNetwork.SimplifiedConnections[routerKey]:
-                    pygame.draw.line(DISPLAYSURF, (80, 0, 0), FullNetwork.getRouterPosition(
-                        routerKey), FullNetwork.getRouterPosition(edge[0]), width=3)
-                else:
-                    pygame.draw.line(
-                        DISPLAYSURF,
-                        IDToColorTuples[routerKey],
-                        FullNetwork.getRouterPosition(routerKey),
-                        FullNetwork.getRouterPosition(
-                            edge[0]),
-                        width=3)
-    for o in range(1, FullNetwork.size + 1):
-        if o == SelectedRouter:
-            pygame.draw.circle(
-                DISPLAYSURF,
-                IDToColorTuples[SelectedRouter],
-                FullNetwork.getRouterPosition(o),
-                20)
-        else:
-            pygame.draw.circle(
-                DISPLAYSURF, (0, 0, 0), FullNetwork.getRouterPosition(o), 20)
-            pygame.draw.circle(DISPLAYSURF, (255, 255, 255),
-                               FullNetwork.getRouterPosition(o), 18)
-        DISPLAYSURF.blit(
-            FullNetwork.getRouter(o).IDTextObject,
-            FullNetwork.getRITTP(o))
-    pygame.display.update()
+    if AUTO and REPLAY is None:
+        if FullNetwork.rng.randint(1, 100) < 10:
+            FullNetwork.blowUpRandomConnection()
+        if FullNetwork.rng.randint(1, 100) > 90:
+            FullNetwork.createRandomConnection()
+        step()
+
+    View.stepLayout()
+    pygame.display.update(View.draw(SelectedRouter))
     FramesPerSec.tick(FPS)
@@ -0,0 +1,453 @@
+# Partitioned simulation: the routers get split between several worker processes and each one steps its own share of
+# the network, so big topologies can use every core instead of one.
+#
+# How it stays identical to a plain Network run:
+# Every worker builds the exact same Network from the same seed, then throws away the events of routers it doesn't own.
+# A router only ever changes its own state when it handles an event, and events are ordered by
+# (tick, target, origin, origin's counter), so as long as every router sees the same events in the same order, the
+# whole run comes out the same no matter which process a router lives in.
+# Messages to routers in another partition get held back until a barrier, then packed with wire.py into the sending
+# worker's shared memory block and read out by the worker that owns the target. A message can't arrive any sooner than
+# the cheapest delay on a link between two partitions (the lookahead), so everyone can safely run that many ticks
+# ahead between barriers without ever missing something that should have happened first. Ahead of the earliest thing
+# anyone has coming, that is: an event in its queue or a timer (LSP aging, dead intervals, retransmits) in its wheel,
+# since a timer going off can send messages too.
+
+## IMPORTS ##
+import multiprocessing
+import traceback
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from heapq import heappush, heapify
+from random import getrandbits
+
+from simulation import Network, EventQueue, DEFAULT_LINK_DELAY, ROUTERCOUNT, EDGECOUNT
+from eventlog import eventLog, LEVEL_OFF, LEVEL_WARNING
+from topologies import randomGraph
+import wire
+
+## CONSTANTS ##
+
+# How many processes to split the network between if nobody says otherwise
+DEFAULT_WORKERS = multiprocessing.cpu_count()
+
+# Starting size in bytes of each worker's shared memory block for outgoing messages. A worker swaps in a bigger one
+# whenever a window's worth of messages doesn't fit.
+OUTBOX_SIZE = 1 << 20
+
+# Most passes the partitioner makes trying to move routers to a partition with more of their neighbors
+REFINE_PASSES = 8
+
+# How far a partition's size can drift from an even split while refining, as a fraction of the even split
+BALANCE_SLACK = 0.05
+
+
+class PartitionError(Exception):
+    '''
+    Something blew up inside a worker process. The message is the worker's traceback.
+    '''
+
+
+def partition(size, edges, parts):
+    '''
+    Splits routers 1 ... size into parts groups of about the same size with as few edges between groups as possible.
+    edges is any iterable of (R1, R2). Returns owners, where owners[router ID] is its partition (owners[0] is unused).
+
+    Partitions get grown one at a time breadth first out of the lowest numbered router nobody owns yet, which already
+    keeps neighbors together. Then a few Fiduccia–Mattheyses style passes go over every router and move it to whichever
+    partition most of its neighbors are in, as long as that cuts fewer edges and doesn't unbalance the sizes.
+    Everything is O(V + E) per pass.
+    '''
+    parts = max(1, min(parts, size))
+    adjacency = [[] for _ in range(size + 1)]
+    for R1, R2 in edges:
+        adjacency[R1].append(R2)
+        adjacency[R2].append(R1)
+
+    owners = [-1] * (size + 1)
+    sizes = [0] * parts
+    nextSeed = 1
+    for part in range(parts):
+        # Spread whatever is left evenly over the partitions still to go
+        target = (size - sum(sizes) + parts - part - 1) // (parts - part)
+        queue = []
+        head = 0
+        while sizes[part] < target:
+            if head == len(queue):
+                # Ran out of neighbors (or just starting), pick up the next unowned router
+                while owners[nextSeed] != -1:
+                    nextSeed += 1
+                owners[nextSeed] = part
+                sizes[part] += 1
+                queue.append(nextSeed)
+                continue
+            node = queue[head]
+            head += 1
+            for adj in adjacency[node]:
+                if owners[adj] == -1 and sizes[part] < target:
+                    owners[adj] = part
+                    sizes[part] += 1
+                    queue.append(adj)
+
+    if parts > 1:
+        even = size / parts
+        lowest = int(even * (1 - BALANCE_SLACK))
+        highest = int(even * (1 + BALANCE_SLACK)) + 1
+        for _ in range(REFINE_PASSES):
+            moved = 0
+            for node in range(1, size + 1):
+                home = owners[node]
+                if sizes[home] <= lowest:
+                    continue
+                counts = {}
+                for adj in adjacency[node]:
+                    counts[owners[adj]] = counts.get(owners[adj], 0) + 1
+                best, bestCount = home, counts.get(home, 0)
+                for part, count in sorted(counts.items()):
+                    if count > bestCount and sizes[part] < highest:
+                        best, bestCount = part, count
+                if best != home:
+                    owners[node] = best
+                    sizes[home] -= 1
+                    sizes[best] += 1
+                    moved += 1
+            if not moved:
+                break
+    return owners
+
+
+def cutSize(owners, edges):
+    # How many edges go between two different partitions
+    return sum(1 for R1, R2 in edges if owners[R1] != owners[R2])
+
+
+class PartitionQueue(EventQueue):
+    '''
+    A worker's event queue. Events for routers this worker owns go in the heap like normal, events for anyone else get
+    set aside in outgoing[the partition that owns them] until the next barrier.
+    '''
+
+    def __init__(self, index, owners, heap=()):
+        self.index = index
+        self.owners = owners
+        self.heap = [event for event in heap if owners[event[1]] == index]
+        heapify(self.heap)
+        self.outgoing = {}
+
+    def push(self, time, target, origin, counter, eventType, args=()):
+        owner = self.owners[target]
+        if owner == self.index:
+            heappush(self.heap, (time, target, origin, counter, eventType, args))
+        else:
+            self.outgoing.setdefault(owner, []).append((time, target, origin, counter, eventType, args))
+
+
+class Partition:
+    '''
+    The part of the simulation living in one worker process. It has the whole network (every worker has to agree on
+    the links), but only ever handles events for the routers in owned.
+    '''
+
+    def __init__(self, index, owners, RouterCount, ConnectionCount, generator, seed, areas):
+        self.index = index
+        self.network = Network(RouterCount, ConnectionCount, generator, seed, areas)
+        self.events = PartitionQueue(index, owners, self.network.events.heap)
+        self.network.events = self.events
+        self.owned = [x for x in range(1, self.network.size + 1) if owners[x] == index]
+        self.outbox = SharedMemory(create=True, size=OUTBOX_SIZE)
+        self.inboxes = {}  # worker index : SharedMemory of theirs we have open
+        self.lsps = {}  # Last LSP decoded from each originator, see wire.decode
+
+    def advance(self, until):
+        '''
+        Runs every event before tick until, then packs everything headed for other partitions into the outbox.
+        Returns (outbox name, {partition : (start, end) of its messages in the outbox}).
+        '''
+        self.network.advance(until)
+        outgoing = self.events.outgoing
+        self.events.outgoing = {}
+
+        needed = sum(wire.recordSize(event[5]) for events in outgoing.values() for event in events)
+        if needed > self.outbox.size:
+            size = max(needed, 2 * self.outbox.size)
+            self.outbox.close()
+            self.outbox.unlink()  # Anyone who still has it open keeps their mapping until they swap over
+            self.outbox = SharedMemory(create=True, size=size)
+
+        buffer = self.outbox.buf
+        sections = {}
+        offset = 0
+        for owner, events in outgoing.items():
+            start = offset
+            for time, target, origin, counter, _, args in events:
+                offset = wire.encodeInto(buffer, offset, time, target, origin, counter, args)
+            sections[owner] = (start, offset)
+        return self.outbox.name, sections
+
+    def deliver(self, sources):
+        '''
+        Reads in every message other partitions sent us. sources is [(worker index, outbox name, start, end), ...].
+        Returns nextTimes().
+        '''
+        heap = self.events.heap
+        for worker, name, start, end in sources:
+            inbox = self.inboxes.get(worker)
+            if inbox is None or inbox.name != name:
+                if inbox is not None:
+                    inbox.close()
+                inbox = self.inboxes[worker] = SharedMemory(name=name)
+            for event in wire.decode(inbox.buf, start, end, self.lsps):
+                heappush(heap, event)
+        return self.nextTimes()
+
+    def nextTimes(self):
+        # (tick of the next event this partition has, tick of its next timer), either None if there isn't one
+        return self.events.nextTime(), self.network.timers.nextDue()
+
+    def close(self):
+        for inbox in self.inboxes.values():
+            inbox.close()
+        self.outbox.close()
+        self.outbox.unlink()
+
+
+def workerMain(conn, index, owners, RouterCount, ConnectionCount, generator, seed, areas):
+    '''
+    Runs in the worker process. Does whatever the coordinator sends down the pipe and always answers, with a
+    PartitionError if anything went wrong.
+    '''
+    # Every worker logging into its own buffer nobody reads would just be wasted work
+    eventLog.level = LEVEL_OFF
+    part = None
+    while True:
+        try:
+            if part is None:
+                part = Partition(index, owners, RouterCount, ConnectionCount, generator, seed, areas)
+                conn.send(part.nextTimes())
+                continue
+            command = conn.recv()
+            kind = command[0]
+            if kind == "advance":
+                reply = part.advance(command[1])
+            elif kind == "deliver":
+                reply = part.deliver(command[1])
+            elif kind == "build":
+                reply = part.network.buildConnection(*command[1:])
+            elif kind == "cut":
+                R1, P1 = command[1:]
+                part.network.blowUpLink(part.network.links.ports[(R1, P1)])
+                reply = None
+            elif kind == "converged":
+                reply = part.network.isConverged(part.owned)
+            elif kind == "state":
+                router = part.network.getRouter(command[1])
+                reply = (router.routingTable, router.nodeLSPs)
+            elif kind == "close":
+                part.close()
+                conn.send(None)
+                return None
+            else:
+                raise ValueError(f"Unknown command {kind!r}")
+            conn.send(reply)
+        except Exception:
+            conn.send(PartitionError(traceback.format_exc()))
+            if part is None:
+                return None
+
+
+class PartitionedNetwork:
+    '''
+    Drop in for Network (for running it, not for the viewer) that spreads the routers over worker processes.
+    Same arguments as Network plus how many workers to use, and the same seed gives exactly the same run as
+    Network(RouterCount, ConnectionCount, generator, seed, areas) would.
+
+    network is the coordinator's own copy of the Network. Its routers never run, it's only there for the links, the
+    topology views and the rng, so random cuts and new links get picked the same way a single Network picks them.
+    Call close() (or use it in a with block) when done so the workers and their shared memory go away.
+    '''
+
+    def __init__(self, RouterCount, ConnectionCount, generator=randomGraph, seed=None, areas=1,
+                 workers=DEFAULT_WORKERS):
+        if seed is None:
+            # Every worker has to build the same network, so there has to be a seed even if nobody picked one
+            seed = getrandbits(64)
+        self.seed = seed
+        self.network = Network(RouterCount, ConnectionCount, generator, seed, areas)
+        self.network.events = EventQueue()
+        self.size = self.network.size
+        self.T = 0
+
+        edges = [(link.R1, link.R2) for link in self.network.links.slots if link is not None]
+        self.owners = partition(self.size, edges, workers)
+        self.workers = max(self.owners[1:]) + 1
+        self.lookahead = float("inf")
+        for link in self.network.links.slots:
+            if link is not None:
+                self.checkLookahead(link.R1, link.R2, link.delay)
+
+        # Workers have to share one resource tracker, otherwise each one thinks the blocks it only opened were leaked
+        resource_tracker.ensure_running()
+        context = multiprocessing.get_context()
+        self.conns = []
+        self.processes = []
+        for index in range(self.workers):
+            conn, child = context.Pipe()
+            process = context.Process(target=workerMain, name=f"Partition{index}", daemon=True,
+                                      args=(child, index, self.owners, RouterCount, ConnectionCount, generator, seed,
+                                            areas))
+            process.start()
+            self.conns.append(conn)
+            self.processes.append(process)
+        self.receiveTimes()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.conns:
+            self.broadcast(("close",))
+            for process in self.processes:
+                process.join()
+            self.conns = []
+            self.processes = []
+
+    def receive(self, conn):
+        reply = conn.recv()
+        if isinstance(reply, PartitionError):
+            raise reply
+        return reply
+
+    def receiveTimes(self):
+        # Every worker's answer to deliver (or starting up): when its next event is, and when its next timer is
+        times = [self.receive(conn) for conn in self.conns]
+        self.nextTimes = [events for events, _ in times]
+        self.nextTimers = [timer for _, timer in times]
+
+    def broadcast(self, command):
+        # Sends command to every worker, then collects their answers in worker order
+        for conn in self.conns:
+            conn.send(command)
+        return [self.receive(conn) for conn in self.conns]
+
+    def checkLookahead(self, R1, R2, delay):
+        if self.owners[R1] != self.owners[R2]:
+            if delay < 1:
+                raise ValueError(f"Link between routers {R1} and {R2} crosses partitions, so it needs a delay of at "
+                                 f"least 1 tick (got {delay})")
+            self.lookahead = min(self.lookahead, delay)
+
+    def cutEdges(self):
+        # How many links currently go between two different partitions
+        return cutSize(self.owners, ((link.R1, link.R2) for link in self.network.links.slots if link is not None))
+
+    def advance(self, until):
+        '''
+        Same as Network.advance. Every worker runs up to the same barrier, which is never more than lookahead ticks
+        past the earliest event or timer anyone has, then they swap messages and go again.
+        '''
+        while True:
+            pending = [t for t in self.nextTimes + self.nextTimers if t is not None]
+            if not pending or min(pending) >= until:
+                break
+            barrier = min(until, min(pending) + self.lookahead)
+            outboxes = self.broadcast(("advance", barrier))
+            for index, conn in enumerate(self.conns):
+                sources = [(worker, name, *sections[index])
+                           for worker, (name, sections) in enumerate(outboxes) if index in sections]
+                conn.send(("deliver", sources))
+            self.receiveTimes()
+        self.T = until
+
+    def tick(self):
+        self.advance(self.T + 1)
+
+    def run(self, ticks):
+        self.advance(self.T + ticks)
+        return self.T
+
+    def nextTime(self):
+        # Just events, like Network.events.nextTime, so run_until_converged checks on the same ticks a Network does
+        pending = [t for t in self.nextTimes if t is not None]
+        return min(pending) if pending else None
+
+    def nextTimer(self):
+        pending = [t for t in self.nextTimers if t is not None]
+        return min(pending) if pending else None
+
+    def isConverged(self):
+        return all(self.broadcast(("converged",)))
+
+    def run_until_converged(self, maxTicks=10000):
+        '''
+        Same as Network.run_until_converged, checking at the same ticks so it stops on the same one.
+        '''
+        end = self.T + maxTicks
+        while self.T < end:
+            nextTime = self.nextTime()
+            if nextTime is None or nextTime >= end:
+                nextTime = self.nextTimer()
+                if nextTime is None or nextTime >= end:
+                    break
+            self.advance(nextTime + 1)
+            if self.isConverged():
+                return self.T
+        self.advance(end)
+        return None
+
+    def getRouterState(self, ID):
+        '''
+        (routing table, LSDB) of router ID, fetched from whichever worker owns it.
+        '''
+        conn = self.conns[self.owners[ID]]
+        conn.send(("state", ID))
+        return self.receive(conn)
+
+    # Topology changes happen on the coordinator's copy first (so the rng gets used exactly like it would be in a
+    # single Network), then the finished change goes out to every worker
+
+    def buildConnection(self, cost, R1, P1, R2, P2, delay=DEFAULT_LINK_DELAY):
+        self.checkLookahead(R1, R2, delay)
+        self.network.T = self.T
+        slot = self.network.buildConnection(cost, R1, P1, R2, P2, delay)
+        self.broadcast(("build", cost, R1, P1, R2, P2, delay))
+        return slot
+
+    def blowUpLink(self, slot):
+        self.network.T = self.T
+        link = self.network.blowUpLink(slot)
+        self.broadcast(("cut", link.R1, link.P1))
+        return link
+
+    def blowUpRandomConnection(self):
+        self.network.T = self.T
+        link = self.network.blowUpRandomConnection()
+        if link is not None:
+            self.broadcast(("cut", link.R1, link.P1))
+        return link
+
+    def createRandomConnection(self):
+        self.network.T = self.T
+        slot = self.network.createRandomConnection()
+        if slot is not None:
+            link = self.network.links.slots[slot]
+            self.checkLookahead(link.R1, link.R2, link.delay)
+            self.broadcast(("build", link.cost, link.R1, link.P1, link.R2, link.P2, link.delay))
+        return slot
+
+
+if __name__ == "__main__":
+    # Runs the same network both ways and checks they really do come out the same
+    eventLog.level = LEVEL_WARNING
+    eventLog.start()
+    seed = getrandbits(32)
+    single = Network(ROUTERCOUNT, EDGECOUNT, seed=seed)
+    singleAt = single.run_until_converged()
+    with PartitionedNetwork(ROUTERCOUNT, EDGECOUNT, seed=seed, workers=max(2, DEFAULT_WORKERS)) as split:
+        splitAt = split.run_until_converged()
+        same = all(split.getRouterState(R.ID) == (R.routingTable, R.nodeLSPs) for R in single.Routers)
+        print(f"Seed {seed}: {split.workers} partitions with {split.cutEdges()} links between them")
+    print(f"Single process converged at tick {singleAt}, partitioned at tick {splitAt}, "
+          f"routing tables and LSDBs {'match' if same else 'DO NOT match'}")
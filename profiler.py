@@ -0,0 +1,241 @@
+# Profiling counters. A Profiler hooks itself into a network and counts what goes on during every tick: messages sent
+# by type, how many neighbors each flood went out to, routing recalculations, SPF runs and how long they took, how big
+# the LSDBs and the event queue are, and how long the tick and every router in it took. Each tick that had anything
+# happen on it becomes one row of a time series, which export() writes out as CSV (or JSON).
+#
+# With nothing hooked in the simulation only ever checks that network.profiler is None, so leaving it off costs next to
+# nothing.
+#
+#   profiler = Profiler(network)
+#   network.run(500)
+#   profiler.export("run.csv")
+
+## IMPORTS ##
+import csv
+import json
+from array import array
+from collections import Counter
+from time import perf_counter
+
+from simulation import MessageTypeToHumanReadable
+
+## CONSTANTS ##
+
+# Rows the summaries (ticksPerSecond, messagesPerTick) look back over by default
+RECENT_TICKS = 50
+
+## FORMATS ##
+# (column, array type) for every column of the time series, in order
+COLUMNS = [
+    ("tick", "q"),
+    ("seconds", "d"),  # Wall time spent running the tick
+    ("events", "q"),  # Events out of the queue
+    ("timersFired", "q"),  # Timers that went off (LSPs aging out, dead neighbors, retransmits)
+    ("hellos", "q"),  # Messages sent, by type
+    ("helloAcks", "q"),
+    ("lsps", "q"),
+    ("lsacks", "q"),
+    ("floods", "q"),  # floodLSP calls
+    ("floodFanout", "q"),  # Neighbors those floods went out to, all together
+    ("recalculations", "q"),  # recalculateRouting calls
+    ("SPFRuns", "q"),
+    ("SPFSeconds", "d"),
+    ("queueDepth", "q"),  # Events still in the queue at the end of the tick
+    ("timers", "q"),  # Timers still on the timing wheel at the end of the tick
+    ("LSDBTotal", "q"),  # LSPs in every LSDB, all together
+    ("LSDBMax", "q"),  # LSPs in the biggest LSDB
+    ("slowestRouter", "q"),  # Router that spent the longest on its events this tick
+    ("slowestSeconds", "d")
+]
+
+# Message type : the column counting them
+SENT_COLUMNS = {0: "helloAcks", 1: "hellos", 2: "lsps", 3: "lsacks"}
+
+
+class Profiler:
+    '''
+    Profiles network from now on. It hooks itself in as network.profiler until close().
+    Rows only get made for ticks something actually happened on, since the clock skips straight over the rest.
+    '''
+
+    def __init__(self, network):
+        self.network = network
+        self.columns = {name: array(kind) for name, kind in COLUMNS}
+        self.routerSeconds = [0.0] * (network.size + 1)  # router ID : wall time spent on its events since the start
+        # LSDB sizes, kept up to date through LSDBChanged so closing a row doesn't have to count every LSDB again
+        self.LSDBSizes = [0] * (network.size + 1)  # router ID : LSPs in its LSDB
+        for router in network.Routers:
+            self.LSDBSizes[router.ID] = len(router.nodeLSPs)
+        self.LSDBCounts = Counter(self.LSDBSizes[1:])  # LSDB size : how many routers have an LSDB that size
+        self.LSDBTotal = sum(self.LSDBSizes)
+        self.LSDBMax = max(self.LSDBCounts, default=0)
+        self.reset()
+        self.tick = None  # Tick the open row is counting, None if there isn't one
+        network.profiler = self
+
+    def reset(self):
+        # Clears the counters for the next row
+        self.sent = [0] * len(MessageTypeToHumanReadable)
+        self.events = 0
+        self.timersFired = 0
+        self.floods = 0
+        self.floodFanout = 0
+        self.recalculations = 0
+        self.SPFRuns = 0
+        self.SPFSeconds = 0.0
+        self.tickRouterSeconds = {}
+        self.startedAt = None
+
+    def close(self):
+        self.endTick()
+        if self.network.profiler is self:
+            self.network.profiler = None
+
+    ## Hooks, called by the simulation ##
+
+    def startTick(self, T):
+        # Called by Network.runEvents before anything happens on tick T, everything counted from then on goes in its row
+        if T != self.tick:
+            self.endTick()
+            self.tick = T
+            self.startedAt = perf_counter()
+
+    def runEvent(self, router, origin, eventType, args):
+        # Called by Network.runEvents instead of router.handleEvent
+        self.startTick(self.network.T)
+        started = perf_counter()
+        router.handleEvent(origin, eventType, args)
+        seconds = perf_counter() - started
+        self.events += 1
+        self.tickRouterSeconds[router.ID] = self.tickRouterSeconds.get(router.ID, 0.0) + seconds
+
+    def runTimer(self, router, key):
+        # Called by Network.runEvents instead of router.handleTimer
+        started = perf_counter()
+        router.handleTimer(key)
+        seconds = perf_counter() - started
+        self.timersFired += 1
+        self.tickRouterSeconds[router.ID] = self.tickRouterSeconds.get(router.ID, 0.0) + seconds
+
+    def runSPF(self, router):
+        # Called by Router.handleEvent instead of router.runSPF
+        started = perf_counter()
+        router.runSPF()
+        self.SPFSeconds += perf_counter() - started
+        self.SPFRuns += 1
+
+    def flooded(self, fanout):
+        self.floods += 1
+        self.floodFanout += fanout
+
+    def LSDBChanged(self, router):
+        # Called whenever an LSP goes into router's LSDB or comes out of it: by Router.recalculateRouting, which nearly
+        # everything goes through, and by originateSummaries for the summaries that don't
+        size = len(router.nodeLSPs)
+        old = self.LSDBSizes[router.ID]
+        if size == old:
+            return None
+        self.LSDBSizes[router.ID] = size
+        self.LSDBTotal += size - old
+        counts = self.LSDBCounts
+        counts[size] += 1
+        counts[old] -= 1
+        if not counts[old]:
+            del counts[old]
+        if size > self.LSDBMax:
+            self.LSDBMax = size
+        # Sizes only ever move a little at a time, so this hardly ever steps more than once
+        while self.LSDBMax not in counts:
+            self.LSDBMax -= 1
+
+    def endTick(self):
+        '''
+        Closes the row for the tick that was being counted, if there is one. Network.runEvents calls this once
+        everything before the tick it stops on is done.
+        '''
+        if self.tick is None:
+            return None
+        network = self.network
+        seconds = perf_counter() - self.startedAt
+        slowestRouter, slowestSeconds = 0, 0.0
+        for ID, routerSeconds in self.tickRouterSeconds.items():
+            self.routerSeconds[ID] += routerSeconds
+            if routerSeconds > slowestSeconds:
+                slowestRouter, slowestSeconds = ID, routerSeconds
+
+        row = {
+            "tick": self.tick,
+            "seconds": seconds,
+            "events": self.events,
+            "timersFired": self.timersFired,
+            "floods": self.floods,
+            "floodFanout": self.floodFanout,
+            "recalculations": self.recalculations,
+            "SPFRuns": self.SPFRuns,
+            "SPFSeconds": self.SPFSeconds,
+            "queueDepth": len(network.events),
+            "timers": len(network.timers),
+            "LSDBTotal": self.LSDBTotal,
+            "LSDBMax": self.LSDBMax,
+            "slowestRouter": slowestRouter,
+            "slowestSeconds": slowestSeconds
+        }
+        for messageType, column in SENT_COLUMNS.items():
+            row[column] = self.sent[messageType]
+        for name, values in self.columns.items():
+            values.append(row[name])
+        self.tick = None
+        self.reset()
+
+    ## Summaries ##
+
+    def __len__(self):
+        return len(self.columns["tick"])
+
+    def ticksPerSecond(self, rows=RECENT_TICKS):
+        '''
+        Simulated ticks per second of wall time spent running them, over the last rows rows. Ticks nothing happened
+        on count too, they just didn't take any time. None until there are two rows to go by.
+        '''
+        ticks = self.columns["tick"][-rows:]
+        seconds = sum(self.columns["seconds"][-rows:])
+        if len(ticks) < 2 or not seconds:
+            return None
+        return (ticks[-1] - ticks[0] + 1) / seconds
+
+    def messagesPerTick(self, rows=RECENT_TICKS):
+        '''
+        Messages sent per tick, over the last rows rows (counting the ticks in between that had no rows).
+        '''
+        ticks = self.columns["tick"][-rows:]
+        if not ticks:
+            return None
+        messages = sum(sum(self.columns[column][-rows:]) for column in SENT_COLUMNS.values())
+        return messages / (ticks[-1] - ticks[0] + 1)
+
+    def slowestRouters(self, count=5):
+        '''
+        [(router ID, seconds), ...] for the count routers that spent the longest on their events, slowest first.
+        '''
+        ranked = sorted(range(1, len(self.routerSeconds)), key=self.routerSeconds.__getitem__, reverse=True)
+        return [(ID, self.routerSeconds[ID]) for ID in ranked[:count] if self.routerSeconds[ID] > 0]
+
+    def series(self):
+        '''
+        The time series as column name : list of values.
+        '''
+        return {name: values.tolist() for name, values in self.columns.items()}
+
+    def export(self, path):
+        '''
+        Writes the time series to path, one row per tick. JSON (column name : values) if path ends in .json, CSV
+        otherwise.
+        '''
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump(self.series(), file)
+            return None
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow([name for name, _ in COLUMNS])
+            writer.writerows(zip(*self.columns.values()))
@@ -0,0 +1,409 @@
+# Scripted topology changes. A scenario is a text file of changes to make to a network at given ticks: cutting and
+# restoring links, failing and restarting routers, changing link costs, partitioning the network and healing it.
+# Everything that happens on the same tick goes to the network as one batch (see Network.changeTopology), so a storm
+# of a few thousand correlated failures costs one update, not a few thousand. Anything random gets picked with the
+# scenario's own seeded rng out of the network as it is right then, so the same scenario on the same network (same seed)
+# plays out exactly the same every time.
+#
+# One change per line, blank lines and anything after a # ignored:
+#   <when> <action> <what>
+# when is a tick, counted from when the scenario starts:
+#   100            tick 100
+#   +20            20 ticks after the line before
+#   100..300/50    ticks 100, 150, 200, 250 and 300
+# Actions:
+#   cut LINKS                cut links (the scenario remembers them, for restore)
+#   restore PAIRS | all      build back links this scenario cut (3-4 5-9), with the cost and delay they had
+#   fail ROUTERS             routers crash, taking their links down with them
+#   restart ROUTERS | all    failed routers come back, with their links
+#   cost N LINKS             change the cost of links to N (random for a random one each)
+#   partition ROUTERS        cut every link between those routers and the rest of the network
+#   heal                     build back every link a partition cut
+# ROUTERS is any number of these, all together:
+#   7  3..12                 router IDs
+#   random 20  random 5%     that many (or that much of the network) at random, out of the ones it makes sense for
+#   area 2                   every router in area 2
+#   near 7 2                 every router at most 2 hops from router 7
+#   region 300 300 100       every router within 100 of (300, 300), where the viewer draws them
+#   all                      every router
+# LINKS is any number of these:
+#   3-4                      the link between routers 3 and 4
+#   random 20  random 5%     that many links (or that much of them) at random
+#   touching ROUTER          every link with either end in one of the ROUTERS terms above (touching region 300 300 100)
+#   within ROUTER            every link with both ends in it
+#   all                      every link
+#
+#   # A fiber cut and a flapping link, then a whole region going dark and coming back
+#   10 cut 3-4 5-9
+#   +40 restore all
+#   100..200/20 cut 1-2
+#   110..210/20 restore 1-2
+#   300 fail region 300 300 150
+#   +100 restart all
+#
+#   python scenario.py storm.txt --routers 1000 --generator ba --seed 1
+
+## IMPORTS ##
+import re
+import argparse
+from random import Random
+from math import ceil
+
+from topologies import randomCost
+
+## CONSTANTS ##
+
+ACTIONS = ["cut", "restore", "fail", "restart", "cost", "partition", "heal"]
+
+# How many words every ROUTERS term takes up, its name included
+ROUTER_TERMS = {"random": 2, "area": 2, "near": 3, "region": 4, "all": 1}
+
+WHEN = re.compile(r"^(\+?)(\d+)(?:\.\.(\d+)/(\d+))?$")
+RANGE = re.compile(r"^(\d+)\.\.(\d+)$")
+PAIR = re.compile(r"^(\d+)-(\d+)$")
+
+
+def readCount(word, total):
+    # N or N% of total
+    if word.endswith("%"):
+        return ceil(total * float(word[:-1]) / 100)
+    return int(word)
+
+
+class Scenario:
+    '''
+    A parsed scenario, ready to play on a network with run() (headless) or applyDue() (a tick at a time, from
+    whatever is stepping the network, like the viewer). Ticks count from the tick the network is on the first time
+    either gets called.
+    '''
+
+    def __init__(self, text, seed=None, name="scenario"):
+        self.name = name
+        self.rng = Random(seed)
+        self.start = None
+        # Batches in tick order: (tick, [(line number, action, words), ...]) with every change on that tick
+        self.batches = []
+        self.nextBatch = 0
+        self.cut = {}  # (lower router ID, higher router ID) : (cost, delay) for every link it cut that's still down
+        self.partitioned = set()  # The pairs in cut that a partition cut
+
+        byTick = {}
+        last = 0
+        for number, line in enumerate(text.splitlines(), 1):
+            words = line.split("#", 1)[0].split()
+            if not words:
+                continue
+            if len(words) < 2:
+                self.error(number, "needs a tick and an action")
+            match = WHEN.match(words[0])
+            if match is None:
+                self.error(number, f"{words[0]!r} isn't a tick")
+            relative, first, end, step = match.groups()
+            first = int(first) + (last if relative else 0)
+            if end is None:
+                ticks = [first]
+            elif relative or int(step) <= 0:
+                self.error(number, f"{words[0]!r} needs an absolute start and a step of at least 1")
+            else:
+                ticks = list(range(first, int(end) + 1, int(step)))
+            action = words[1]
+            if action not in ACTIONS:
+                self.error(number, f"unknown action {action!r}, it can be one of {', '.join(ACTIONS)}")
+            self.check(number, action, words[2:])
+            for tick in ticks:
+                byTick.setdefault(tick, []).append((number, action, words[2:]))
+            last = first
+        self.batches = sorted(byTick.items())
+
+    @classmethod
+    def load(cls, path, seed=None):
+        with open(path) as file:
+            return cls(file.read(), seed, path)
+
+    def __len__(self):
+        return len(self.batches)
+
+    def error(self, number, message):
+        raise ValueError(f"{self.name} line {number}: {message}")
+
+    def check(self, number, action, words):
+        # Catches whatever is wrong with a line while the file is being read, instead of halfway through a run
+        if action == "heal":
+            if words:
+                self.error(number, "heal doesn't take anything")
+            return None
+        if action == "cost":
+            if not words or not (words[0].isdigit() or words[0] == "random"):
+                self.error(number, "cost needs a cost (or random) and then the links")
+            words = words[1:]
+        if not words:
+            self.error(number, f"{action} needs something to {action}")
+        if action in ("restore", "restart") and words == ["all"]:
+            return None
+        if action == "restore" and not all(PAIR.match(word) for word in words):
+            self.error(number, "restore only takes router pairs (3-4) or all")
+        terms = self.linkTerms if action in ("cut", "restore", "cost") else self.routerTerms
+        try:
+            for _ in terms(words):
+                pass
+        except (ValueError, IndexError) as error:
+            self.error(number, f"can't read {' '.join(words)!r} ({error})")
+
+    ## Picking routers and links ##
+
+    def routerTerms(self, words):
+        # Splits words into ROUTERS terms, (name, arguments)
+        i = 0
+        while i < len(words):
+            word = words[i]
+            if word.isdigit() or RANGE.match(word):
+                yield ("ids", [word])
+                i += 1
+                continue
+            size = ROUTER_TERMS.get(word)
+            if size is None or i + size > len(words):
+                raise ValueError(f"{word!r} isn't a router")
+            arguments = words[i + 1:i + size]
+            for argument in arguments:
+                if not argument.rstrip("%").isdigit():
+                    raise ValueError(f"{argument!r} isn't a number")
+            yield (word, arguments)
+            i += size
+
+    def linkTerms(self, words):
+        # Splits words into LINKS terms, (name, arguments), where touching and within have a ROUTERS term as theirs
+        i = 0
+        while i < len(words):
+            word = words[i]
+            if PAIR.match(word):
+                yield ("pair", [word])
+                i += 1
+            elif word == "all":
+                yield ("all", [])
+                i += 1
+            elif word == "random" and i + 1 < len(words) and words[i + 1].rstrip("%").isdigit():
+                yield ("random", [words[i + 1]])
+                i += 2
+            elif word in ("touching", "within"):
+                if i + 1 >= len(words):
+                    raise ValueError(f"{word} needs routers")
+                term = next(self.routerTerms(words[i + 1:]))
+                size = 1 if term[0] == "ids" else ROUTER_TERMS[term[0]]
+                yield (word, [term])
+                i += 1 + size
+            else:
+                raise ValueError(f"{word!r} isn't a link")
+
+    def routers(self, network, words, candidates=None):
+        '''
+        The router IDs words picks out, in order. candidates are the ones random picks from (every router if None).
+        '''
+        picked = {}
+        for name, arguments in self.routerTerms(words):
+            picked.update(dict.fromkeys(self.routerTerm(network, name, arguments, candidates)))
+        return list(picked)
+
+    def routerTerm(self, network, name, arguments, candidates=None):
+        size = network.size
+        if name == "ids":
+            match = RANGE.match(arguments[0])
+            first, last = (int(match[1]), int(match[2])) if match else (int(arguments[0]),) * 2
+            if not 1 <= first <= last <= size:
+                raise ValueError(f"{self.name}: no routers {arguments[0]} in a network of {size}")
+            return range(first, last + 1)
+        if name == "random":
+            pool = list(range(1, size + 1)) if candidates is None else sorted(candidates)
+            return self.rng.sample(pool, min(readCount(arguments[0], len(pool)), len(pool)))
+        if name == "area":
+            return [x for x in range(1, size + 1) if network.areas[x] == int(arguments[0])]
+        if name == "near":
+            start, hops = int(arguments[0]), int(arguments[1])
+            seen = {start}
+            frontier = [start]
+            for _ in range(hops):
+                reached = []
+                for node in frontier:
+                    for adj in sorted(network.SimplifiedConnections[node]):
+                        if adj not in seen:
+                            seen.add(adj)
+                            reached.append(adj)
+                frontier = reached
+            return sorted(seen)
+        if name == "region":
+            x, y, radius = map(int, arguments)
+            return [ID for ID, (px, py) in enumerate(network.RouterPositions, 1)
+                    if (px - x) ** 2 + (py - y) ** 2 <= radius ** 2]
+        return range(1, size + 1)  # all
+
+    def links(self, network, words, number, action):
+        '''
+        The slots of the links words (from line number, for action) picks out, in order. A pair with no link between
+        them is an error, the same as one that can't be read.
+        '''
+        links = network.links
+        picked = {}
+        for name, arguments in self.linkTerms(words):
+            if name == "pair":
+                R1, R2 = map(int, PAIR.match(arguments[0]).groups())
+                slot = links.between(R1, R2)
+                if slot is None:
+                    self.error(number, f"can't {action} {arguments[0]}, there's no link there on tick "
+                                       f"{network.T - self.start}")
+                picked[slot] = None
+                continue
+            live = [slot for slot, link in enumerate(links.slots) if link is not None]
+            if name == "random":
+                picked.update(dict.fromkeys(self.rng.sample(live, min(readCount(arguments[0], len(live)), len(live)))))
+            elif name == "all":
+                picked.update(dict.fromkeys(live))
+            else:
+                ends = set(self.routerTerm(network, *arguments[0]))
+                for slot in live:
+                    link = links.slots[slot]
+                    if (name == "touching" and (link.R1 in ends or link.R2 in ends)) or \
+                            (name == "within" and link.R1 in ends and link.R2 in ends):
+                        picked[slot] = None
+        return list(picked)
+
+    ## Playing it ##
+
+    def apply(self, network, steps):
+        '''
+        Makes every change in steps (one batch's worth) to network in one changeTopology call. Returns what that did, as
+        a dict of counts of what actually changed (a cost that was already that, a router that was already down, don't
+        count). A pair that isn't there to cut, recost or restore is a ValueError, same as a line that can't be read.
+        '''
+        cut = []
+        build = []
+        costs = []
+        fail = []
+        restart = []
+        restored = set()
+        failed = {R.ID for R in network.Routers if not R.Active}
+        for number, action, words in steps:
+            if action == "cut":
+                cut += self.links(network, words, number, action)
+            elif action == "partition":
+                inside = set(self.routers(network, words))
+                for node in sorted(inside):
+                    for adj in sorted(network.SimplifiedConnections[node] - inside):
+                        cut.append(network.links.between(node, adj))
+                        self.partitioned.add((min(node, adj), max(node, adj)))
+            elif action in ("restore", "heal"):
+                if action == "heal":
+                    pairs = sorted(self.partitioned)
+                elif words == ["all"]:
+                    pairs = sorted(self.cut)
+                else:
+                    pairs = []
+                    for word in words:
+                        pair = tuple(sorted(map(int, PAIR.match(word).groups())))
+                        if pair not in self.cut:
+                            self.error(number, f"can't restore {word} on tick {network.T - self.start}, it isn't a "
+                                               f"link this scenario cut (or it's already back)")
+                        pairs.append(pair)
+                restored.update(pairs)
+            elif action == "fail":
+                fail += self.routers(network, words, {R.ID for R in network.Routers if R.Active})
+            elif action == "restart":
+                restart += sorted(failed) if words == ["all"] else self.routers(network, words, failed)
+            elif action == "cost":
+                for slot in self.links(network, words[1:], number, action):
+                    costs.append((slot, randomCost(self.rng) if words[0] == "random" else int(words[0])))
+
+        for pair in sorted(restored):
+            cost, delay = self.cut.pop(pair)
+            self.partitioned.discard(pair)
+            build.append((cost, pair[0], pair[1], delay))
+        for slot in cut:
+            link = network.links.slots[slot]
+            if link is not None:
+                self.cut[(min(link.R1, link.R2), max(link.R1, link.R2))] = (link.cost, link.delay)
+
+        failing = [ID for ID in dict.fromkeys(fail) if ID not in failed]
+        restarting = [ID for ID in dict.fromkeys(restart) if ID in failed]
+        cutLinks, built, recosted = network.changeTopology(cut, build, costs, failing, restarting)
+        return {"tick": network.T - self.start, "cut": len(cutLinks), "built": len(built), "recosted": len(recosted),
+                "failed": len(failing), "restarted": len(restarting)}
+
+    def applyDue(self, network):
+        '''
+        Applies every batch that's due by the tick network is on. For calling once a tick from whatever is stepping
+        the network. Returns what every batch it applied did (see apply).
+        '''
+        if self.start is None:
+            self.start = network.T
+        applied = []
+        while self.nextBatch < len(self.batches) and self.start + self.batches[self.nextBatch][0] <= network.T:
+            applied.append(self.apply(network, self.batches[self.nextBatch][1]))
+            self.nextBatch += 1
+        return applied
+
+    def done(self):
+        return self.nextBatch >= len(self.batches)
+
+    def run(self, network, maxTicks=10000, plane=None):
+        '''
+        Plays the whole scenario on network as fast as it'll go, then keeps going until it converges (or maxTicks more
+        ticks go by). plane is a dataplane.DataPlane to step instead of the network, to have traffic going the whole
+        time. Returns what every batch did (see apply), along with convergedAt: the tick (counted the same as the
+        scenario's) the network converged on after it, or None if the next batch came first.
+        '''
+        stepper = network if plane is None else plane
+        if self.start is None:
+            self.start = network.T
+        results = []
+        while not self.done():
+            stepper.advance(self.start + self.batches[self.nextBatch][0])
+            if results:
+                results[-1]["convergedAt"] = self.convergedAt(network, results[-1]["tick"])
+            results += self.applyDue(network)
+        if results:
+            if network.isConverged():
+                results[-1]["convergedAt"] = self.convergedAt(network, results[-1]["tick"])
+            else:
+                convergedAt = stepper.run_until_converged(maxTicks)
+                results[-1]["convergedAt"] = None if convergedAt is None else convergedAt - self.start
+        return results
+
+    def convergedAt(self, network, tick):
+        # When the network converged after the batch on tick, going by its convergence monitor, or None if it hasn't.
+        # A batch that didn't change anything (or only changed things back) has nothing to wait for.
+        if not network.isConverged():
+            return None
+        if network.convergenceTimes and network.convergenceTimes[-1][0] == network.changedAt:
+            return max(network.convergenceTimes[-1][1] - self.start, tick)
+        return tick
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+    from simulation import Network, ROUTERCOUNT, EDGECOUNT
+    from topologies import TopologyGenerators
+    from eventlog import eventLog, LEVEL_OFF, LEVEL_WARNING
+
+    parser = argparse.ArgumentParser(description="Play a scripted topology change scenario on a headless network")
+    parser.add_argument("scenario", help="scenario file")
+    parser.add_argument("--routers", type=int, default=ROUTERCOUNT)
+    parser.add_argument("--edges", type=int, default=None, help="links to build (default twice the routers)")
+    parser.add_argument("--generator", default="random", choices=sorted(TopologyGenerators))
+    parser.add_argument("--seed", type=int, default=1, help="seeds the network and the scenario both")
+    parser.add_argument("--areas", type=int, default=1, help="OSPF areas to split the network into")
+    parser.add_argument("--max-ticks", type=int, default=10000, help="most ticks to wait for convergence at the end")
+    parser.add_argument("--log", action="store_true", help="print the event log too")
+    args = parser.parse_args()
+
+    eventLog.level = LEVEL_WARNING if args.log else LEVEL_OFF
+    eventLog.start()
+    scenario = Scenario.load(args.scenario, args.seed)
+    FullNetwork = Network(args.routers, args.edges or 2 * args.routers, TopologyGenerators[args.generator], args.seed,
+                          args.areas)
+    print(f"{FullNetwork.size} routers, {len(FullNetwork.links)} links, converged at tick "
+          f"{FullNetwork.run_until_converged()}")
+    started = perf_counter()
+    for result in scenario.run(FullNetwork, args.max_ticks):
+        convergedAt = result["convergedAt"]
+        print(f"tick {result['tick']:>6}  {result['cut']:>5} cut {result['built']:>5} built "
+              f"{result['recosted']:>5} recosted {result['failed']:>5} failed {result['restarted']:>5} restarted  "
+              f"{'converged after ' + str(convergedAt - result['tick']) + ' ticks' if convergedAt is not None else 'still converging'}")
+    print(f"Finished at tick {FullNetwork.T} in {perf_counter() - started:.2f}s")
@@ -0,0 +1,2094 @@
+# Bootleg packet tracer (Real)
+
+# Simulation core. Nothing in here touches pygame, so the network can be stepped in a batch job,
+# a test, or on a box with no display. ospf.py is the pygame viewer that sits on top of this.
+
+## IMPORTS ##
+from random import Random
+from heapq import heappush, heappop, heapify
+from operator import itemgetter
+
+from eventlog import eventLog, C, LEVEL_VERBOSE, LEVEL_DEBUG, LEVEL_WARNING
+from topologies import randomGraph, randomCost, assignAreas
+
+## CONSTANTS ##
+
+# The number of ticks between HELLOs for the Router. Routers start with a random offset.
+ROUTER_HELLO_INTERVAL = 5
+
+# How long a router waits without hearing a single HELLO from a neighbor before it declares the neighbor dead. Four
+# missed HELLOs, same as OSPF's default, so a message or two going missing doesn't take the adjacency down.
+ROUTER_DEAD_INTERVAL = 4 * ROUTER_HELLO_INTERVAL
+
+# How long an LSP sent to a neighbor waits for an ack before it gets sent again. Has to be more than a round trip plus
+# ROUTER_ACK_DELAY, or LSPs get sent twice when the ack was on its way anyway.
+ROUTER_RXMT_INTERVAL = 5
+
+# How long a router holds on to acks before sending them, so everything it got from a neighbor in that time goes back in
+# one LSACK instead of one each
+ROUTER_ACK_DELAY = 1
+
+# The number of ticks between auto generated LSPs for the Router.
+ROUTER_LSP_INTERVAL = 50
+
+# How many ticks an LSP can sit in an LSDB without getting refreshed before it ages out and gets flushed. Has to be well
+# past ROUTER_LSP_INTERVAL plus the time an LSP takes to cross the whole network, or LSPs would age out before their
+# refresh ever got there.
+LSP_MAX_AGE = 1000
+
+# Age an LSP picks up on every hop (OSPF's InfTransDelay)
+LSP_TRANSIT_AGE = 1
+
+# How many ticks a message spends on the wire before the other router gets it, unless the connection says otherwise.
+DEFAULT_LINK_DELAY = 1
+
+DX = 750  # X resolution, routers get placed inside of this
+DY = 750  # Y resolutoin
+
+ROUTERCOUNT = 6
+EDGECOUNT = 12
+
+## REFERENCE DICTONARIES ##
+MessageTypeToHumanReadable = {
+    0: "HELLO-ACK",
+    1: "HELLO",
+    2: "LSP",
+    3: "LSACK"
+}
+
+# Things that can sit in the event queue. Stored as plain numbers + args instead of lambdas so the queue is just data.
+EVENT_HELLO = 0  # Router's hello timer went off
+EVENT_LSP_REFRESH = 1  # Router's LSP timer went off
+EVENT_DELIVER = 2  # A message came off the wire. args: (sending port, recieving port, message type, data)
+# (for LSP messages data is (LSP, age), since the age is different on every hop and the LSP itself is shared, and for
+# LSACKs it's a tuple of (originator ID, sequence number) for every LSP being acked)
+EVENT_SPF = 3  # Router recalculates its routing table from everything that changed this tick
+EVENT_ORIGINATE = 4  # Router puts out a new LSP for all of its adjacencies that changed this tick
+EVENT_FLOOD = 5  # Router floods every LSP it took in this tick, to whoever didn't send it a copy
+EVENT_ACK = 6  # Router sends the acks it has been holding on to
+
+# Neighbor states, per port. Down is just not having an entry in Router.neighborStates at all.
+NEIGHBOR_DOWN = 0  # Nothing heard on the port (or not for ROUTER_DEAD_INTERVAL ticks)
+NEIGHBOR_INIT = 1  # Heard a HELLO from them, but it didn't list this router yet
+NEIGHBOR_TWO_WAY = 2  # Their HELLO lists this router, so both ends can hear each other
+NEIGHBOR_FULL = 3  # LSDBs exchanged, the adjacency is in both routers' LSPs
+
+NeighborStateToHumanReadable = {
+    NEIGHBOR_DOWN: "Down",
+    NEIGHBOR_INIT: "Init",
+    NEIGHBOR_TWO_WAY: "2-Way",
+    NEIGHBOR_FULL: "Full"
+}
+
+# Origin used for events that have to run after everything else a router gets on the same tick (flooding goes two
+# before SPF so every copy that came in this tick is known about, LSP origination one before so the new LSP is in the
+# LSDB when the tree gets rebuilt)
+END_OF_TICK = 1 << 62
+
+# Set on the timing wheel keys of dead timers and retransmit timers, to tell them apart from LSPs aging out (see
+# deadTimerKey and Router.retransmit)
+DEAD_TIMER = 1 << 62
+RXMT_TIMER = 1 << 61
+TIMER_KINDS = DEAD_TIMER | RXMT_TIMER
+
+# If more than this fraction of a router's LSDB changed since the last SPF run, just redo the whole tree
+FULL_SPF_FRACTION = 0.25
+
+# LSDB digests are kept to 64 bits
+DIGEST_MASK = (1 << 64) - 1
+
+# An LSP's ID (what it's keyed by in an LSDB, on a retransmit list, in an ack, ...) is the router that made it, the area
+# it's flooded in shifted up by AREA_SHIFT, and SUMMARY_LSP if it's an area border router's summary instead of a router
+# LSP (see lspID). A router LSP in the backbone has the router's ID as its ID, so without areas nothing changes.
+AREA_SHIFT = 20
+ORIGIN_MASK = (1 << AREA_SHIFT) - 1
+AREA_MASK = (1 << 11) - 1
+SUMMARY_LSP = 1 << 31
+MAX_ROUTERS = ORIGIN_MASK
+MAX_AREAS = AREA_MASK + 1
+
+# Port number of no port at all (E.G. the entries in a summary LSP, which aren't about any one port)
+NO_PORT = 0xFFFFFFFF
+
+# Timing wheel shape: WHEEL_LEVELS levels of 2^WHEEL_BITS slots each, so the top level reaches 2^24 ticks ahead
+WHEEL_BITS = 6
+WHEEL_LEVELS = 4
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+
+## LOG MESSAGES ##
+# Templates for eventLog. {T} is the tick, the rest get filled in by the writer thread, not by the router.
+MSG_SEND_FAILED = C.RED + "[- {T}] Failed {0} message from router {1} on port {2}" + C.END
+MSG_LOST_ON_WIRE = C.RED + "[v- {T}] {0} from router {1} to router {2} was lost on the wire" + C.END
+MSG_BROADCASTING = "[i {T}] Router {0} broadcasting latest LSP ({1})"
+MSG_FORWARDING = "[vi {T}] Router {0} forwarding Router {1}'s LSP (SEQ {2})"
+MSG_REMOVING_PORT = C.YELLOW + "[! {T}] Removing port {0} from router {1}'s active ports" + C.END
+MSG_NEIGHBOR_INIT = "[vi {T}] Router {0} port {1} heard from router {2} (Init)"
+MSG_FULL_LONG = C.GREEN + "[v+ {T}] Router {0} port {1} is Full with router {2}, cost {3} ({4} LSPs sent in the exchange)" + C.END
+MSG_CONNECTED = C.GREEN + "[+ {T}] Router {0} connected to router {1} on port {2}" + C.END
+MSG_NEIGHBOR_DEAD = C.YELLOW + "[! {T}] Router {0} heard nothing from router {1} on port {2} in {3} ticks, declaring it down" + C.END
+MSG_ONE_WAY = C.YELLOW + "[! {T}] Router {0} port {1}: router {2} stopped listing it in HELLOs, back to Init" + C.END
+MSG_FLUSHED = C.BLUE + "[! {T}] Router {0} recieved and is flooding a MaxAge LSP message (SRC {1} SEQ {2} FWD {3})" + C.END
+MSG_FLUSHED_LEFT = C.BLUE + "[! {T}] Router {0} flushing router {1}'s LSP in area {2} (SEQ {3}), it's cut off from the area" + C.END
+MSG_AGED_OUT = C.BLUE + "[! {T}] Router {0} aged out LSP with SRC {1} SEQ {2}" + C.END
+MSG_PREMATURE_AGING = C.BLUE + "[! {T}] Router {0} flushing its own LSP (SEQ {1})" + C.END
+MSG_ACCEPT_LONG = C.GREEN + "[v+ {T}] Router {0} accepts LSP with SRC {1} SEQ {2} FWD {3} AGE {4} (Contains {5} ADJ)" + C.END
+MSG_ACCEPT_DIRECT = C.GREEN + "[+ {T}] Router {0} accepts LSP broadcasted by {1}" + C.END
+MSG_ACCEPT_FORWARDED = C.GREEN + "[+ {T}] Router {0} accepts LSP sourced from {1} and forwarded by {2}" + C.END
+MSG_DENY = C.RED + "[v- {T}] Router {0} denies LSP with SRC {1} SEQ {2} FWD {3} (More recent or equal LSP of SEQ {4})" + C.END
+MSG_RETRANSMITTING = C.YELLOW + "[v! {T}] Router {0} retransmitting {1} unacked LSPs on port {2}" + C.END
+MSG_SAYING_HELLO = "[vi {T}] Router {0} saying hello"
+MSG_PORT_DOWN = C.YELLOW + "[i {T}] Declaring port {0} on router {1} down" + C.END
+MSG_GENERATING_LSP = "[i {T}] Router {0} generating new LSP (SEQ {1})"
+MSG_SUMMARIZING = "[vi {T}] Router {0} summarizing {1} areas into area {2} (SEQ {3})"
+MSG_EDGE_CUT = C.YELLOW + "[! {T}] Edge from node {0} to {1} cut" + C.END
+MSG_EDGE_CREATED = C.YELLOW + "[! {T}] Edge from router {0} port {1} to {2} port {3} created with weight {4}" + C.END
+MSG_TOPOLOGY_CHANGED = C.YELLOW + "[! {T}] Topology change: {0} links cut, {1} built, {2} recosted, {3} routers failed, {4} restarted" + C.END
+MSG_CONVERGED = C.LIGHT_GREEN + "[+ {T}] Network converged {0} ticks after the last topology change" + C.END
+
+
+'''
+SIMULATION LIMITATIONS:
+
+The number keys only select routers 1 - 9, anything past that has to be clicked on.
+Routers can fail and restart (see Router.fail and scenario.py), but they go down without flushing their LSPs, so the
+rest of the network only finds out when its dead timers go off.
+Routers themselves are not added or subtracted from the network.
+The tick system is... imperfect, to say the least. Travel time of packets is just a whole number of ticks per connection.
+Every link is point-to-point, so there's no DR/BDR election, and the database exchange is just sending the new neighbor
+the whole LSDB instead of going through DBD/LSR packets.
+Areas don't have address ranges, so every area gets summarized as a whole: an area border router puts one entry per area
+in its summaries, costed as the farthest router in it (how OSPF costs a summarized range). Which area a router is in is
+the network's address plan, so every router can look it up. A link between two different areas that are both not the
+backbone goes in the lower numbered one, with no virtual links the backbone has to stay in one piece on its own.
+Routers in more than one area run one SPF over all of them together instead of one per area.
+Convergence only goes by router LSPs, summaries aren't part of the digests.
+
+'''
+
+
+class EventQueue:
+    '''
+    Heap of everything that is going to happen, keyed by the tick it happens on.
+    Each entry is (tick, target router, origin router, origin's counter, event type, args). Ties on the same tick are
+    broken by the router IDs and the origin's own counter instead of the order things were pushed, so what happens
+    only depends on what each router did and not on the order the routers got stepped in.
+    '''
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, time, target, origin, counter, eventType, args=()):
+        heappush(self.heap, (time, target, origin, counter, eventType, args))
+
+    def nextTime(self):
+        # The tick of the next thing that will happen, or None if nothing is scheduled at all
+        return self.heap[0][0] if self.heap else None
+
+    def pop(self):
+        return heappop(self.heap)
+
+
+class TimingWheel:
+    '''
+    Hierarchical timing wheel, for timers that almost always get pushed back or called off before they go off (every
+    LSP in every LSDB is waiting to age out, and nearly all of them get refreshed first).
+    Level 0 has a slot for each tick of the current 2^WHEEL_BITS tick stretch, each level above covers 2^WHEEL_BITS
+    times as much per slot, and entries drop down a level when the clock gets to the slot they're sitting in. Scheduling
+    and cancelling are O(1), and moving the clock forward only costs anything for entries that actually come due,
+    instead of scanning everything that's waiting. Keys can be anything hashable, each one is scheduled at most once.
+    '''
+
+    def __init__(self, time=0):
+        self.time = time  # Everything before this tick already went off
+        self.levels = [[{} for _ in range(WHEEL_SIZE)] for _ in range(WHEEL_LEVELS)]  # slot: key : None
+        self.counts = [0] * WHEEL_LEVELS  # Entries in each level
+        self.overflow = {}  # Entries too far off for even the top level
+        self.due = {}  # key : tick it goes off on
+
+    def __len__(self):
+        return len(self.due)
+
+    def slot(self, tick):
+        # (level, the slot tick goes in) going by where the clock is now
+        for level in range(WHEEL_LEVELS):
+            shift = WHEEL_BITS * (level + 1)
+            if tick >> shift == self.time >> shift:
+                return level, self.levels[level][(tick >> (WHEEL_BITS * level)) & WHEEL_MASK]
+        return WHEEL_LEVELS, self.overflow
+
+    def schedule(self, key, tick):
+        '''
+        Sets key to go off on tick, replacing whenever it was going to go off before.
+        '''
+        if key in self.due:
+            self.cancel(key)
+        tick = max(tick, self.time)
+        level, slot = self.slot(tick)
+        slot[key] = None
+        if level < WHEEL_LEVELS:
+            self.counts[level] += 1
+        self.due[key] = tick
+
+    def cancel(self, key):
+        tick = self.due.pop(key, None)
+        if tick is not None:
+            level, slot = self.slot(tick)
+            del slot[key]
+            if level < WHEEL_LEVELS:
+                self.counts[level] -= 1
+
+    def nextDue(self):
+        '''
+        The tick the next timer goes off on, or None if there aren't any, without moving the clock. Everything on a lower
+        level goes off before anything on a higher one, so only the first non-empty slot of the lowest non-empty level
+        ever gets looked inside.
+        '''
+        for level in range(WHEEL_LEVELS):
+            if self.counts[level]:
+                slots = self.levels[level]
+                for index in range((self.time >> (WHEEL_BITS * level)) & WHEEL_MASK, WHEEL_SIZE):
+                    if slots[index]:
+                        return min(self.due[key] for key in slots[index])
+        if self.overflow:
+            return min(self.due[key] for key in self.overflow)
+        return None
+
+    def cascade(self):
+        # The clock just got to the start of a slot on one or more levels, so everything in those moves down
+        moving = []
+        if self.time & ((1 << (WHEEL_BITS * WHEEL_LEVELS)) - 1) == 0:
+            moving.extend(self.overflow)
+            self.overflow.clear()
+        for level in range(WHEEL_LEVELS - 1, 0, -1):
+            if self.time & ((1 << (WHEEL_BITS * level)) - 1) == 0:
+                slot = self.levels[level][(self.time >> (WHEEL_BITS * level)) & WHEEL_MASK]
+                self.counts[level] -= len(slot)
+                moving.extend(slot)
+                slot.clear()
+        for key in moving:
+            tick = self.due[key]
+            level, slot = self.slot(tick)
+            slot[key] = None
+            if level < WHEEL_LEVELS:
+                self.counts[level] += 1
+
+    def advance(self, limit):
+        '''
+        Moves the clock up to the first tick before limit that anything goes off on, and returns (that tick, the keys
+        that went off) with the clock just past it. If nothing goes off before limit, the clock ends on limit and this
+        returns None. Stretches with nothing waiting get skipped a whole slot of the lowest non-empty level at a time.
+        '''
+        slots = self.levels[0]
+        while self.time < limit:
+            t = self.time
+            if self.counts[0] == 0:
+                empty = 1
+                while empty < WHEEL_LEVELS and self.counts[empty] == 0:
+                    empty += 1
+                if empty == WHEEL_LEVELS and not self.overflow:
+                    self.time = limit
+                    return None
+                self.time = min(limit, (t | ((1 << (WHEEL_BITS * empty)) - 1)) + 1)
+                if self.time & WHEEL_MASK == 0:
+                    self.cascade()
+                continue
+            slot = slots[t & WHEEL_MASK]
+            keys = None
+            if slot:
+                keys = list(slot)
+                slot.clear()
+                self.counts[0] -= len(keys)
+                for key in keys:
+                    del self.due[key]
+            self.time = t + 1
+            if self.time & WHEEL_MASK == 0:
+                self.cascade()
+            if keys is not None:
+                return t, keys
+        return None
+
+
+class Link:
+    '''
+    One connection between two routers. Router R1's port P1 goes to router R2's port P2.
+    '''
+    __slots__ = ("cost", "R1", "P1", "R2", "P2", "delay")
+
+    def __init__(self, cost, R1, P1, R2, P2, delay):
+        self.cost = cost
+        self.R1 = R1
+        self.P1 = P1
+        self.R2 = R2
+        self.P2 = P2
+        self.delay = delay
+
+    def far(self, router):
+        # (router ID, port) on the other end from router
+        if router == self.R1:
+            return self.R2, self.P2
+        return self.R1, self.P1
+
+
+class LinkTable:
+    '''
+    Every link lives in a numbered slot. ports maps (router ID, port) to the slot of the link plugged into it and
+    pairs maps (lower router ID, higher router ID) to the slot joining them, so finding, adding and removing a link are
+    all one dict operation instead of a scan of a router's connection list. Freed slots get reused.
+    '''
+
+    def __init__(self):
+        self.slots = []  # slot : Link, or None if the slot is free
+        self.freeSlots = []
+        self.ports = {}  # (router ID, port) : slot
+        self.pairs = {}  # (lower router ID, higher router ID) : slot
+
+    def __len__(self):
+        return len(self.ports) // 2
+
+    def add(self, cost, R1, P1, R2, P2, delay=DEFAULT_LINK_DELAY):
+        link = Link(cost, R1, P1, R2, P2, delay)
+        if self.freeSlots:
+            slot = self.freeSlots.pop()
+            self.slots[slot] = link
+        else:
+            slot = len(self.slots)
+            self.slots.append(link)
+        self.ports[(R1, P1)] = slot
+        self.ports[(R2, P2)] = slot
+        self.pairs[(min(R1, R2), max(R1, R2))] = slot
+        return slot
+
+    def remove(self, slot):
+        link = self.slots[slot]
+        del self.ports[(link.R1, link.P1)]
+        del self.ports[(link.R2, link.P2)]
+        del self.pairs[(min(link.R1, link.R2), max(link.R1, link.R2))]
+        self.slots[slot] = None
+        self.freeSlots.append(slot)
+        return link
+
+    def get(self, router, port):
+        # The link plugged into router's port, or None if there isn't one
+        slot = self.ports.get((router, port))
+        if slot is None:
+            return None
+        return self.slots[slot]
+
+    def between(self, R1, R2):
+        # The slot of the link joining R1 and R2, or None if they aren't connected
+        return self.pairs.get((min(R1, R2), max(R1, R2)))
+
+    def randomSlot(self, rng):
+        # A random slot that has a link in it, or None if there are no links at all
+        if not self.ports:
+            return None
+        while True:
+            slot = rng.randint(0, len(self.slots) - 1)
+            if self.slots[slot] is not None:
+                return slot
+
+
+def portName(number):
+    '''
+    A, B, ... Z, AA, AB, ... like spreadsheet columns, so routers never run out of port names.
+    '''
+    if number == NO_PORT:
+        return None
+    name = ""
+    number += 1
+    while number:
+        number, letter = divmod(number - 1, 26)
+        name = chr(letter + 65) + name
+    return name
+
+
+def portNumber(name):
+    '''
+    The other way around from portName: A is 0, Z is 25, AA is 26. None is NO_PORT.
+    '''
+    if name is None:
+        return NO_PORT
+    number = 0
+    for letter in name:
+        number = number * 26 + ord(letter) - 64
+    return number - 1
+
+
+def lspID(router, area=0, summary=False):
+    # ID of router's LSP in area, or of its summary into area
+    return router | area << AREA_SHIFT | (SUMMARY_LSP if summary else 0)
+
+
+def lspRouter(ID):
+    # The router that made the LSP with this ID
+    return ID & ORIGIN_MASK
+
+
+def lspArea(ID):
+    # The area the LSP with this ID gets flooded in
+    return ID >> AREA_SHIFT & AREA_MASK
+
+
+def lspName(ID):
+    # How an LSP ID shows up in the log: just the router, unless it's in an area or a summary
+    if ID <= ORIGIN_MASK:
+        return str(ID)
+    return f"{ID & ORIGIN_MASK} ({'summary into ' if ID & SUMMARY_LSP else ''}area {lspArea(ID)})"
+
+
+def agingKey(router, origin):
+    # Key for the LSP with ID origin aging in router's LSDB, in Network.timers
+    return router << 32 | origin
+
+
+def deadTimerKey(router, port):
+    # Key for the dead timer of whoever is on router's port, in Network.timers
+    return DEAD_TIMER | router << 32 | portNumber(port)
+
+
+def entryDigest(node, adjacencies):
+    '''
+    Hash of one LSDB entry: node and its [(adj router ID, cost), ...], or 0 for no entry at all.
+    It's a sum over the edges so the order they come in doesn't matter, and it's only ever built out of ints so every
+    Python process comes up with the same number.
+    '''
+    if adjacencies is None:
+        return 0
+    digest = hash((node,))
+    for adj, cost in adjacencies:
+        digest += hash((node, adj, cost))
+    return digest & DIGEST_MASK
+
+
+def sendMessage(network, routerFrom, portTo, messageType, data=None):
+    '''
+    Attempts to send the message to the router connected to the specified port.
+    Returns if it was successful or not. The other router gets the message once the connection's delay has passed.
+    '''
+
+
+    link = network.links.get(routerFrom, portTo)
+    if link is not None:
+        routerTo, remotePort = link.far(routerFrom)
+        network.messagesSent += 1
+        if network.profiler is not None:
+            network.profiler.sent[messageType] += 1
+        network.getRouter(routerFrom).schedule(
+            link.delay, routerTo, EVENT_DELIVER, (portTo, remotePort, messageType, data))
+        return True
+    # Only verbose: with nothing on the port anymore, this keeps happening until the dead timer notices
+    eventLog.log(LEVEL_VERBOSE, network.T, MSG_SEND_FAILED,
+                 MessageTypeToHumanReadable[messageType], routerFrom, portTo)
+    return False
+
+
+class LSP(tuple):
+    '''
+    (sequence number, neighbors, LSP ID), where neighbors is a sorted tuple of (port, router ID, cost). The ID is the
+    originator's router ID plus the area and summary bits, see lspID. A summary's entries are (None, area, cost).
+    It's a tuple so nothing can change it after it's made: one LSP object gets flooded to every router and sits in every
+    LSDB as is, instead of each router keeping its own (SQ num, neighborData) tuple pointing at a dict that could change.
+    The age lives in the message next to the LSP, since it's different on every hop.
+    '''
+    __slots__ = ()
+
+    def __new__(cls, originatorID, directNeighbors, SeqNum):
+        return tuple.__new__(cls, (SeqNum, directNeighbors, originatorID))
+
+    def __getnewargs__(self):
+        # So pickle builds it back through __new__ with the arguments in the right order
+        return self[2], self[1], self[0]
+
+    seqNum = property(itemgetter(0))
+    neighbors = property(itemgetter(1))
+    origin = property(itemgetter(2))
+
+    @property
+    def router(self):
+        return self[2] & ORIGIN_MASK
+
+    @property
+    def area(self):
+        return lspArea(self[2])
+
+    def adjacencies(self):
+        # [(adj router ID, cost), ...] the way adjMatrix wants it
+        return [(adj, cost) for _, adj, cost in self[1]]
+
+
+class Router:
+    def __init__(self, ID, network):
+        self.ID = ID
+        self.network = network  # The Network this router lives in, so it knows who is on the other end of its ports
+        self.portsUsed = 0  # How many port names have been handed out, see newPort
+        # Sequence numbers only ever go up, restarting included (see restart), so this one isn't part of clearState
+        self.currentCounter = 0
+        self.area = network.areas[ID]  # The area it's in, see areas
+        self.LSDBVersion = 0  # Goes up every time adjMatrix changes, so the viewer knows when to redraw this router's view
+        self.SPFRuns = 0
+        self.fullSPFRuns = 0
+
+        self.clearState()
+
+        self.Active = True  # False while it's failed, see Network.changeTopology
+
+        # Counts every event this router puts in the queue, used to order events that land on the same tick
+        self.eventCounter = 0
+
+        # Hello and LSP timers are events in the network's queue. Routers start with a random offset.
+        self.schedule(network.rng.randint(0, ROUTER_HELLO_INTERVAL - 1), self.ID, EVENT_HELLO)
+        self.schedule(network.rng.randint(0, ROUTER_LSP_INTERVAL - 1), self.ID, EVENT_LSP_REFRESH)
+
+    def clearState(self):
+        '''
+        Everything this router knows about its ports, its neighbors and the network, the way it is when it first starts.
+        '''
+        # port : None. Only the keys matter, it's a dict instead of a set so the ports always come out in the order they
+        # were plugged in (a set of strings comes out in a different order in every Python process)
+        self.ActivePorts = dict()
+        self.neighbors = dict()  # port : (router ID, Cost), only the Full ones. This is what goes in the LSP.
+        self.neighborStates = dict()  # port : (neighbor state, router ID) for every port something was heard on
+        # Reliable flooding. retransmits[port] is originator ID : (LSP, tick it was last sent) for every LSP sent to the
+        # Full neighbor on port that it hasn't acked yet, pendingAcks[port] the (originator ID, sequence number) of every
+        # LSP that came in on port and still needs acking, and floodQueue is originator ID : ((LSP, age), ports that already have it) for the LSPs this router
+        # took in on this tick, which go out at the end of it (see queueFlood)
+        self.retransmits = dict()
+        self.pendingAcks = dict()
+        self.floodQueue = dict()
+        self.floodScheduled = False
+        self.nodeLSPs = dict()  # LSP ID (see lspID): LSP with the highest SQ num
+
+        # Areas. areas is area : {port : None} for every area it's in and its Full neighbors in each. It's always in its
+        # own area, and in any other one only as long as it has a Full neighbor there.
+        self.areas = {self.area: {}}
+        self.summaryIDs = set()  # IDs of every summary LSP in the LSDB
+        self.areaRoutes = dict()  # area : (cost, next hop router ID, port, area border router) for areas it isn't in
+        # Only for a router in more than one area, see interAreaRouting. areaTable is what it routes by instead of
+        # routingTable, and farthest is area : cost to the farthest router in it, what goes in its summaries.
+        self.areaTable = None
+        self.farthest = dict()
+
+        # adjMatrix[node] -> [(adj router ID, cost), ...] straight out of node's LSP (all of them together, for a node
+        # that's in more than one of the same areas as this router)
+        self.adjMatrix = dict()
+
+        # Shortest path tree, rebuilt from the LSDB once per tick at most (see recalculateRouting)
+        self.graph = dict()  # node : {adj router ID : cheapest cost}, what the last SPF run was based on
+        self.reverseGraph = dict()  # node : {router ID with an edge to node : cost}
+        self.dist = {self.ID: 0}  # node : cost of the shortest path to it
+        self.parent = dict()  # node : the node before it on the shortest path
+        self.children = {self.ID: set()}  # node : nodes whose shortest path goes through it last
+        self.firstHop = dict()  # node : neighbor router the shortest path leaves through
+        self.routingTable = dict()  # router ID : (cost, next hop router ID, port to send it out of)
+        self.dirtyLSPs = set()  # LSPs that changed since the last SPF run
+        self.SPFScheduled = False
+        self.LSPScheduled = False  # A new LSP is already coming at the end of this tick, see scheduleLSP
+
+        # XOR of entryDigest over every router in the shortest path tree. Only counting what this router can reach
+        # means leftover LSPs from routers that got cut off don't count, same as in checkConverged.
+        # The network compares it against the truth to tell if this router is in sync (see Network.updateSync).
+        self.digest = 0
+        self.inSync = False
+
+    def fail(self):
+        '''
+        The router crashes: it stops handling anything and forgets everything it knew, and every timer it had going gets
+        called off. Its neighbors aren't told, they find out when their dead timers go off. Only the router's own half,
+        see Network.changeTopology for its links.
+        '''
+        timers = self.network.timers
+        for port in self.neighborStates:
+            timers.cancel(deadTimerKey(self.ID, port))
+        for origin in self.nodeLSPs:
+            timers.cancel(agingKey(self.ID, origin))
+        timers.cancel(RXMT_TIMER | self.ID << 32)
+        self.clearState()
+        self.Active = False
+        self.LSDBVersion += 1
+        if self.network.profiler is not None:
+            self.network.profiler.LSDBChanged(self)
+
+    def restart(self):
+        '''
+        Comes back up from fail() knowing nothing, and puts out a fresh LSP at the end of the tick. OSPF would bump its
+        sequence number past its old LSPs still out in other routers' LSDBs once it heard them again, here the counter
+        just never went back down, so the new ones win straight away.
+        '''
+        self.Active = True
+        self.LSDBVersion += 1
+        self.scheduleLSP()
+
+    def linksChanged(self, plugged=(), costs=None):
+        '''
+        Network.changeTopology telling this router about everything that happened to its links in one batch, all at
+        once: ports that got something plugged into them, and costs, port : new cost for links whose cost changed.
+        A cost change is configuration on the router itself, so it goes into a new LSP right away (just one, for
+        however many of them there were) instead of waiting on anything.
+        '''
+        for port in plugged:
+            self.connectPort(port)
+        if costs:
+            for port, cost in costs.items():
+                neighbor = self.neighbors.get(port)
+                if neighbor is not None:
+                    self.neighbors[port] = (neighbor[0], cost)
+            self.scheduleLSP()
+
+    def schedule(self, delay, target, eventType, args=()):
+        '''
+        Puts an event for router target in the queue, delay ticks from now.
+        '''
+        self.eventCounter += 1
+        self.network.events.push(
+            self.network.T + delay, target, self.ID, self.eventCounter, eventType, args)
+
+    def handleEvent(self, origin, eventType, args):
+        '''
+        Called by the network when one of this router's events comes up.
+        '''
+        if not self.Active:
+            # Failed. The hello and LSP timers keep going round so they're still there when it restarts, but nothing
+            # else happens, and whatever was still on the way to it is gone.
+            if eventType == EVENT_HELLO:
+                self.schedule(ROUTER_HELLO_INTERVAL, self.ID, EVENT_HELLO)
+            elif eventType == EVENT_LSP_REFRESH:
+                self.schedule(ROUTER_LSP_INTERVAL, self.ID, EVENT_LSP_REFRESH)
+            return None
+        if eventType == EVENT_DELIVER:
+            fromPort, toPort, messageType, data = args
+            # Anything still on the wire when the connection got cut is gone
+            if not self.network.isConnected(origin, fromPort, self.ID):
+                eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_LOST_ON_WIRE,
+                             MessageTypeToHumanReadable[messageType], origin, self.ID)
+                if self.network.trace is not None:
+                    self.network.trace.lost(self.network.T, origin, self.ID, args)
+                return None
+            if self.network.trace is not None:
+                self.network.trace.delivered(self.network.T, origin, self.ID, args)
+            self.recieveMessage(toPort, messageType, data)
+        elif eventType == EVENT_HELLO:
+            self.getNeigbors()
+            self.schedule(ROUTER_HELLO_INTERVAL, self.ID, EVENT_HELLO)
+        elif eventType == EVENT_LSP_REFRESH:
+            self.genAndFloodLSP()
+            if self.network.areaCount > 1:
+                self.originateSummaries(refresh=True)
+            self.schedule(ROUTER_LSP_INTERVAL, self.ID, EVENT_LSP_REFRESH)
+        elif eventType == EVENT_FLOOD:
+            self.floodScheduled = False
+            queued = self.floodQueue
+            self.floodQueue = {}
+            for data, have in queued.values():
+                self.floodLSP(data, have)
+        elif eventType == EVENT_ACK:
+            pending = self.pendingAcks
+            self.pendingAcks = {}
+            for port, acks in pending.items():
+                sendMessage(self.network, self.ID, port, 3, tuple(acks))
+        elif eventType == EVENT_ORIGINATE:
+            self.LSPScheduled = False
+            self.genAndFloodLSP()
+        elif eventType == EVENT_SPF:
+            self.SPFScheduled = False
+            if self.network.profiler is None:
+                self.runSPF()
+            else:
+                self.network.profiler.runSPF(self)
+            if self.network.areaCount > 1:
+                self.interAreaRouting()
+                self.originateSummaries()
+            if self.network.dataplane is not None:
+                self.network.dataplane.routesChanged(self.ID)
+            self.network.updateSync(self)
+
+    def handleTimer(self, key):
+        '''
+        Called by the network when one of this router's timers on the timing wheel goes off.
+        '''
+        if key & DEAD_TIMER:
+            self.neighborDead(portName(key & 0xFFFFFFFF))
+        elif key & RXMT_TIMER:
+            self.retransmit()
+        else:
+            self.expireLSP(key & 0xFFFFFFFF)
+
+    def connectPort(self, port):
+
+        self.ActivePorts[port] = None
+
+    def newPort(self):
+        # A port name this router has never used before
+        self.portsUsed += 1
+        return portName(self.portsUsed - 1)
+
+    def floodLSP(self, data, avoid=()):
+        '''
+        Sends data, an (LSP, age), to every Full neighbor except the ports in avoid, and keeps it on their retransmit
+        lists until they ack it. Anything that doesn't make it across a dead link is just lost, noticing the link is gone
+        is the dead timer's job.
+        '''
+        if data[0].router == self.ID:
+            eventLog.log(LEVEL_DEBUG, self.network.T, MSG_BROADCASTING, self.ID, data[0].seqNum)
+        elif eventLog.level <= LEVEL_VERBOSE:
+            eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_FORWARDING, self.ID, lspName(data[0].origin), data[0].seqNum)
+
+        # Same thing as sendLSP on every port, just without the call for each one
+        network = self.network
+        origin = data[0].origin
+        # Only to the neighbors in the LSP's area
+        ports = self.areas.get(origin >> AREA_SHIFT & AREA_MASK)
+        if ports is None:
+            return None
+        entry = (data[0], network.T)
+        retransmits = self.retransmits
+        sent = 0
+        for p in ports:
+            if p not in avoid:
+                sendMessage(network, self.ID, p, 2, data)
+                retransmits[p][origin] = entry
+                sent += 1
+            else:
+                # They sent this one in, so whatever older copy was waiting on an ack from them doesn't matter anymore
+                retransmits[p].pop(origin, None)
+        if sent:
+            self.startRetransmitTimer()
+        if network.profiler is not None:
+            network.profiler.flooded(sent)
+
+    def sendLSP(self, port, data):
+        # Sends data, an (LSP, age), to the neighbor on port, and starts waiting on an ack for it
+        sendMessage(self.network, self.ID, port, 2, data)
+        self.retransmits[port][data[0].origin] = (data[0], self.network.T)
+        self.startRetransmitTimer()
+
+    def startRetransmitTimer(self):
+        # The timer gets left alone when everything gets acked (see retransmit), so it might still be going
+        key = RXMT_TIMER | self.ID << 32
+        if key not in self.network.timers.due:
+            self.network.timers.schedule(key, self.network.T + ROUTER_RXMT_INTERVAL)
+
+    def retransmit(self):
+        '''
+        Called by the network when this router's retransmit timer goes off. Everything that has been waiting on an ack
+        for ROUTER_RXMT_INTERVAL ticks gets sent again, at the age it is now. There's only the one timer for every port,
+        set for whatever has been waiting the longest, and it just runs out if everything got acked in the meantime.
+        '''
+        T = self.network.T
+        oldest = None
+        for port, waiting in self.retransmits.items():
+            resent = 0
+            for origin, (ThisLSP, sentAt) in waiting.items():
+                if sentAt + ROUTER_RXMT_INTERVAL > T:
+                    if oldest is None or sentAt < oldest:
+                        oldest = sentAt
+                    continue
+                current = self.nodeLSPs.get(origin)
+                if current is not None and current[0] == ThisLSP[0]:
+                    age = min(self.LSPAge(origin) + LSP_TRANSIT_AGE, LSP_MAX_AGE)
+                else:
+                    age = LSP_MAX_AGE  # It's been flushed since, so it's the MaxAge copy they're missing
+                sendMessage(self.network, self.ID, port, 2, (ThisLSP, age))
+                waiting[origin] = (ThisLSP, T)
+                resent += 1
+            if resent:
+                eventLog.log(LEVEL_VERBOSE, T, MSG_RETRANSMITTING, self.ID, resent, port)
+                self.network.retransmittedLSPs += resent
+                oldest = T
+        if oldest is not None:
+            self.network.timers.schedule(RXMT_TIMER | self.ID << 32, oldest + ROUTER_RXMT_INTERVAL)
+
+    def acked(self, port, origin, SeqN):
+        # The neighbor on port acked origin's LSP SeqN, so stop waiting on it if that's still the one they were sent
+        waiting = self.retransmits.get(port)
+        if waiting is not None:
+            entry = waiting.get(origin)
+            if entry is not None and entry[0][0] == SeqN:
+                del waiting[origin]
+
+    def ackLSP(self, port, ThisLSP):
+        # Acks ThisLSP to the neighbor on port, along with everything else that comes in within ROUTER_ACK_DELAY
+        if not self.pendingAcks:
+            self.schedule(ROUTER_ACK_DELAY, self.ID, EVENT_ACK)
+        acks = self.pendingAcks.get(port)
+        if acks is None:
+            acks = self.pendingAcks[port] = []
+        acks.append((ThisLSP[2], ThisLSP[0]))
+
+    def duplicateLSP(self, port, ThisLSP):
+        '''
+        ThisLSP came in on port, and this router already had it (or had it and flushed it). It doesn't need to go back
+        out that port at the end of the tick, and if this router was waiting on an ack for it from that neighbor, this is
+        as good as one both ways (OSPF's implied acknowledgement). Otherwise the neighbor gets a real ack.
+        '''
+        self.network.duplicateLSPs += 1
+        SeqN, _, origin = ThisLSP
+        queued = self.floodQueue.get(origin)
+        if queued is not None and queued[0][0][0] == SeqN:
+            queued[1].add(port)
+        waiting = self.retransmits.get(port)
+        if waiting is not None:
+            entry = waiting.get(origin)
+            if entry is not None and entry[0][0] == SeqN:
+                del waiting[origin]
+                return None
+        self.ackLSP(port, ThisLSP)
+
+    def queueFlood(self, data, port):
+        '''
+        Floods data, an (LSP, age) that just came in on port, at the end of the tick. Any copies that come in from other
+        neighbors before then mean it doesn't have to go to them, so on a mesh where an LSP reaches most routers from
+        several sides at once, most of those sends never happen.
+        '''
+        self.floodQueue[data[0][2]] = (data, {port})
+        if not self.floodScheduled:
+            self.floodScheduled = True
+            self.eventCounter += 1
+            self.network.events.push(
+                self.network.T, self.ID, END_OF_TICK - 2, self.eventCounter, EVENT_FLOOD)
+
+    def recieveMessage(self, toPort, messageType, data=None):
+        if not self.Active:
+            return None
+        # HELLOs are (sender ID, router the sender has heard on this link or 0). 0 is the HELLO-ACK that goes straight
+        # back when a HELLO doesn't list this router yet, so the other end doesn't wait a whole hello interval for it.
+        if messageType < 2:
+            self.helloRecieved(toPort, messageType, data)
+
+        elif messageType == 3:  # LSACK
+            for origin, SeqN in data:
+                self.acked(toPort, origin, SeqN)
+
+        elif messageType == 2:  # Recieving a LSP.
+
+            ThisLSP, age = data
+            SeqN, NeighborData, SenderID = ThisLSP
+            if SenderID >> AREA_SHIFT & AREA_MASK not in self.areas:
+                # From an area this router isn't in (yet), they'll send it again once the adjacency is Full
+                return None
+            current = self.nodeLSPs.get(SenderID)
+
+            if current is not None and current[0] > SeqN:
+                if eventLog.level <= LEVEL_VERBOSE:
+                    eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_DENY, self.ID, lspName(SenderID), SeqN,
+                                 self.neighbors.get(toPort, ('UNKNOWN', 0))[0], current[0])
+                if self.network.trace is not None:
+                    self.network.trace.denied(self.network.T, self.ID, toPort, ThisLSP, age)
+                self.network.duplicateLSPs += 1
+                if toPort in self.neighbors:
+                    # They're behind, so they get the newer one straight back
+                    self.sendLSP(toPort, (current, min(self.LSPAge(SenderID) + LSP_TRANSIT_AGE, LSP_MAX_AGE)))
+                return None
+
+            if age >= LSP_MAX_AGE:
+                # A MaxAge copy: whoever sent it aged this LSP out (or the router that made it flushed it early), so
+                # it goes
+                if current is None:
+                    self.duplicateLSP(toPort, ThisLSP)
+                    return None
+                self.ackLSP(toPort, ThisLSP)
+                if SenderID & ORIGIN_MASK == self.ID:
+                    # This router's own LSP aged out somewhere while the router is still up, so put out a fresh one
+                    self.refreshOwnLSP(SenderID)
+                    return None
+                eventLog.log(LEVEL_WARNING, self.network.T, MSG_FLUSHED,
+                             self.ID, lspName(SenderID), SeqN, self.neighbors.get(toPort, ('UNKNOWN', 0))[0])
+                if self.network.trace is not None:
+                    self.network.trace.flushed(self.network.T, self.ID, toPort, ThisLSP, age)
+                self.removeLSP(SenderID)
+                self.queueFlood(data, toPort)
+                return None
+
+            if current is None or SeqN > current[0]:
+                if eventLog.level <= LEVEL_VERBOSE:
+                    eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_ACCEPT_LONG,
+                                 self.ID, lspName(SenderID), SeqN, self.neighbors.get(toPort, ('UNKNOWN', 0))[0], age, len(NeighborData))
+                elif eventLog.level <= LEVEL_DEBUG:
+                    senderRouter = self.neighbors.get(
+                        toPort, ('UNKNOWN', 0))[0]
+                    if SenderID == senderRouter:
+                        eventLog.log(LEVEL_DEBUG, self.network.T, MSG_ACCEPT_DIRECT, self.ID, SenderID)
+                    else:
+                        eventLog.log(LEVEL_DEBUG, self.network.T, MSG_ACCEPT_FORWARDED,
+                                     self.ID, lspName(SenderID), senderRouter)
+
+                self.nodeLSPs[SenderID] = ThisLSP
+                # It's already been age ticks since the LSP was made, so it has that much less time left in here
+                self.network.timers.schedule(agingKey(self.ID, SenderID), self.network.T + LSP_MAX_AGE - age)
+                if self.network.trace is not None:
+                    self.network.trace.accepted(self.network.T, self.ID, toPort, ThisLSP, age)
+                self.recalculateRouting(SenderID)
+                self.ackLSP(toPort, ThisLSP)
+
+            else:
+                if eventLog.level <= LEVEL_VERBOSE:
+                    eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_DENY, self.ID, lspName(SenderID), SeqN,
+                                 self.neighbors.get(toPort, ('UNKNOWN', 0))[0], current[0])
+                if self.network.trace is not None:
+                    self.network.trace.denied(self.network.T, self.ID, toPort, ThisLSP, age)
+                self.duplicateLSP(toPort, ThisLSP)
+                return None # Do not flood this LSP
+
+            # Continue to flood the LSP on all ports that are not the one that
+            # this router recieved it from
+            self.queueFlood((ThisLSP, min(age + LSP_TRANSIT_AGE, LSP_MAX_AGE)), toPort)
+
+    def getNeigbors(self):
+
+        eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_SAYING_HELLO, self.ID)
+        kill = []
+        for p in self.ActivePorts:
+            state = self.neighborStates.get(p)
+            if not sendMessage(self.network, self.ID, p, 1, (self.ID, state[1] if state is not None else 0)):
+                if state is None:
+                    # Nothing plugged in and nobody was ever heard on it, so there's no adjacency to wait out
+                    kill.append(p)
+
+        for k in kill:
+            eventLog.log(LEVEL_WARNING, self.network.T, MSG_PORT_DOWN, k, self.ID)
+            if self.network.trace is not None:
+                self.network.trace.portDown(self.network.T, self.ID, k)
+            del self.ActivePorts[k]
+
+    def helloRecieved(self, port, messageType, data):
+        '''
+        The neighbor state machine for whoever is on port. Down -> Init the first time they're heard from, Init -> 2-Way
+        once their HELLO lists this router, and since every link is point-to-point, 2-Way goes straight on to Full after
+        the LSDB exchange. Any HELLO at all pushes their dead timer back.
+        '''
+        neighborID, heard = data
+        self.network.timers.schedule(deadTimerKey(self.ID, port), self.network.T + ROUTER_DEAD_INTERVAL)
+        state = self.neighborStates.get(port)
+        if state is None:
+            eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_NEIGHBOR_INIT, self.ID, port, neighborID)
+            state = self.neighborStates[port] = (NEIGHBOR_INIT, neighborID)
+
+        if heard == self.ID:
+            if state[0] == NEIGHBOR_INIT:
+                self.adjacencyUp(port, neighborID, messageType)
+        else:
+            if state[0] != NEIGHBOR_INIT:
+                # They forgot about this router (E.G. they went down and came back before their dead timer went off)
+                eventLog.log(LEVEL_WARNING, self.network.T, MSG_ONE_WAY, self.ID, port, neighborID)
+                self.neighborStates[port] = (NEIGHBOR_INIT, neighborID)
+                self.adjacencyDown(port)
+            if messageType == 1:
+                sendMessage(self.network, self.ID, port, 0, (self.ID, neighborID))
+
+    def adjacencyUp(self, port, neighborID, messageType):
+        # 2-Way with the router on port: bring it up to Full and put it in the next LSP
+        self.neighborStates[port] = (NEIGHBOR_TWO_WAY, neighborID)
+        self.retransmits[port] = {}
+        if messageType == 0:
+            # That was their ACK, they're still waiting on a HELLO that lists them
+            sendMessage(self.network, self.ID, port, 1, (self.ID, neighborID))
+        # The database exchange. Real OSPF trades DBD packets and only asks for what's missing, this just sends it all
+        # (everything in the link's area, anyway) and lets the other end deny what it already has.
+        area = self.network.areaBetween(self.ID, neighborID)
+        for origin, ThisLSP in self.nodeLSPs.items():
+            if origin >> AREA_SHIFT & AREA_MASK == area:
+                self.sendLSP(port, (ThisLSP, self.LSPAge(origin)))
+
+        self.neighborStates[port] = (NEIGHBOR_FULL, neighborID)
+        self.neighbors[port] = (neighborID, self.network.links.get(self.ID, port).cost)
+        self.trackArea(port, neighborID)
+        if eventLog.level <= LEVEL_VERBOSE:
+            eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_FULL_LONG,
+                         self.ID, port, neighborID, self.neighbors[port][1], len(self.nodeLSPs))
+        else:
+            eventLog.log(LEVEL_DEBUG, self.network.T, MSG_CONNECTED, self.ID, neighborID, port)
+        if self.network.trace is not None:
+            self.network.trace.neighborUp(self.network.T, self.ID, port, neighborID, self.neighbors[port][1])
+        self.scheduleLSP()
+
+    def adjacencyDown(self, port):
+        # The router on port isn't Full anymore, so it comes out of the next LSP
+        neighbor = self.neighbors.pop(port, None)
+        if neighbor is not None:
+            # Nothing's getting acked by them anymore
+            del self.retransmits[port]
+            if self.network.trace is not None:
+                self.network.trace.neighborDown(self.network.T, self.ID, port)
+            self.untrackArea(port, neighbor[0])
+            self.flushLeftArea(neighbor[0])
+            self.scheduleLSP()
+
+    def flushLeftArea(self, neighborID):
+        '''
+        The adjacency with neighborID just went down. If this router was the only one their LSP in the link's area
+        listed, they're cut off from the area now: out of it, if it isn't their own, or alone in it if it is. Either way
+        they've got nobody left in it to send anything to, so they can't flush or update that LSP themselves, and it gets
+        flushed for them instead of sitting in everyone's LSDB until it ages out.
+        '''
+        area = self.network.areaBetween(self.ID, neighborID)
+        ID = lspID(neighborID, area)
+        ThisLSP = self.nodeLSPs.get(ID)
+        if ThisLSP is None or any(adj != self.ID for _, adj, _ in ThisLSP[1]):
+            return None
+        eventLog.log(LEVEL_DEBUG, self.network.T, MSG_FLUSHED_LEFT, self.ID, neighborID, area, ThisLSP[0])
+        if self.network.trace is not None:
+            self.network.trace.flushed(self.network.T, self.ID, None, ThisLSP, LSP_MAX_AGE)
+        self.removeLSP(ID)
+        self.floodLSP((ThisLSP, LSP_MAX_AGE))
+
+    def trackArea(self, port, neighborID):
+        # The neighbor on port just went Full, so this router is in the link's area if it wasn't already
+        area = self.network.areaBetween(self.ID, neighborID)
+        if area not in self.areas:
+            # Always in order, so what gets originated for each area goes out in the same order every time
+            self.areas[area] = {}
+            self.areas = dict(sorted(self.areas.items()))
+        self.areas[area][port] = None
+
+    def untrackArea(self, port, neighborID):
+        # The neighbor on port isn't Full anymore. If that was the last one in an area that isn't this router's own, it
+        # leaves the area and forgets every LSP in it.
+        area = self.network.areaBetween(self.ID, neighborID)
+        ports = self.areas[area]
+        del ports[port]
+        if not ports and area != self.area:
+            del self.areas[area]
+            for origin in [origin for origin in self.nodeLSPs if origin >> AREA_SHIFT & AREA_MASK == area]:
+                self.removeLSP(origin)
+
+    def neighborDead(self, port):
+        '''
+        Called by the network when nothing has come in on port for ROUTER_DEAD_INTERVAL ticks. The neighbor goes back to
+        Down, and if the link itself is gone the port goes too.
+        '''
+        state = self.neighborStates.pop(port)
+        eventLog.log(LEVEL_WARNING, self.network.T, MSG_NEIGHBOR_DEAD, self.ID, state[1], port, ROUTER_DEAD_INTERVAL)
+        self.adjacencyDown(port)
+        if self.network.links.get(self.ID, port) is None:
+            eventLog.log(LEVEL_WARNING, self.network.T, MSG_REMOVING_PORT, port, self.ID)
+            if self.network.trace is not None:
+                self.network.trace.portDown(self.network.T, self.ID, port)
+            del self.ActivePorts[port]
+
+    def LSPAge(self, origin):
+        # How old the LSP from router origin in the LSDB is by now, going off when it's due to age out
+        return LSP_MAX_AGE - (self.network.timers.due[agingKey(self.ID, origin)] - self.network.T)
+
+    def scheduleLSP(self):
+        '''
+        Puts out a new LSP at the end of this tick, so however many adjacencies change on one tick, only one new LSP
+        gets flooded for all of them.
+        '''
+        if not self.LSPScheduled:
+            self.LSPScheduled = True
+            self.eventCounter += 1
+            self.network.events.push(
+                self.network.T, self.ID, END_OF_TICK - 1, self.eventCounter, EVENT_ORIGINATE)
+
+    def genAndFloodLSP(self):
+        # One LSP for every area this router is in, with just its neighbors in that area
+        for area, ports in self.areas.items():
+            eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_GENERATING_LSP, self.ID, self.currentCounter)
+            neighbors = tuple(sorted((port,) + self.neighbors[port] for port in ports))
+            ID = lspID(self.ID, area)
+            # Most LSPs are just the periodic refresh with the same neighbors as last time, so reuse that neighbor
+            # tuple instead of keeping another identical copy around
+            previous = self.nodeLSPs.get(ID)
+            if previous is not None and previous[1] == neighbors:
+                neighbors = previous[1]
+            ThisLSP = LSP(
+                ID,
+                neighbors,
+                self.currentCounter)
+            self.currentCounter += 1
+
+            self.nodeLSPs[ID] = ThisLSP
+            self.network.timers.schedule(agingKey(self.ID, ID), self.network.T + LSP_MAX_AGE)
+            if self.network.trace is not None:
+                self.network.trace.originated(self.network.T, self.ID, ThisLSP)
+            self.recalculateRouting(ID)
+            self.floodLSP((ThisLSP, 0))
+
+    def refreshOwnLSP(self, ID):
+        '''
+        One of this router's own LSPs is about to age out, or came back at MaxAge. Router LSPs just get put out again.
+        A summary gets flushed and made again from scratch, if this router still has anything to summarize there (the
+        flush gets recorded either way, so a replay doesn't hang on to a summary this router doesn't put back).
+        '''
+        if not ID & SUMMARY_LSP:
+            self.genAndFloodLSP()
+            return None
+        ThisLSP = self.nodeLSPs[ID]
+        eventLog.log(LEVEL_DEBUG, self.network.T, MSG_PREMATURE_AGING, self.ID, ThisLSP[0])
+        if self.network.trace is not None:
+            self.network.trace.flushed(self.network.T, self.ID, None, ThisLSP, LSP_MAX_AGE)
+        self.removeLSP(ID)
+        self.floodLSP((ThisLSP, LSP_MAX_AGE))
+        self.originateSummaries()
+
+    def removeLSP(self, origin):
+        # Takes router origin's LSP out of the LSDB
+        del self.nodeLSPs[origin]
+        self.network.timers.cancel(agingKey(self.ID, origin))
+        self.recalculateRouting(origin)
+
+    def expireLSP(self, origin):
+        '''
+        Called by the network once the LSP from router origin has sat in the LSDB for LSP_MAX_AGE ticks without getting
+        refreshed. It gets dropped, and flooded at MaxAge so the neighbors drop it too (most of them are about to
+        anyway, they all got it at about the same time).
+        '''
+        ThisLSP = self.nodeLSPs[origin]
+        if origin & ORIGIN_MASK == self.ID:
+            # A router's own LSP gets refreshed long before this, but if it ever does get this old it gets refreshed
+            # instead of dropped
+            self.refreshOwnLSP(origin)
+            return None
+        eventLog.log(LEVEL_WARNING, self.network.T, MSG_AGED_OUT, self.ID, lspName(origin), ThisLSP[0])
+        if self.network.trace is not None:
+            self.network.trace.expired(self.network.T, self.ID, ThisLSP)
+        self.removeLSP(origin)
+        self.floodLSP((ThisLSP, LSP_MAX_AGE))
+
+    def flushOwnLSP(self):
+        '''
+        Premature aging: floods this router's own LSPs (and summaries) at MaxAge so every other router drops them now
+        instead of waiting for them to age out. What a router does on its way down.
+        '''
+        for ID in sorted(ID for ID in self.nodeLSPs if ID & ORIGIN_MASK == self.ID):
+            ThisLSP = self.nodeLSPs[ID]
+            eventLog.log(LEVEL_WARNING, self.network.T, MSG_PREMATURE_AGING, self.ID, ThisLSP[0])
+            if self.network.trace is not None:
+                self.network.trace.flushed(self.network.T, self.ID, None, ThisLSP, LSP_MAX_AGE)
+            self.removeLSP(ID)
+            self.floodLSP((ThisLSP, LSP_MAX_AGE))
+
+    def recalculateRouting(self, changed=None):
+        '''
+        Called whenever the LSP with ID changed changed (or got deleted). changed=None means the whole LSDB.
+        adjMatrix gets updated right away, but the shortest path tree only gets recalculated once, after everything else
+        this router gets on this tick, no matter how many LSPs came in.
+        '''
+        self.LSDBVersion += 1
+        profiler = self.network.profiler
+        if profiler is not None:
+            profiler.recalculations += 1
+            profiler.LSDBChanged(self)
+        if changed is None:
+            self.adjMatrix = {}
+            self.summaryIDs = set()
+            for ID in self.nodeLSPs:
+                if ID & SUMMARY_LSP:
+                    self.summaryIDs.add(ID)
+                elif ID & ORIGIN_MASK not in self.adjMatrix:
+                    adjacencies = self.nodeAdjacencies(ID & ORIGIN_MASK)
+                    if adjacencies is not None:
+                        self.adjMatrix[ID & ORIGIN_MASK] = adjacencies
+            self.dirtyLSPs.update(self.graph)
+            self.dirtyLSPs.update(self.adjMatrix)
+            self.digest = 0
+            for node in self.dist:
+                self.digest ^= entryDigest(node, self.adjMatrix.get(node))
+        elif changed & SUMMARY_LSP:
+            # Summaries don't go in the tree, they get looked at after it's rebuilt (see interAreaRouting)
+            if changed in self.nodeLSPs:
+                self.summaryIDs.add(changed)
+            else:
+                self.summaryIDs.discard(changed)
+        else:
+            node = changed & ORIGIN_MASK
+            old = self.adjMatrix.get(node)
+            new = self.nodeAdjacencies(node)
+            if new is not None:
+                self.adjMatrix[node] = new
+            else:
+                self.adjMatrix.pop(node, None)
+            if node in self.dist and old != new:
+                self.digest ^= entryDigest(node, old) ^ entryDigest(node, new)
+            self.dirtyLSPs.add(node)
+        if self.areaTable is None:
+            # In more than one area the digest only gets worked out after SPF, see interAreaRouting
+            self.network.updateSync(self)
+
+        if not self.SPFScheduled:
+            self.SPFScheduled = True
+            self.eventCounter += 1
+            self.network.events.push(
+                self.network.T, self.ID, END_OF_TICK, self.eventCounter, EVENT_SPF)
+
+    def nodeAdjacencies(self, node):
+        # [(adj router ID, cost), ...] out of every router LSP from node in the areas this router is in, or None if
+        # there aren't any
+        adjacencies = None
+        for area in self.areas:
+            ThisLSP = self.nodeLSPs.get(node | area << AREA_SHIFT)
+            if ThisLSP is not None:
+                if adjacencies is None:
+                    adjacencies = ThisLSP.adjacencies()
+                else:
+                    adjacencies += ThisLSP.adjacencies()
+        return adjacencies
+
+    def getRoute(self, dest):
+        '''
+        (cost, next hop router ID, port to send it out of) for getting to router dest, or None if it can't be reached.
+        A router in an area this router isn't in gets the route to its whole area, through whichever area border router
+        summarized it cheapest.
+        '''
+        if self.areaTable is not None:
+            route = self.areaTable.get(dest)
+        else:
+            route = self.routingTable.get(dest)
+        if route is None and self.network.areaCount > 1:
+            route = self.areaRoutes.get(self.network.areas[dest])
+            if route is not None:
+                return route[:3]
+        return route
+
+    def areaSPF(self, area):
+        '''
+        Plain Dijkstra over just the LSPs in area. Returns (node : cost, node : (next hop router ID, port)).
+        '''
+        shift = area << AREA_SHIFT
+        nodeLSPs = self.nodeLSPs
+        dist = {}
+        hops = {}
+        heap = [(0, self.ID, None, None)]
+        while heap:
+            cost, node, nextHop, port = heappop(heap)
+            if node in dist:
+                continue
+            dist[node] = cost
+            hops[node] = (nextHop, port)
+            ThisLSP = nodeLSPs.get(node | shift)
+            if ThisLSP is not None:
+                for adjPort, adj, adjCost in ThisLSP[1]:
+                    if adj not in dist:
+                        if node == self.ID:
+                            heappush(heap, (adjCost, adj, adj, adjPort))
+                        else:
+                            heappush(heap, (cost + adjCost, adj, nextHop, port))
+        return dist, hops
+
+    def interAreaRouting(self):
+        '''
+        Runs after every SPF run when the network has areas.
+        A router in more than one area routes to every router in them by the area the path is in, like in OSPF, not by
+        the tree over all of them together: a path that wandered between areas could go through a router that only knows
+        one of them and sends it right back. So it runs Dijkstra again over each of its areas and keeps the cheapest.
+        Then it works out the route to every area it isn't in out of the summaries in its LSDB: the cheapest total of
+        getting to an area border router plus what it says the area costs from there. Area border routers only go by
+        the backbone's summaries. The digest gets worked out here too, area by area.
+        '''
+        border = 0 in self.areas and len(self.areas) > 1
+        if len(self.areas) > 1:
+            spf = {area: self.areaSPF(area) for area in self.areas}
+            table = {}
+            for dist, hops in spf.values():
+                for node, cost in dist.items():
+                    if node != self.ID and (node not in table or cost < table[node][0]):
+                        table[node] = (cost,) + hops[node]
+            self.areaTable = table
+            self.farthest = {area: max(dist.values()) for area, (dist, _) in spf.items()}
+            # The digest goes by area too: what it has from every router it can reach in each area, through that area.
+            # Old LSPs from the far side of an area that got split (or from an area it got cut off from, that it can
+            # still get around to through another one) can't ever get updated, so they don't count.
+            digest = 0
+            for area, (dist, _) in spf.items():
+                shift = area << AREA_SHIFT
+                for node in dist:
+                    ThisLSP = self.nodeLSPs.get(node | shift)
+                    digest ^= entryDigest(node, None if ThisLSP is None else ThisLSP.adjacencies())
+            self.digest = digest
+        else:
+            spf = None
+            if self.areaTable is not None:
+                # Just went back down to one area. The tree's digest went stale while it was in more, so start it over.
+                self.digest = 0
+                for node in self.dist:
+                    self.digest ^= entryDigest(node, self.adjMatrix.get(node))
+            self.areaTable = None
+            self.farthest = {}
+
+        best = {}  # area : (cost, area border router, area of its summary)
+        for ID in self.summaryIDs:
+            ABR = ID & ORIGIN_MASK
+            area = ID >> AREA_SHIFT & AREA_MASK
+            if ABR == self.ID or border and area != 0:
+                continue
+            toABR = (spf[area][0] if spf is not None else self.dist).get(ABR)
+            if toABR is None:
+                continue
+            for _, dest, cost in self.nodeLSPs[ID][1]:
+                if dest not in self.areas:
+                    candidate = (toABR + cost, ABR, area)
+                    current = best.get(dest)
+                    if current is None or candidate < current:
+                        best[dest] = candidate
+        areaRoutes = {}
+        for dest, (cost, ABR, area) in best.items():
+            nextHop, port = spf[area][1][ABR] if spf is not None else self.routingTable[ABR][1:]
+            areaRoutes[dest] = (cost, nextHop, port, ABR)
+        self.areaRoutes = areaRoutes
+
+    def originateSummaries(self, refresh=False):
+        '''
+        Puts out a new summary into every area this router borders whose summary would say something different than
+        the last one (or every one, with refresh). Into the backbone go the other areas it's in, into the others go
+        every area but that one, the ones it's in costed by the farthest router in them and the rest by its route there.
+        Summaries it used to put out into areas it isn't bordering anymore get flushed.
+        '''
+        wanted = {}  # area : summary entries for it
+        if 0 in self.areas and len(self.areas) > 1:
+            for target in self.areas:
+                entries = [(None, area, cost) for area, cost in self.farthest.items() if area != target]
+                if target != 0:
+                    entries += [(None, area, route[0]) for area, route in self.areaRoutes.items()]
+                wanted[target] = tuple(sorted(entries))
+
+        for area in self.areas:
+            ID = lspID(self.ID, area, summary=True)
+            if area not in wanted and ID in self.nodeLSPs:
+                ThisLSP = self.nodeLSPs[ID]
+                eventLog.log(LEVEL_DEBUG, self.network.T, MSG_PREMATURE_AGING, self.ID, ThisLSP[0])
+                if self.network.trace is not None:
+                    self.network.trace.flushed(self.network.T, self.ID, None, ThisLSP, LSP_MAX_AGE)
+                self.removeLSP(ID)
+                self.floodLSP((ThisLSP, LSP_MAX_AGE))
+
+        for target, entries in wanted.items():
+            ID = lspID(self.ID, target, summary=True)
+            previous = self.nodeLSPs.get(ID)
+            if previous is not None and previous[1] == entries:
+                if not refresh:
+                    continue
+                entries = previous[1]
+            eventLog.log(LEVEL_VERBOSE, self.network.T, MSG_SUMMARIZING, self.ID, len(entries), target,
+                         self.currentCounter)
+            ThisLSP = LSP(ID, entries, self.currentCounter)
+            self.currentCounter += 1
+            self.nodeLSPs[ID] = ThisLSP
+            self.summaryIDs.add(ID)
+            self.LSDBVersion += 1
+            if self.network.profiler is not None:
+                self.network.profiler.LSDBChanged(self)
+            self.network.timers.schedule(agingKey(self.ID, ID), self.network.T + LSP_MAX_AGE)
+            if self.network.trace is not None:
+                self.network.trace.originated(self.network.T, self.ID, ThisLSP)
+            self.floodLSP((ThisLSP, 0))
+
+    def runSPF(self):
+        '''
+        Dijkstra over the LSDB. Only the LSPs in dirtyLSPs changed since last time, so unless a lot of them did this
+        only fixes up the part of the tree those changes can actually affect.
+        '''
+        dirty = self.dirtyLSPs
+        self.dirtyLSPs = set()
+        self.SPFRuns += 1
+
+        changes = []  # (node, old adjacency, new adjacency)
+        for node in dirty:
+            new = {}
+            for adj, cost in self.adjMatrix.get(node, ()):
+                if cost < new.get(adj, cost + 1):
+                    new[adj] = cost
+            old = self.graph.get(node, {})
+            if new != old:
+                changes.append((node, old, new))
+
+        for node, old, new in changes:
+            for adj in old:
+                incoming = self.reverseGraph[adj]
+                del incoming[node]
+                if not incoming:
+                    del self.reverseGraph[adj]
+            for adj, cost in new.items():
+                self.reverseGraph.setdefault(adj, {})[node] = cost
+            if new:
+                self.graph[node] = new
+            else:
+                self.graph.pop(node, None)
+
+        if not changes:
+            return None
+        if len(changes) > FULL_SPF_FRACTION * len(self.graph) or not self.routingTable:
+            self.fullSPF()
+            self.updateRoutes(self.firstHop)
+        else:
+            settled = self.incrementalSPF(changes)
+            # Our own neighbors changing can move which port a next hop is reached through, for every route
+            if any(node == self.ID for node, _, _ in changes):
+                self.updateRoutes(self.firstHop)
+            else:
+                self.updateRoutes(settled)
+
+    def fullSPF(self):
+        self.fullSPFRuns += 1
+        self.digest = entryDigest(self.ID, self.adjMatrix.get(self.ID))
+        self.dist = {self.ID: 0}
+        self.parent = {}
+        self.children = {self.ID: set()}
+        self.firstHop = {}
+        self.routingTable = {}
+        return self.dijkstra([(cost, adj, self.ID) for adj, cost in self.graph.get(self.ID, {}).items()])
+
+    def incrementalSPF(self, changes):
+        dist = self.dist
+        parent = self.parent
+        inf = float("inf")
+
+        # Edges that got worse (or went away) under the tree cut off the whole subtree hanging below them
+        cut = set()
+        candidates = []
+        for node, old, new in changes:
+            for adj, cost in old.items():
+                if parent.get(adj) == node and new.get(adj, inf) > cost:
+                    cut.add(adj)
+
+        if cut:
+            stack = list(cut)
+            invalid = set(stack)
+            while stack:
+                for child in self.children.get(stack.pop(), ()):
+                    if child not in invalid:
+                        invalid.add(child)
+                        stack.append(child)
+            for node in invalid:
+                del dist[node]
+                self.digest ^= entryDigest(node, self.adjMatrix.get(node))
+                self.children[parent.pop(node)].discard(node)
+                self.firstHop.pop(node, None)
+                self.routingTable.pop(node, None)
+            # Anything cut off can get back in through any node that is still in the tree
+            for node in invalid:
+                for via, cost in self.reverseGraph.get(node, {}).items():
+                    if via in dist:
+                        candidates.append((dist[via] + cost, node, via))
+
+        # Edges that got better can only ever pull nodes closer
+        for node, old, new in changes:
+            if node in dist:
+                for adj, cost in new.items():
+                    if dist[node] + cost < dist.get(adj, inf):
+                        candidates.append((dist[node] + cost, adj, node))
+
+        return self.dijkstra(candidates)
+
+    def dijkstra(self, heap):
+        '''
+        Settles nodes out of heap, a list of (cost, node, node before it), and anything they lead to that gets cheaper.
+        Used for both the full tree and the bits of it incrementalSPF throws back in. Returns the nodes it settled.
+        '''
+        dist = self.dist
+        parent = self.parent
+        children = self.children
+        firstHop = self.firstHop
+        graph = self.graph
+        adjMatrix = self.adjMatrix
+        digest = self.digest
+        settled = []
+        heapify(heap)
+        while heap:
+            d, node, via = heappop(heap)
+            if d >= dist.get(node, d + 1):
+                continue
+            if node in parent:
+                children[parent[node]].discard(node)
+            else:
+                digest ^= entryDigest(node, adjMatrix.get(node))
+            dist[node] = d
+            parent[node] = via
+            children[via].add(node)
+            children.setdefault(node, set())
+            firstHop[node] = node if via == self.ID else firstHop[via]
+            settled.append(node)
+            for adj, cost in graph.get(node, {}).items():
+                if d + cost < dist.get(adj, d + cost + 1):
+                    heappush(heap, (d + cost, adj, node))
+        self.digest = digest
+        return settled
+
+    def updateRoutes(self, nodes):
+        # Ports are looked up from scratch every time, they are cheap and change whenever our own neighbors do
+        ports = {}
+        for port, (adj, cost) in self.neighbors.items():
+            if cost < ports.get(adj, (cost + 1, None))[0]:
+                ports[adj] = (cost, port)
+        dist = self.dist
+        firstHop = self.firstHop
+        routingTable = self.routingTable
+        for node in nodes:
+            hop = firstHop[node]
+            routingTable[node] = (dist[node], hop, ports.get(hop, (0, None))[1])
+
+
+class Network:
+
+    def __init__(self, RouterCount, ConnectionCount, generator=randomGraph, seed=None, areas=1):
+        '''
+        Builds a network with whatever generator out of topologies.py (randomGraph by default). The same seed always
+        builds the same network and runs the same way, no seed means a different one every time.
+        areas splits it into that many OSPF areas (see topologies.assignAreas), 1 keeps everything in the backbone.
+        '''
+        if areas > MAX_AREAS:
+            raise ValueError(f"At most {MAX_AREAS} areas fit in an LSP ID, not {areas}")
+        self.rng = Random(seed)
+        topology = generator(RouterCount, ConnectionCount, self.rng)
+        RouterCount = topology.size
+        if RouterCount > MAX_ROUTERS:
+            raise ValueError(f"At most {MAX_ROUTERS} routers fit in an LSP ID, not {RouterCount}")
+
+        self.size = RouterCount
+        self.areaCount = areas
+        # areas[router ID] is the area the router is in, every router is in the backbone (area 0) with just one area.
+        # A link between two routers in different areas belongs to one of them, see areaBetween.
+        self.areas = assignAreas(topology, areas, self.rng)
+        self.T = 0  # Tick
+        self.events = EventQueue()
+        # Every LSP sitting in every LSDB waiting to age out (keys from agingKey), every neighbor's dead timer (keys
+        # from deadTimerKey) and every router's retransmit timer (RXMT_TIMER | router ID << 32). Nearly all of them get
+        # pushed back or called off before they go off.
+        self.timers = TimingWheel()
+        self.Routers = []
+        self.RouterPositions = []
+        self.links = LinkTable()
+        self.topologyVersion = 0  # Goes up every time a link is built or blown up, so the viewer knows when to redraw
+        self.messagesSent = 0  # Every message that made it onto a wire, for benchmark.py
+        self.duplicateLSPs = 0  # LSPs that got to a router that already had them (or something newer)
+        self.retransmittedLSPs = 0  # LSPs sent again because the neighbor never acked them
+        self.trace = None  # eventtrace.TraceWriter recording this network, if anything is
+        self.profiler = None  # profiler.Profiler counting what this network does, if anything is
+        self.dataplane = None  # dataplane.DataPlane pushing traffic through this network, if anything is
+        # router ID : [(cost, far router ID, delay), ...] for every failed router, the links it had when it went down.
+        # They get built back when it restarts, see changeTopology.
+        self.downLinks = {}
+
+        # Convergence monitor. truthDigests[router ID] is entryDigest of its real connections, kept up to date as links
+        # come and go. A router is in sync once its own digest matches the one for its component, and mismatches
+        # counts the routers that aren't, so checking the whole network is O(1). See recountSync and updateSync.
+        self.truthDigests = [0] + [entryDigest(x, ()) for x in range(1, RouterCount + 1)]
+        self.syncTargets = [0] * (RouterCount + 1)
+        self.syncDirty = True
+        self.mismatches = RouterCount
+        self.changedAt = 0  # Tick of the last topology change
+        self.convergenceTimes = []  # [tick of a topology change, tick the network converged after it]
+
+        # These two are views of self.links kept around for the renderer.
+        # Connections[router ID] -> port : [cost, port, adj router port, adj router ID, delay]
+        self.Connections = {}
+        self.SimplifiedConnections = {}
+
+        for x in range(1, RouterCount + 1):
+            self.Routers.append(Router(x, self))
+            if topology.positions is None:
+                self.RouterPositions.append(
+                    (self.rng.randint(0, DX - 100), self.rng.randint(100, DY - 100)))
+            else:
+                px, py = topology.positions[x - 1]
+                self.RouterPositions.append(
+                    (round(px * (DX - 100)), round(100 + py * (DY - 200))))
+            self.Connections[x] = {}
+            self.SimplifiedConnections[x] = set()
+
+        for R1, R2, cost in topology.edges:
+            self.buildConnection(cost, R1, self.getRouter(R1).newPort(), R2, self.getRouter(R2).newPort())
+
+        self.RITTP = {o +
+                      1: (self.getRouterPosition(o +
+                                                 1)[0] -
+                          9, self.getRouterPosition(o +
+                                                    1)[1] -
+                          22) for o in range(RouterCount)}
+
+    def buildConnection(self, cost, R1, P1, R2, P2, delay=DEFAULT_LINK_DELAY):
+
+        slot = self.addLink(cost, R1, P1, R2, P2, delay)
+        if self.dataplane is not None:
+            self.dataplane.linksChanged((slot,))
+        self.getRouter(R1).connectPort(P1)
+        self.getRouter(R2).connectPort(P2)
+        return slot
+
+    def addLink(self, cost, R1, P1, R2, P2, delay=DEFAULT_LINK_DELAY):
+        # buildConnection without telling the routers or the data plane, which changeTopology does once per batch
+        slot = self.links.add(cost, R1, P1, R2, P2, delay)
+        self.topologyVersion += 1
+        if self.trace is not None:
+            self.trace.linkUp(self.T, self.links.slots[slot])
+        self.truthChanged(R1, R2, cost, 1)
+        self.Connections[R1][P1] = [cost, P1, P2, R2, delay]
+        self.Connections[R2][P2] = [cost, P2, P1, R1, delay]
+        self.SimplifiedConnections[R1].add(R2)
+        self.SimplifiedConnections[R2].add(R1)
+        return slot
+
+    def blowUpConnection(self, R1, Connection):
+        # Connection is one of R1's entries in self.Connections
+        self.blowUpLink(self.links.ports[(R1, Connection[1])])
+
+    def blowUpLink(self, slot):
+
+        link = self.removeLink(slot)
+        if self.dataplane is not None:
+            self.dataplane.linksChanged((slot,))
+        return link
+
+    def removeLink(self, slot):
+        # blowUpLink without telling the data plane, which changeTopology does once per batch
+        link = self.links.remove(slot)
+        self.topologyVersion += 1
+        if self.trace is not None:
+            self.trace.linkDown(self.T, link)
+        self.truthChanged(link.R1, link.R2, link.cost, -1)
+        del self.Connections[link.R1][link.P1]
+        del self.Connections[link.R2][link.P2]
+        self.SimplifiedConnections[link.R1].remove(link.R2)
+        self.SimplifiedConnections[link.R2].remove(link.R1)
+        return link
+
+    def setLinkCost(self, slot, cost):
+        # Changes the cost of the link in slot. The routers on the ends don't know yet, see changeTopology.
+        link = self.links.slots[slot]
+        self.truthChanged(link.R1, link.R2, link.cost, -1)
+        link.cost = cost
+        self.truthChanged(link.R1, link.R2, cost, 1)
+        self.Connections[link.R1][link.P1][0] = cost
+        self.Connections[link.R2][link.P2][0] = cost
+        self.topologyVersion += 1
+        if self.trace is not None:
+            self.trace.linkCost(self.T, link)
+        return link
+
+    def takeDown(self, ID):
+        '''
+        Fails router ID and remembers the links it has in downLinks. Returns their slots, for whoever called it to blow
+        up (see changeTopology).
+        '''
+        router = self.getRouter(ID)
+        router.fail()
+        if self.trace is not None:
+            self.trace.routerDown(self.T, ID)
+        self.downLinks[ID] = [(c[0], c[3], c[4]) for c in self.Connections[ID].values()]
+        return [self.links.ports[(ID, port)] for port in self.Connections[ID]]
+
+    def bringUp(self, ID):
+        '''
+        Restarts router ID. Returns the links it had when it failed that go to routers that are up, as (cost, R1, R2,
+        delay) for whoever called it to build. The ones to routers that are still down get handed over to them, so
+        they come back whenever both ends are up.
+        '''
+        self.getRouter(ID).restart()
+        if self.trace is not None:
+            self.trace.routerUp(self.T, ID)
+        build = []
+        for cost, far, delay in self.downLinks.pop(ID, ()):
+            if self.getRouter(far).Active:
+                build.append((cost, ID, far, delay))
+            else:
+                self.downLinks.setdefault(far, []).append((cost, ID, delay))
+        return build
+
+    def changeTopology(self, cut=(), build=(), costs=(), fail=(), restart=()):
+        '''
+        Makes a whole batch of topology changes at once, between ticks. In this order:
+          fail     router IDs that crash. They forget everything and every link they have gets blown up (and remembered
+                   for when they restart). Their neighbors find out the same way as any other cut link, by dead timer.
+          cut      slots of links to blow up
+          restart  failed router IDs that come back up knowing nothing, along with the links they had
+          build    (cost, R1, R2) or (cost, R1, R2, delay) links to build, on new ports. A link to a router that's down
+                   gets built when it restarts.
+          costs    (slot, new cost) for links whose cost changes. Both ends put it in a new LSP at the end of the tick.
+        However many changes there are, every router they touch gets told once (see Router.linksChanged), the data plane
+        gets one update for everything cut and one for everything built or recosted, and the log gets one line.
+        Routers that are already down (or up), slots with nothing in them and links that are already there get skipped.
+        Returns (the Links that got blown up, the slots that got built, the slots whose cost changed).
+        '''
+        cutSlots = set()
+        failed = []
+        for ID in fail:
+            if self.getRouter(ID).Active:
+                failed.append(ID)
+                cutSlots.update(self.takeDown(ID))
+        cutSlots.update(slot for slot in cut if self.links.slots[slot] is not None)
+        cutLinks = [self.removeLink(slot) for slot in sorted(cutSlots)]
+        if cutLinks and self.dataplane is not None:
+            # Before anything gets built, since a new link can go straight into a slot that just got freed up
+            self.dataplane.linksChanged(sorted(cutSlots))
+
+        toBuild = []
+        restarted = []
+        for ID in restart:
+            if not self.getRouter(ID).Active:
+                restarted.append(ID)
+                toBuild += self.bringUp(ID)
+        for change in build:
+            cost, R1, R2 = change[:3]
+            toBuild.append((cost, R1, R2, change[3] if len(change) > 3 else DEFAULT_LINK_DELAY))
+        plugged = {}  # router ID : [ports that got a link]
+        built = []
+        for cost, R1, R2, delay in toBuild:
+            if R1 == R2 or self.links.between(R1, R2) is not None:
+                continue
+            if not self.getRouter(R1).Active or not self.getRouter(R2).Active:
+                down, up = (R1, R2) if not self.getRouter(R1).Active else (R2, R1)
+                self.downLinks.setdefault(down, []).append((cost, up, delay))
+                continue
+            P1 = self.getRouter(R1).newPort()
+            P2 = self.getRouter(R2).newPort()
+            built.append(self.addLink(cost, R1, P1, R2, P2, delay))
+            plugged.setdefault(R1, []).append(P1)
+            plugged.setdefault(R2, []).append(P2)
+
+        recosted = {}  # router ID : {port : new cost}
+        recostedSlots = []
+        for slot, cost in costs:
+            link = self.links.slots[slot]
+            if link is None or link.cost == cost:
+                continue
+            self.setLinkCost(slot, cost)
+            recostedSlots.append(slot)
+            recosted.setdefault(link.R1, {})[link.P1] = cost
+            recosted.setdefault(link.R2, {})[link.P2] = cost
+
+        for ID in sorted(plugged.keys() | recosted.keys()):
+            self.getRouter(ID).linksChanged(plugged.get(ID, ()), recosted.get(ID))
+        if failed or restarted:
+            # A failed router doesn't count against convergence, so who has to agree with what changes even if it had
+            # no links to take with it
+            self.syncDirty = True
+            self.changedAt = self.T
+            self.topologyVersion += 1
+        if self.dataplane is not None:
+            self.dataplane.linksChanged(built + recostedSlots)
+            for ID in failed + restarted:
+                self.dataplane.routesChanged(ID)
+        if cutLinks or built or recostedSlots or failed or restarted:
+            eventLog.log(LEVEL_WARNING, self.T, MSG_TOPOLOGY_CHANGED, len(cutLinks), len(built), len(recostedSlots),
+                         len(failed), len(restarted))
+        return cutLinks, built, recostedSlots
+
+    def truthChanged(self, R1, R2, cost, sign):
+        # A link between R1 and R2 was added (sign 1) or removed (sign -1)
+        self.truthDigests[R1] = (self.truthDigests[R1] + sign * hash((R1, R2, cost))) & DIGEST_MASK
+        self.truthDigests[R2] = (self.truthDigests[R2] + sign * hash((R2, R1, cost))) & DIGEST_MASK
+        self.syncDirty = True
+        self.changedAt = self.T
+
+    def getRouter(self, ID):
+        return self.Routers[ID - 1]
+
+    def isConnected(self, R1, P1, R2):
+        '''
+        If router R1's port P1 still goes to router R2.
+        '''
+        link = self.links.get(R1, P1)
+        return link is not None and link.far(R1)[0] == R2
+
+    def getRouterPosition(self, ID):
+        return self.RouterPositions[ID - 1]
+
+    def getRITTP(self, ID):
+        return self.RITTP[ID]
+
+    def advance(self, until):
+        '''
+        Runs every event scheduled before tick until, then leaves the clock on until.
+        The clock jumps straight from one event to the next, so quiet stretches cost nothing.
+        '''
+        trace = self.trace
+        if trace is not None:
+            # Snapshots only work between ticks, so stop on every tick the trace wants one on the way
+            while trace.nextCheckpoint <= until:
+                self.runEvents(trace.nextCheckpoint)
+                trace.checkpoint(self)
+        self.runEvents(until)
+
+    def runEvents(self, until):
+        if self.syncDirty:
+            self.recountSync()
+        events = self.events
+        timers = self.timers
+        profiler = self.profiler
+        while True:
+            nextTime = events.heap[0][0] if events.heap else until
+            # LSPs that age out and neighbors that go dead on a tick go before anything else that happens on it
+            limit = nextTime + 1 if nextTime < until else until
+            if timers.time < limit:
+                due = timers.advance(limit)
+                if due is not None:
+                    self.T, keys = due
+                    if profiler is not None:
+                        profiler.startTick(self.T)
+                    for key in sorted(keys):
+                        router = self.getRouter((key & ~TIMER_KINDS) >> 32)
+                        if profiler is None:
+                            router.handleTimer(key)
+                        else:
+                            profiler.runTimer(router, key)
+                    continue
+            if nextTime >= until:
+                break
+            time, target, origin, _, eventType, args = events.pop()
+            self.T = time
+            if profiler is None:
+                self.getRouter(target).handleEvent(origin, eventType, args)
+            else:
+                profiler.runEvent(self.getRouter(target), origin, eventType, args)
+        if profiler is not None:
+            # Everything before until is done, so whatever tick was being counted is over
+            profiler.endTick()
+        self.T = until
+
+    def tick(self):
+        '''
+        Runs everything that happens on the current tick and moves the clock forward. This is the same thing the space bar does in the viewer.
+        '''
+        self.advance(self.T + 1)
+
+    def run(self, ticks):
+        '''
+        Steps the network for the given number of ticks as fast as the CPU allows. Returns the tick the network ended on.
+        '''
+        self.advance(self.T + ticks)
+        return self.T
+
+    def areaBetween(self, R1, R2):
+        '''
+        The area the link between routers R1 and R2 is in: theirs if they're in the same one, otherwise the one that
+        isn't the backbone, so the backbone router on the end of it is the area border router. Between two areas that
+        aren't the backbone it's the lower numbered of the two.
+        '''
+        A1 = self.areas[R1]
+        A2 = self.areas[R2]
+        if A1 == A2 or A2 == 0:
+            return A1
+        if A1 == 0:
+            return A2
+        return min(A1, A2)
+
+    def attachedAreas(self, ID):
+        '''
+        Every area router ID should be in going by its real connections: its own, plus the area of every link it has.
+        '''
+        return frozenset([self.areas[ID]] + [self.areaBetween(ID, adj) for adj in self.SimplifiedConnections[ID]])
+
+    def getComponent(self, ID, areas=None):
+        '''
+        All routers that can currently reach router ID through the real connections (including itself), only going over
+        links in areas if it's given.
+        '''
+        seen = {ID}
+        stack = [ID]
+        while stack:
+            node = stack.pop()
+            for adj in self.SimplifiedConnections[node]:
+                if adj not in seen and (areas is None or self.areaBetween(node, adj) in areas):
+                    seen.add(adj)
+                    stack.append(adj)
+        return seen
+
+    def areaTruth(self, node, areas):
+        # (router ID, cost) for every real connection router node has in areas, what it says in its LSPs there
+        return [(c[3], c[0]) for c in self.Connections[node].values() if self.areaBetween(node, c[3]) in areas]
+
+    def recountSync(self):
+        '''
+        Works out what every router's digest should be after the topology changed: the XOR of the truth digests of
+        every router in its component. Then counts who doesn't match. O(V + E), but only once per topology change.
+        '''
+        self.syncDirty = False
+        if self.areaCount > 1:
+            targets = self.areaSyncTargets()
+        else:
+            targets = [None] * (self.size + 1)
+            for x in range(1, self.size + 1):
+                if targets[x] is None:
+                    component = self.getComponent(x)
+                    digest = 0
+                    for node in component:
+                        digest ^= self.truthDigests[node]
+                    for node in component:
+                        targets[node] = digest
+        self.syncTargets = targets
+        self.mismatches = 0
+        for R in self.Routers:
+            # A router that's failed doesn't have to agree with anything until it comes back
+            R.inSync = not R.Active or R.digest == targets[R.ID]
+            if not R.inSync:
+                self.mismatches += 1
+        if self.mismatches == 0:
+            self.reportConverged()
+
+    def areaSyncTargets(self):
+        '''
+        recountSync with areas. LSPs in an area only get flooded over that area's links, so a router can only ever hear
+        from the routers in its component of each area it's in, going through just that area (not around through
+        another one). What its digest should be is the XOR over every area it's in of what every router in that
+        component has in the area. Each component of each area gets worked out once, O(V * areas + E) altogether.
+        '''
+        targets = [0] * (self.size + 1)
+        areaSets = [None] + [self.attachedAreas(x) for x in range(1, self.size + 1)]
+        for area in range(self.areaCount):
+            seen = set()
+            for x in range(1, self.size + 1):
+                if x in seen or area not in areaSets[x]:
+                    continue
+                component = self.getComponent(x, (area,))
+                seen.update(component)
+                digest = 0
+                for node in component:
+                    digest ^= entryDigest(node, self.areaTruth(node, (area,)))
+                for node in component:
+                    targets[node] ^= digest
+        return targets
+
+    def updateSync(self, router):
+        '''
+        Called by a router whenever its digest might have changed. Keeps mismatches up to date in O(1).
+        '''
+        if self.syncDirty:
+            return None  # Everything gets recounted before the next event anyway
+        inSync = router.digest == self.syncTargets[router.ID]
+        if inSync != router.inSync:
+            router.inSync = inSync
+            if inSync:
+                self.mismatches -= 1
+                if self.mismatches == 0:
+                    self.reportConverged()
+            else:
+                self.mismatches += 1
+
+    def reportConverged(self):
+        # Only the latest time counts if the network wobbled back out of sync after a change and then in again
+        if self.convergenceTimes and self.convergenceTimes[-1][0] == self.changedAt:
+            self.convergenceTimes[-1][1] = self.T
+        else:
+            self.convergenceTimes.append([self.changedAt, self.T])
+        eventLog.log(LEVEL_WARNING, self.T, MSG_CONVERGED, self.T - self.changedAt)
+
+    def outOfSync(self):
+        '''
+        How many routers don't agree with the real topology right now.
+        '''
+        if self.syncDirty:
+            self.recountSync()
+        return self.mismatches
+
+    def isConverged(self, routers=None):
+        '''
+        True if every router agrees with the real topology, going by the digests. That's just a counter for the whole
+        network, or one comparison per router when routers (a list of router IDs) limits it to just those.
+        '''
+        if self.syncDirty:
+            self.recountSync()
+        if routers is None:
+            return self.mismatches == 0
+        return all(self.getRouter(x).inSync for x in routers)
+
+    def checkConverged(self, routers=None):
+        '''
+        The slow way to do isConverged, by actually comparing everything. For checking the digests.
+        True if every router's adjMatrix matches the real connections for every router it can reach.
+        Routers that got cut off from each other can't be expected to know about each other, so those are skipped
+        (and without LSP aging, leftover LSPs from routers that got cut off don't count against anyone either), and
+        failed routers don't get checked at all.
+        With areas, a router only gets checked on the areas it's in, anything past them it only knows by summaries, and
+        in each one only on the routers it can reach through that area.
+        routers limits the check to just those router IDs.
+        '''
+        if self.areaCount > 1:
+            for R in (self.Routers if routers is None else map(self.getRouter, routers)):
+                if not R.Active:
+                    continue
+                for area in self.attachedAreas(R.ID):
+                    for node in self.getComponent(R.ID, (area,)):
+                        ThisLSP = R.nodeLSPs.get(lspID(node, area))
+                        if ThisLSP is None or \
+                                sorted(ThisLSP.adjacencies()) != sorted(self.areaTruth(node, (area,))):
+                            return False
+            return True
+        truth = {x: sorted((c[3], c[0]) for c in self.Connections[x].values()) for x in self.Connections}
+        for R in (self.Routers if routers is None else map(self.getRouter, routers)):
+            if not R.Active:
+                continue
+            for node in self.getComponent(R.ID):
+                if node not in R.adjMatrix or sorted(R.adjMatrix[node]) != truth[node]:
+                    return False
+        return True
+
+    def run_until_converged(self, maxTicks=10000):
+        '''
+        Steps the network until every router agrees with the real topology, or until maxTicks ticks have gone by.
+        Returns the tick the network converged on, or None if it never did.
+        '''
+        end = self.T + maxTicks
+        while self.T < end:
+            nextTime = self.events.nextTime()
+            if nextTime is None or nextTime >= end:
+                # No messages left, but a timer can still set things going again
+                nextTime = self.timers.nextDue()
+                if nextTime is None or nextTime >= end:
+                    break
+            # Nothing can change between events, so skip right to the next one
+            self.advance(nextTime + 1)
+            if self.isConverged():
+                return self.T
+        # Through advance and not just setting T, so timers on the way go off in order instead of the clock going
+        # past them
+        self.advance(end)
+        return None
+
+    def blowUpRandomConnection(self):
+        slot = self.links.randomSlot(self.rng)
+        if slot is None:
+            return None
+        link = self.blowUpLink(slot)
+        eventLog.log(LEVEL_WARNING, self.T, MSG_EDGE_CUT, link.R1, link.R2)
+        return link
+
+    def createRandomConnection(self):
+
+        randomStartNode = randomEndNode = None
+        if len(self.links) < self.size * (self.size - 1) // 2:
+            # Random pairs almost always work, only a nearly complete graph needs the slow way
+            for _ in range(100):
+                R1 = self.rng.randint(1, self.size)
+                R2 = self.rng.randint(1, self.size)
+                if R1 != R2 and self.links.between(R1, R2) is None and self.getRouter(R1).Active and \
+                        self.getRouter(R2).Active:
+                    randomStartNode, randomEndNode = R1, R2
+                    break
+            else:
+                # Failed routers can't get new links, they get theirs back when they restart
+                up = {R.ID for R in self.Routers if R.Active}
+                for R1 in self.rng.sample(range(1, self.size + 1), self.size):
+                    missing = up - self.SimplifiedConnections[R1] - {R1}
+                    if R1 in up and missing:
+                        randomStartNode, randomEndNode = R1, self.rng.choice(sorted(missing))
+                        break
+        if randomStartNode is None:
+            return None  # Every router is already connected to every other router
+
+        randomWeight = randomCost(self.rng)
+        P1 = self.getRouter(randomStartNode).newPort()
+        P2 = self.getRouter(randomEndNode).newPort()
+
+        slot = self.buildConnection(
+            randomWeight,
+            randomStartNode,
+            P1,
+            randomEndNode,
+            P2)
+
+        eventLog.log(LEVEL_WARNING, self.T, MSG_EDGE_CREATED, randomStartNode, P1, randomEndNode, P2, randomWeight)
+        return slot
+
+
+if __name__ == "__main__":
+    # Headless run, no window. Good for checking how long a topology takes to converge.
+    eventLog.level = LEVEL_WARNING
+    eventLog.start()
+    FullNetwork = Network(ROUTERCOUNT, EDGECOUNT)
+    convergedAt = FullNetwork.run_until_converged()
+    if convergedAt is None:
+        print(f"Network did not converge within {FullNetwork.T} ticks")
+    else:
+        print(f"Network converged at tick {convergedAt}")
@@ -0,0 +1,48 @@
+# An LSP nobody refreshes anymore has to age out exactly LSP_MAX_AGE ticks after it came in, and the timers that do it
+# have to go off in order with everything else, never on a tick the clock already went past.
+
+## IMPORTS ##
+import pytest
+
+from simulation import Network, LSP_MAX_AGE
+from eventlog import eventLog, LEVEL_OFF, LEVEL_VERBOSE
+
+eventLog.level = LEVEL_OFF
+
+
+def test_removed_at_max_age():
+    # Router 1 hangs off a triangle. Once it's cut off, the triangle's LSPs still list each other, so nobody flushes
+    # them for it and all they can do in router 1's LSDB is age out.
+    network = Network(4, 0)
+    for R1, R2 in ((1, 2), (2, 3), (3, 4), (4, 2)):
+        network.buildConnection(1, R1, network.getRouter(R1).newPort(), R2, network.getRouter(R2).newPort())
+    network.run_until_converged()
+    R1 = network.getRouter(1)
+    # Wait for router 2's next refresh to get to router 1, then cut them apart so that one is the last it ever gets
+    last = R1.nodeLSPs[2]
+    while R1.nodeLSPs[2] is last:
+        network.tick()
+    arrived = network.T - 1
+    network.blowUpLink(network.links.ports[(1, "A")])
+    network.advance(arrived + LSP_MAX_AGE)
+    assert 2 in R1.nodeLSPs
+    network.tick()
+    assert 2 not in R1.nodeLSPs
+    assert 1 in R1.nodeLSPs
+
+
+@pytest.mark.parametrize("seed", [2, 11, 13])
+def test_clock_never_goes_back(seed, monkeypatch):
+    network = Network(3, 3, seed=seed)
+    network.run_until_converged()
+    network.blowUpRandomConnection()
+    # Every log record has the tick it happened on, timers included, so nothing logged during a call can be from before
+    # the tick the last call left the clock on
+    monkeypatch.setattr(eventLog, "level", LEVEL_VERBOSE)
+    for _ in range(2 * LSP_MAX_AGE):
+        eventLog.records.clear()
+        before = network.T
+        network.run_until_converged(1)
+        assert network.T == before + 1
+        assert all(record[0] >= before for record in eventLog.records)
+    eventLog.records.clear()
@@ -0,0 +1,31 @@
+# The benchmark has to measure the same run every time for the same seed, and write it all out as JSON.
+
+## IMPORTS ##
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import benchmark
+from benchmark import runScenario, SCENARIOS
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_scenarios_repeat(scenario):
+    first = runScenario(scenario, 30, "ba", 2, 5000, 60)
+    again = runScenario(scenario, 30, "ba", 2, 5000, 60)
+    assert "error" not in first and not first["timedOut"]
+    assert first["ticksToConvergence"] is not None and first["messages"] > 0
+    for key in ("routers", "links", "ticks", "ticksToConvergence", "messages"):
+        assert first[key] == again[key]
+
+
+def test_report(tmp_path):
+    output = tmp_path / "bench.json"
+    subprocess.run([sys.executable, "benchmark.py", "--sizes", "10", "--scenarios", "cold", "cut", "--output",
+                    str(output)], cwd=Path(benchmark.__file__).parent, check=True, capture_output=True)
+    report = json.loads(output.read_text())
+    assert [(result["scenario"], result["routers"]) for result in report["results"]] == [("cold", 10), ("cut", 10)]
+    assert report["seed"] == benchmark.SEED
@@ -0,0 +1,41 @@
+# A network loaded back from a checkpoint has to carry on exactly the way the one it was saved from does.
+
+## IMPORTS ##
+import pytest
+
+import checkpoint
+from simulation import Network
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def sameState(a, b):
+    return all(R.nodeLSPs == S.nodeLSPs and R.routingTable == S.routingTable and R.areaRoutes == S.areaRoutes and
+               R.neighbors == S.neighbors for R, S in zip(a.Routers, b.Routers))
+
+
+@pytest.mark.parametrize("areas", [1, 4])
+def test_round_trip(tmp_path, areas):
+    network = Network(80, 200, seed=5, areas=areas)
+    # Mid convergence, so there's messages on the wire and timers going
+    network.advance(7)
+    path = tmp_path / "network.snap"
+    checkpoint.save(network, str(path))
+    loaded = checkpoint.load(str(path))
+    assert loaded.T == network.T
+    assert sameState(network, loaded)
+
+    for net in (network, loaded):
+        net.blowUpRandomConnection()
+        net.advance(net.T + 60)
+    assert loaded.messagesSent == network.messagesSent
+    assert sameState(network, loaded)
+    assert loaded.outOfSync() == network.outOfSync()
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "junk.snap"
+    path.write_bytes(b"definitely not a network" * 4)
+    with pytest.raises(ValueError):
+        checkpoint.load(str(path))
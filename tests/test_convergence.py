@@ -0,0 +1,28 @@
+# Whatever happens to the topology, the network has to converge again, and the digests have to agree with actually
+# comparing every LSDB against the real connections.
+
+## IMPORTS ##
+import pytest
+
+from simulation import Network
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+# With 3 areas, seeds 0 and 5 cut routers off from part of an area they can still get around to through another one,
+# which used to keep the network from ever converging
+@pytest.mark.parametrize("areas", [1, 3])
+@pytest.mark.parametrize("seed", [0, 5])
+def test_converges_after_churn(areas, seed):
+    network = Network(60, 150, seed=seed, areas=areas)
+    assert network.run_until_converged() is not None
+    for _ in range(20):
+        if network.rng.random() < 0.5:
+            network.blowUpRandomConnection()
+        else:
+            network.createRandomConnection()
+        network.advance(network.T + 2)
+        assert network.isConverged() == network.checkConverged()
+    assert network.run_until_converged(1500) is not None
+    assert network.checkConverged()
@@ -0,0 +1,58 @@
+# Every packet the flows put in has to end up counted exactly once: delivered, blackholed, looped, lost on a link that
+# got blown up, or still in flight.
+
+## IMPORTS ##
+from simulation import Network
+from dataplane import DataPlane
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def accountedFor(plane):
+    totals = plane.totals
+    return totals["delivered"] + totals["blackholed"] + totals["looped"] + totals["lost"] + int(plane.count.sum())
+
+
+def test_converged_network_delivers_everything():
+    network = Network(60, 150, seed=4)
+    network.run_until_converged()
+    plane = DataPlane(network)
+    plane.addRandomFlows(200, 10, seed=1)
+    plane.run(50)
+    assert plane.totals["injected"] == 200 * 10 * 50
+    assert plane.totals["delivered"] > 0
+    assert plane.totals["blackholed"] == plane.totals["looped"] == plane.totals["lost"] == 0
+    assert accountedFor(plane) == plane.totals["injected"]
+
+
+def test_cuts_drop_packets_and_every_one_is_counted():
+    network = Network(60, 150, seed=4)
+    network.run_until_converged()
+    plane = DataPlane(network)
+    plane.addRandomFlows(500, 10, seed=2)
+    plane.run(5)
+    # Cut the busiest links, so there's traffic on them and routes through them
+    for slot in sorted({busy[0] for busy in plane.busiestLinks(5)}):
+        network.blowUpLink(slot)
+    plane.run_until_converged()
+    assert plane.totals["blackholed"] + plane.totals["lost"] > 0
+    assert accountedFor(plane) == plane.totals["injected"]
+
+    # Once it's converged the forwarding table is just the routers' tables again
+    plane.refreshRoutes()
+    for column, destination in enumerate(plane.destinations.tolist()):
+        for ID in range(1, network.size + 1):
+            assert plane.fib[ID, column] == plane.route(ID, destination)
+
+
+def test_no_pairs_no_flows():
+    network = Network(1, 0)
+    network.run_until_converged()
+    plane = DataPlane(network)
+    plane.addRandomFlows(10, 5, seed=1)
+    plane.run(5)
+    assert plane.totals["injected"] == 0
+    plane = DataPlane(Network(6, 8, seed=1))
+    plane.addRandomFlows(10, 5, seed=1, destinations=0)
+    assert plane.totals["injected"] == 0
@@ -0,0 +1,36 @@
+# The event log: what gets kept, what gets thrown away, and what comes out the other end once something writes it.
+
+## IMPORTS ##
+from eventlog import EventLog, LEVEL_VERBOSE, LEVEL_DEBUG, LEVEL_WARNING, LEVEL_OFF
+
+
+def test_levels():
+    log = EventLog(level=LEVEL_DEBUG)
+    log.log(LEVEL_VERBOSE, 1, "[{T}] not kept")
+    log.log(LEVEL_DEBUG, 2, "[{T}] router {0}", 4)
+    log.log(LEVEL_WARNING, 3, "[{T}] router {0} port {1}", 5, "B")
+    assert list(log.records) == [(2, LEVEL_DEBUG, "[{T}] router {0}", (4,)),
+                                 (3, LEVEL_WARNING, "[{T}] router {0} port {1}", (5, "B"))]
+    log.level = LEVEL_OFF
+    log.log(LEVEL_WARNING, 4, "[{T}] not kept either")
+    assert len(log.records) == 2
+
+
+def test_oldest_fall_off():
+    log = EventLog(level=LEVEL_VERBOSE, size=3)
+    for tick in range(10):
+        log.log(LEVEL_DEBUG, tick, "[{T}]")
+    assert [record[0] for record in log.records] == [7, 8, 9]
+
+
+def test_writer(tmp_path):
+    log = EventLog(level=LEVEL_VERBOSE, batchInterval=0.01)
+    path = tmp_path / "log.txt"
+    log.openFile(str(path))
+    log.start()
+    for tick in range(100):
+        log.log(LEVEL_DEBUG, tick, "[{T}] router {0}", tick % 7)
+    # Stopping writes out whatever the writer hadn't got to yet
+    log.stop()
+    assert path.read_text().splitlines() == [f"[{tick}] router {tick % 7}" for tick in range(100)]
+    assert not log.records
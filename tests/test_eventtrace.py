@@ -0,0 +1,101 @@
+# Replaying a recorded trace has to build back the same LSDBs the run had on every tick, whichever way LSPs got there
+# or went away.
+
+## IMPORTS ##
+import pytest
+
+import checkpoint
+from simulation import Network, lspID
+from eventtrace import TraceWriter, TraceReader, snapshotPath, CHECKPOINT_INTERVAL
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def state(network):
+    return [(R.nodeLSPs.copy(), R.neighbors.copy()) for R in network.Routers]
+
+
+@pytest.mark.parametrize("areas", [1, 3])
+def test_replay_matches_the_run(tmp_path, areas):
+    network = Network(50, 120, seed=2, areas=areas)
+    writer = TraceWriter(str(tmp_path / "trace"), network)
+    seen = {}
+    while network.T < 300:
+        if network.T % 40 == 10:
+            network.blowUpRandomConnection()
+        if network.T % 60 == 30:
+            network.createRandomConnection()
+        network.tick()
+        if network.T % 25 == 0:
+            seen[network.T] = state(network)
+    writer.close()
+
+    reader = TraceReader(str(tmp_path / "trace"))
+    for T, expected in seen.items():
+        assert state(reader.networkAt(T)) == expected, f"replay is different on tick {T}"
+
+
+def test_replay_schedules_nothing(tmp_path):
+    # Replaying LSPs and links gets the routers wanting to run SPF and put out LSPs, none of which can end up queued on
+    # the scrubbed network
+    network = Network(50, 120, seed=2)
+    writer = TraceWriter(str(tmp_path / "trace"), network)
+    while network.T < 150:
+        if network.T % 20 == 10:
+            network.blowUpRandomConnection()
+        network.tick()
+    writer.close()
+
+    reader = TraceReader(str(tmp_path / "trace"))
+    for T in (40, 90, 140):
+        scrubbed = reader.networkAt(T)
+        assert not any(R.SPFScheduled for R in scrubbed.Routers)
+        saved = checkpoint.load(snapshotPath(reader.path, T // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL))
+        assert scrubbed.events.heap == saved.events.heap
+
+
+def test_failed_routers_replay(tmp_path):
+    # Routers crashing and coming back: a restart schedules the router's fresh LSP, which has a record of its own, so
+    # that can't end up queued on the scrubbed network either
+    network = Network(50, 120, seed=2)
+    writer = TraceWriter(str(tmp_path / "trace"), network)
+    seen = {}
+    while network.T < 250:
+        if network.T % 60 == 10:
+            network.changeTopology(fail=[network.T // 60 + 1, network.T // 60 + 20])
+        if network.T % 60 == 40:
+            network.changeTopology(restart=[network.T // 60 + 1, network.T // 60 + 20])
+        network.tick()
+        if network.T % 30 == 15:
+            seen[network.T] = state(network)
+    writer.close()
+
+    reader = TraceReader(str(tmp_path / "trace"))
+    for T, expected in seen.items():
+        scrubbed = reader.networkAt(T)
+        assert state(scrubbed) == expected, f"replay is different on tick {T}"
+        saved = checkpoint.load(snapshotPath(reader.path, T // CHECKPOINT_INTERVAL * CHECKPOINT_INTERVAL))
+        assert scrubbed.events.heap == saved.events.heap
+
+
+def test_summary_flush_gets_recorded(tmp_path):
+    # An area border router whose links into the other area all get cut isn't bordering anything anymore, so it
+    # flushes the summary it was putting out into its own area without putting a new one out, and the replay has to
+    # drop that summary too
+    network = Network(50, 110, seed=0, areas=3)
+    writer = TraceWriter(str(tmp_path / "trace"), network)
+    network.run_until_converged()
+    router = next(R for R in network.Routers if len(R.areas) == 2 and 0 in R.areas)
+    ID = lspID(router.ID, router.area, summary=True)
+    assert ID in router.nodeLSPs
+    (other,) = [area for area in router.areas if area != router.area]
+    for port in list(router.areas[other]):
+        network.blowUpLink(network.links.ports[(router.ID, port)])
+    network.run_until_converged()
+    writer.close()
+
+    replayed = TraceReader(str(tmp_path / "trace")).networkAt(network.T)
+    assert ID not in router.nodeLSPs
+    assert ID not in replayed.getRouter(router.ID).nodeLSPs
+    assert state(replayed) == state(network)
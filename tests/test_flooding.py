@@ -0,0 +1,39 @@
+# Reliable flooding: an LSP that never gets acked has to go out again, once per ROUTER_RXMT_INTERVAL, and only until the
+# ack finally gets there.
+
+## IMPORTS ##
+from heapq import heapify
+
+from simulation import Network, EVENT_DELIVER, ROUTER_RXMT_INTERVAL
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def test_lost_ack_gets_one_retransmit():
+    network = Network(2, 0, seed=1)
+    network.buildConnection(1, 1, "A", 2, "A")
+    network.run_until_converged()
+    # Past the acks for the database exchange, some of which are for copies router 2 wasn't waiting on
+    network.advance(network.T + 4 * ROUTER_RXMT_INTERVAL)
+    R2 = network.getRouter(2)
+    # Wait for router 1 to ack something from router 2, then take that LSACK off the wire
+    while True:
+        heap = network.events.heap
+        acks = [event for event in heap if event[1] == 2 and event[4] == EVENT_DELIVER and event[5][2] == 3]
+        if acks:
+            break
+        network.tick()
+    lost = acks[0]
+    heap.remove(lost)
+    heapify(heap)
+    acked = lost[5][3]
+    assert all(R2.retransmits["A"][origin][0][0] == SeqN for origin, SeqN in acked)
+
+    before = network.retransmittedLSPs
+    network.advance(network.T + 3 * ROUTER_RXMT_INTERVAL)
+    # Sent again once, and acked for real that time
+    assert network.retransmittedLSPs - before == len(acked)
+    for origin, SeqN in acked:
+        entry = R2.retransmits["A"].get(origin)
+        assert entry is None or entry[0][0] != SeqN
@@ -0,0 +1,51 @@
+# Neighbors have to come up through the state machine before they go in an LSP, and go away again exactly
+# ROUTER_DEAD_INTERVAL ticks after the last HELLO they sent got through.
+
+## IMPORTS ##
+from simulation import Network, EVENT_HELLO, ROUTER_DEAD_INTERVAL, NEIGHBOR_DOWN, NEIGHBOR_INIT, NEIGHBOR_FULL
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def pair():
+    network = Network(2, 0)
+    network.buildConnection(1, 1, "A", 2, "A")
+    return network, network.getRouter(1)
+
+
+def test_up_to_full():
+    network, R1 = pair()
+    routers = (R1, network.getRouter(2))
+    seen = {R.ID: [NEIGHBOR_DOWN] for R in routers}
+    while any(states[-1] != NEIGHBOR_FULL for states in seen.values()):
+        network.tick()
+        for R in routers:
+            seen[R.ID].append(R.neighborStates.get("A", (NEIGHBOR_DOWN,))[0])
+            # Only Full neighbors count as neighbors
+            assert ("A" in R.neighbors) == (seen[R.ID][-1] == NEIGHBOR_FULL)
+    # Whoever heard the first HELLO sat in Init until the other end's HELLO listed them, the other one went straight to
+    # Full on that
+    assert any(NEIGHBOR_INIT in states for states in seen.values())
+    assert all(states == sorted(states) for states in seen.values())
+    assert network.run_until_converged() is not None
+    assert R1.nodeLSPs[1].neighbors == (("A", 2, 1),)
+
+
+def test_dead_interval():
+    network, R1 = pair()
+    network.run_until_converged()
+    hello = min(time for time, target, _, _, eventType, _ in network.events.heap
+                if target == 2 and eventType == EVENT_HELLO)
+    # Router 2 says hello on that tick, and it gets to router 1 the tick after. Then the link goes.
+    network.advance(hello + 2)
+    network.blowUpLink(network.links.ports[(1, "A")])
+    network.advance(hello + 1 + ROUTER_DEAD_INTERVAL)
+    assert R1.neighborStates["A"][0] == NEIGHBOR_FULL
+    assert "A" in R1.neighbors
+    network.tick()
+    assert "A" not in R1.neighborStates
+    assert "A" not in R1.neighbors
+    assert "A" not in R1.ActivePorts
+    network.tick()
+    assert R1.nodeLSPs[1].neighbors == ()
@@ -0,0 +1,63 @@
+# A PartitionedNetwork has to come out exactly the same as a Network built from the same seed, cuts and new links
+# included, and the barrier it runs to can't skip over anyone's timers.
+
+## IMPORTS ##
+from random import Random
+from collections import Counter
+
+import pytest
+
+from simulation import Network, TimingWheel
+from parallel import PartitionedNetwork, partition, cutSize, BALANCE_SLACK
+from topologies import grid
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def churn(network):
+    # Converges, then cuts and builds a few links, and says what tick it converged on each time
+    ticks = [network.run_until_converged(3000)]
+    for _ in range(3):
+        network.blowUpRandomConnection()
+        network.createRandomConnection()
+        network.run(7)
+        ticks.append(network.run_until_converged(3000))
+    return ticks
+
+
+@pytest.mark.parametrize("areas", [1, 2])
+def test_same_as_one_process(areas):
+    single = Network(40, 90, seed=3, areas=areas)
+    expected = churn(single)
+    with PartitionedNetwork(40, 90, seed=3, areas=areas, workers=2) as partitioned:
+        assert churn(partitioned) == expected
+        for R in single.Routers:
+            assert partitioned.getRouterState(R.ID) == (R.routingTable, R.nodeLSPs)
+
+
+def test_next_due_is_the_earliest_timer():
+    rng = Random(1)
+    wheel = TimingWheel(rng.randint(0, 5000))
+    assert wheel.nextDue() is None
+    for _ in range(3000):
+        roll = rng.random()
+        if roll < 0.5:
+            # Anywhere from the next tick to past the top level of the wheel
+            wheel.schedule(rng.randint(0, 400), wheel.time + int(rng.expovariate(1 / 10 ** rng.randint(0, 6))))
+        elif roll < 0.7 and wheel.due:
+            wheel.cancel(rng.choice(sorted(wheel.due)))
+        else:
+            wheel.advance(wheel.time + rng.randint(1, 3000))
+        assert wheel.nextDue() == (min(wheel.due.values()) if wheel.due else None)
+
+
+@pytest.mark.parametrize("parts, most", [(2, 20), (4, 40)])
+def test_partitions_are_balanced_and_cut_little(parts, most):
+    # A 10 x 10 grid can be cut in 2 with 10 of its 180 edges and in 4 with 20, so anything near that is fine
+    edges = [(R1, R2) for R1, R2, _ in grid(100, 0, Random(1)).edges]
+    owners = partition(100, edges, parts)
+    sizes = Counter(owners[1:])
+    assert sorted(sizes) == list(range(parts))
+    assert max(sizes.values()) - min(sizes.values()) <= 100 * BALANCE_SLACK
+    assert cutSize(owners, edges) <= most
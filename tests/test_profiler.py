@@ -0,0 +1,65 @@
+# The profiler keeps its LSDB totals up to date as LSPs come and go instead of counting every LSDB on every tick, so
+# they have to match actually counting them, and timers going off have to be counted like events are.
+
+## IMPORTS ##
+import pytest
+
+from simulation import Network, ROUTER_DEAD_INTERVAL
+from profiler import Profiler
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+@pytest.mark.parametrize("areas", [1, 3])
+def test_counts_match_a_full_scan(areas):
+    network = Network(30, 60, seed=4, areas=areas)
+    network.run_until_converged()
+    # Hooked in after the LSDBs filled up, so it has to start from what's already there
+    profiler = Profiler(network)
+    cuts = 0
+    for T in range(300):
+        if T % 50 == 0:
+            cuts += network.blowUpRandomConnection() is not None
+        if T % 50 == 25:
+            network.createRandomConnection()
+        network.tick()
+        sizes = [len(R.nodeLSPs) for R in network.Routers]
+        assert (profiler.LSDBTotal, profiler.LSDBMax) == (sum(sizes), max(sizes))
+    profiler.close()
+
+    series = profiler.series()
+    assert series["LSDBTotal"][-1] == sum(len(R.nodeLSPs) for R in network.Routers)
+    # Both ends of every cut link wait out the dead interval on a timer
+    assert sum(series["timersFired"]) >= 2 * cuts > 0
+    assert network.profiler is None
+
+
+def test_timer_only_ticks_get_rows():
+    network = Network(2, 0)
+    network.buildConnection(1, 1, "A", 2, "A")
+    network.run_until_converged()
+    network.blowUpLink(network.links.ports[(1, "A")])
+    profiler = Profiler(network)
+    network.advance(network.T + 2 * ROUTER_DEAD_INTERVAL)
+    profiler.close()
+    series = profiler.series()
+    fired = [i for i, count in enumerate(series["timersFired"]) if count]
+    assert fired
+    assert all(series["slowestRouter"][i] in (1, 2) for i in fired)
+
+
+def test_failures_keep_the_counts():
+    # A router that fails forgets its whole LSDB at once
+    network = Network(30, 60, seed=4)
+    network.run_until_converged()
+    profiler = Profiler(network)
+    for T in range(150):
+        if T % 50 == 0:
+            network.changeTopology(fail=[T // 50 + 1, T // 50 + 10])
+        if T % 50 == 30:
+            network.changeTopology(restart=[T // 50 + 1, T // 50 + 10])
+        network.tick()
+        sizes = [len(R.nodeLSPs) for R in network.Routers]
+        assert (profiler.LSDBTotal, profiler.LSDBMax) == (sum(sizes), max(sizes))
+    profiler.close()
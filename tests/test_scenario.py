@@ -0,0 +1,107 @@
+# Scenario files: what they get parsed into, what's an error, and that playing one (failed routers included) is
+# repeatable and ends converged.
+
+## IMPORTS ##
+import pytest
+
+import checkpoint
+from simulation import Network
+from scenario import Scenario
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+STORM = """
+10 cut random 5          # a few fiber cuts
++40 restore all
+100 fail near 5 1
++5 cost random random 10
++60 restart all
+300 partition area 0
++50 heal
+"""
+
+
+def test_ticks():
+    scenario = Scenario("5 heal\n+10 heal\n100..140/20 heal  # flapping\n\n+1 heal")
+    assert [tick for tick, _ in scenario.batches] == [5, 15, 100, 101, 120, 140]
+    assert scenario.batches[0][1] == [(1, "heal", [])]
+
+
+@pytest.mark.parametrize("text", [
+    "5",
+    "x cut 1-2",
+    "5 explode 1-2",
+    "+5..10/2 cut 1-2",
+    "5 cut",
+    "5 cut 1-2 banana",
+    "5 fail near 3",
+    "5 heal now",
+    "5 cost cheap 1-2",
+    "5 restore random 3",
+])
+def test_bad_lines(text):
+    with pytest.raises(ValueError, match="line 1"):
+        Scenario(text)
+
+
+def test_links_that_arent_there():
+    network = Network(30, 60, seed=1)
+    link = network.links.slots[0]
+    pair = f"{link.R1}-{link.R2}"
+    with pytest.raises(ValueError, match="line 1: can't restore"):
+        Scenario(f"0 restore {pair}").applyDue(network)
+    with pytest.raises(ValueError, match="line 3: can't restore"):
+        # Already back after the first restore
+        Scenario(f"0 cut {pair}\n1 restore {pair}\n2 restore {pair}").run(Network(30, 60, seed=1), 50)
+    with pytest.raises(ValueError, match="line 1: can't cut"):
+        Scenario("0 cut 1-1").applyDue(network)
+
+
+def test_counts_only_what_changed():
+    network = Network(30, 60, seed=1)
+    scenario = Scenario("0 cost 5 all\n1 cost 5 all\n2 fail 3 3\n3 fail 3\n3 restart all", 1)
+    counts = []
+    while not scenario.done():
+        counts += scenario.applyDue(network)
+        network.tick()
+    assert [c["recosted"] for c in counts] == [len(network.links), 0, 0, 0]
+    assert [(c["failed"], c["restarted"]) for c in counts] == [(0, 0), (0, 0), (1, 0), (0, 1)]
+    assert network.getRouter(3).Active
+
+
+@pytest.mark.parametrize("areas", [1, 3])
+def test_storm_is_repeatable_and_converges(areas):
+    runs = []
+    for _ in range(2):
+        network = Network(60, 150, seed=2, areas=areas)
+        Scenario(STORM, seed=4).run(network, 1000)
+        assert network.isConverged() and network.checkConverged()
+        assert all(R.Active for R in network.Routers)
+        runs.append((network.T, network.messagesSent, [R.nodeLSPs for R in network.Routers]))
+    assert runs[0] == runs[1]
+
+
+def test_checkpoint_with_routers_down(tmp_path):
+    text = "0 fail random 10\n+2 cost 3 random 20\n+40 restart all\n"
+    network = Network(80, 200, seed=5, areas=2)
+    scenario = Scenario(text, seed=1)
+    scenario.applyDue(network)
+    for _ in range(6):
+        network.tick()
+        scenario.applyDue(network)
+    assert network.downLinks
+    checkpoint.save(network, str(tmp_path / "network.snap"))
+    loaded = checkpoint.load(str(tmp_path / "network.snap"))
+    assert loaded.downLinks == network.downLinks
+
+    # A second copy of the scenario, picking up where the first one is
+    again = Scenario(text, seed=1)
+    again.start, again.nextBatch = scenario.start, scenario.nextBatch
+    again.rng.setstate(scenario.rng.getstate())
+    for net, playing in ((network, scenario), (loaded, again)):
+        for _ in range(100):
+            net.tick()
+            playing.applyDue(net)
+    assert loaded.messagesSent == network.messagesSent
+    assert all(R.nodeLSPs == S.nodeLSPs and R.Active == S.Active for R, S in zip(network.Routers, loaded.Routers))
@@ -0,0 +1,103 @@
+# The simulation core on its own: it has to run headless, without pygame, and get every router to agree on the
+# topology.
+
+## IMPORTS ##
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import simulation
+from simulation import Network, EventQueue, LinkTable, LSP, sendMessage, EVENT_HELLO
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def test_no_pygame():
+    # A fresh interpreter, so whatever else the tests imported doesn't count
+    code = "import sys, simulation; sys.exit('pygame' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=Path(simulation.__file__).parent).returncode == 0
+
+
+def test_converges_headless():
+    network = Network(6, 10, seed=1)
+    other = Network(6, 10, seed=1)
+    convergedAt = network.run_until_converged()
+    assert convergedAt is not None and network.T == convergedAt
+    assert network.isConverged()
+    # Networks don't share anything, the other one never moved
+    assert other.T == 0
+    # and the same seed runs the same way
+    assert other.run_until_converged() == convergedAt
+
+
+def test_same_tick_order():
+    # Whatever order they got pushed in, events on one tick come out by target, then origin, then origin's counter
+    queue = EventQueue()
+    queue.push(5, 2, 1, 7, EVENT_HELLO)
+    queue.push(5, 1, 2, 1, EVENT_HELLO)
+    queue.push(5, 1, 1, 3, EVENT_HELLO)
+    queue.push(4, 9, 9, 9, EVENT_HELLO)
+    assert [queue.pop()[:4] for _ in range(len(queue))] == [(4, 9, 9, 9), (5, 1, 1, 3), (5, 1, 2, 1), (5, 2, 1, 7)]
+
+
+def test_messages_wait_out_the_link_delay():
+    network = Network(2, 0)
+    network.buildConnection(7, 1, "A", 2, "A", delay=3)
+    network.events = EventQueue()  # Just the one message, without the routers' hello and LSP timers
+    network.advance(10)
+    assert sendMessage(network, 1, "A", 1, (1, 0))
+    assert network.events.nextTime() == 13
+
+
+def test_link_table():
+    links = LinkTable()
+    first = links.add(5, 1, "A", 2, "B")
+    second = links.add(3, 2, "A", 3, "A")
+    assert links.get(2, "B").cost == 5 and links.get(2, "A").far(2) == (3, "A")
+    assert links.between(2, 1) == first and links.between(1, 3) is None
+    assert links.remove(first).R2 == 2
+    assert links.get(1, "A") is None and len(links) == 1
+    # Freed slots get used again
+    assert links.add(1, 1, "A", 3, "B") == first and links.between(3, 1) == first
+    assert links.between(2, 3) == second
+
+
+def test_random_connections_stop_when_complete():
+    network = Network(3, 0)
+    built = [network.createRandomConnection() for _ in range(4)]
+    assert None not in built[:3] and built[3] is None
+    assert len(network.links) == 3
+
+
+def test_lsps_are_shared():
+    network = Network(20, 40, seed=3)
+    assert network.run_until_converged() is not None
+    shared = 0
+    for R in network.Routers:
+        own = R.nodeLSPs[R.ID]
+        # Everyone with the latest one has the very object the router made, not a copy of it
+        copies = [S.nodeLSPs[R.ID] for S in network.Routers if S.nodeLSPs.get(R.ID, (None,))[0] == own[0]]
+        assert all(copy is own for copy in copies)
+        shared += len(copies) - 1
+        with pytest.raises(AttributeError):
+            own.neighbors = ()
+    assert shared > len(network.Routers)
+    ThisLSP = LSP(4, (("A", 2, 10),), 7)
+    assert (ThisLSP.origin, ThisLSP.seqNum, ThisLSP.adjacencies()) == (4, 7, [(2, 10)])
+
+
+def test_redraw_versions():
+    # The viewer only redraws what these say changed, so they have to go up whenever something does
+    network = Network(10, 20, seed=4)
+    assert network.run_until_converged() is not None
+    version = network.topologyVersion
+    link = network.blowUpRandomConnection()
+    assert network.topologyVersion == version + 1
+    network.createRandomConnection()
+    assert network.topologyVersion == version + 2
+    before = network.getRouter(link.R1).LSDBVersion
+    network.run_until_converged()
+    assert network.getRouter(link.R1).LSDBVersion > before
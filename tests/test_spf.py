@@ -0,0 +1,54 @@
+# Incremental SPF only fixes up the part of the tree that changed, so after any amount of churn every router's tree
+# and routing table have to come out the same as plain Dijkstra over its LSDB from scratch.
+
+## IMPORTS ##
+from heapq import heappush, heappop
+
+import pytest
+
+from simulation import Network
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def shortestPaths(adjMatrix, source):
+    dist = {}
+    heap = [(0, source)]
+    while heap:
+        cost, node = heappop(heap)
+        if node in dist:
+            continue
+        dist[node] = cost
+        for adj, adjCost in adjMatrix.get(node, ()):
+            if adj not in dist:
+                heappush(heap, (cost + adjCost, adj))
+    return dist
+
+
+def checkRouter(R):
+    dist = shortestPaths(R.adjMatrix, R.ID)
+    assert R.dist == dist
+    for node, (cost, hop, port) in R.routingTable.items():
+        # The next hop has to actually be on a shortest path, out of the port that goes to it
+        assert cost == dist[node]
+        first = min(adjCost for adj, adjCost in R.adjMatrix[R.ID] if adj == hop)
+        assert cost == first + shortestPaths(R.adjMatrix, hop)[node]
+        assert R.neighbors[port][0] == hop
+    assert set(R.routingTable) == set(dist) - {R.ID}
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_incremental_matches_full(seed):
+    network = Network(30, 70, seed=seed)
+    assert network.run_until_converged() is not None
+    for change in range(20):
+        if change % 3:
+            network.blowUpRandomConnection()
+        else:
+            network.createRandomConnection()
+        network.run(2)
+        for R in network.Routers:
+            checkRouter(R)
+    # Most of those runs have to have been the incremental kind, or this didn't test much
+    assert sum(R.SPFRuns - R.fullSPFRuns for R in network.Routers) > sum(R.fullSPFRuns for R in network.Routers)
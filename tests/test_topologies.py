@@ -0,0 +1,48 @@
+# Every generator has to build a proper simple graph of the size it says, the same one every time for the same seed.
+
+## IMPORTS ##
+from random import Random
+
+import pytest
+
+from simulation import Network
+from topologies import TopologyGenerators, randomGraph, barabasiAlbert, fatTree, tree, star, ring, MIN_COST, MAX_COST
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+@pytest.mark.parametrize("name", sorted(TopologyGenerators))
+@pytest.mark.parametrize("size", [5, 12, 200])
+def test_simple_graph(name, size):
+    topology = TopologyGenerators[name](size, 3 * size, Random(1))
+    assert topology.size <= size
+    pairs = {(min(R1, R2), max(R1, R2)) for R1, R2, _ in topology.edges}
+    assert len(pairs) == len(topology.edges)
+    assert all(1 <= R1 <= topology.size and 1 <= R2 <= topology.size and R1 != R2 for R1, R2, _ in topology.edges)
+    assert all(MIN_COST <= cost <= MAX_COST for _, _, cost in topology.edges)
+    if topology.positions is not None:
+        assert len(topology.positions) == topology.size
+    again = TopologyGenerators[name](size, 3 * size, Random(1))
+    assert again.edges == topology.edges and again.positions == topology.positions
+
+
+def test_edge_counts():
+    assert len(randomGraph(50, 120, Random(2)).edges) == 120
+    assert len(randomGraph(5, 100, Random(2)).edges) == 10
+    for generator in (tree, star):
+        assert len(generator(40, 0, Random(2)).edges) == 39
+    assert len(ring(40, 0, Random(2)).edges) == 40
+    k = 3
+    assert len(barabasiAlbert(100, 300, Random(2)).edges) == k * (k + 1) // 2 + (100 - k - 1) * k
+
+
+def test_fat_tree():
+    # k = 4: 4 core routers, 4 pods of 2 aggregation and 2 edge routers, 32 links
+    topology = fatTree(20, 0, Random(3))
+    assert (topology.size, len(topology.edges)) == (20, 32)
+    assert fatTree(44, 0, Random(3)).size == 20
+    assert Network(20, 0, fatTree, seed=3).size == 20
+    for size in (0, 1, 4):
+        with pytest.raises(ValueError):
+            fatTree(size, 0, Random(3))
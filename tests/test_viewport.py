@@ -0,0 +1,76 @@
+# The viewer's indexes have to find exactly what looking at every router and link would, wherever the screen is, and
+# zooming has to keep the point under the mouse where it is. None of this needs pygame.
+
+## IMPORTS ##
+from random import Random
+
+import pytest
+
+from simulation import Network
+from viewport import Viewport, GridIndex, LinkIndex, ForceLayout, palette
+from eventlog import eventLog, LEVEL_OFF
+
+eventLog.level = LEVEL_OFF
+
+
+def randomRects(rng, count):
+    for _ in range(count):
+        left, top = rng.uniform(-200, 900), rng.uniform(-200, 900)
+        yield left, top, left + rng.uniform(0, 2000) ** rng.random(), top + rng.uniform(0, 2000) ** rng.random()
+
+
+def test_grid_index():
+    rng = Random(1)
+    positions = [(rng.uniform(0, 750), rng.uniform(0, 750)) for _ in range(500)]
+    index = GridIndex(positions)
+    for left, top, right, bottom in randomRects(rng, 200):
+        expected = [ID for ID, (x, y) in enumerate(positions, 1) if left <= x <= right and top <= y <= bottom]
+        assert sorted(index.inRect(left, top, right, bottom)) == expected
+    for _ in range(200):
+        x, y = rng.uniform(0, 750), rng.uniform(0, 750)
+        distances = {ID: (px - x) ** 2 + (py - y) ** 2 for ID, (px, py) in enumerate(positions, 1)}
+        closest = min(distances, key=distances.get)
+        found = index.nearest(x, y, 40)
+        if distances[closest] > 40 ** 2:
+            assert found is None
+        else:
+            assert distances[found] == distances[closest]
+
+
+def test_link_index():
+    rng = Random(2)
+    network = Network(200, 600, seed=2)
+    positions = network.RouterPositions
+    index = LinkIndex(network.links, positions)
+    for left, top, right, bottom in randomRects(rng, 200):
+        found = index.inRect(left, top, right, bottom)
+        for slot, link in enumerate(network.links.slots):
+            if link is None:
+                continue
+            (x1, y1), (x2, y2) = positions[link.R1 - 1], positions[link.R2 - 1]
+            # Anything whose bounding box touches the rect has to be in there
+            if min(x1, x2) <= right and max(x1, x2) >= left and min(y1, y2) <= bottom and max(y1, y2) >= top:
+                assert slot in found
+
+
+@pytest.mark.parametrize("factor", [0.3, 1.7, 1000])
+def test_zoom_keeps_the_mouse_point(factor):
+    view = Viewport(800, 600)
+    view.pan(-130, 45)
+    before = view.toWorld(250, 400)
+    view.zoomAt(250, 400, factor)
+    after = view.toWorld(250, 400)
+    assert after == pytest.approx(before)
+
+
+def test_fit_and_layout():
+    network = Network(60, 120, seed=3)
+    layout = ForceLayout(network)
+    while layout.step(20):
+        pass
+    assert layout.settled()
+    view = Viewport(800, 600)
+    view.fit(network.RouterPositions)
+    left, top, right, bottom = view.worldRect()
+    assert all(left <= x <= right and top <= y <= bottom for x, y in network.RouterPositions)
+    assert len(set(palette(50))) == 50
@@ -0,0 +1,300 @@
+# Topology generators.
+# Every generator is called as generator(RouterCount, ConnectionCount, rng) and returns a Topology. Network calls
+# whichever one it's handed, so adding a new shape is just writing another function with that signature.
+# Everything is built straight into an edge list in O(V + E), and all randomness comes from the rng passed in, so the
+# same seed always gives the same network.
+
+## IMPORTS ##
+from math import ceil, sqrt, cos, sin, pi, exp
+
+## CONSTANTS ##
+
+# Edge costs are picked uniformly from this range, same as the old randint(1, 50)
+MIN_COST = 1
+MAX_COST = 50
+
+# Waxman's parameters. Higher alpha means more edges overall, lower beta means edges prefer to be short.
+WAXMAN_ALPHA = 0.4
+WAXMAN_BETA = 0.15
+
+# How many edges each new router brings with it in a Barabási–Albert graph when ConnectionCount doesn't say
+BA_DEFAULT_LINKS = 2
+
+
+class Topology:
+    '''
+    size routers, edges as (R1, R2, cost) with router IDs starting at 1, and positions as (x, y) from 0 to 1 for each
+    router in order (or None, then the network just places routers randomly).
+    '''
+    __slots__ = ("size", "edges", "positions")
+
+    def __init__(self, size, edges, positions=None):
+        self.size = size
+        self.edges = edges
+        self.positions = positions
+
+
+def maxEdges(n):
+    return n * (n - 1) // 2
+
+
+def randomCost(rng):
+    return rng.randint(MIN_COST, MAX_COST)
+
+
+def circlePositions(n, start=0):
+    # n evenly spaced points around a circle, starting from index start
+    return [(0.5 + 0.45 * cos(2 * pi * i / n), 0.5 + 0.45 * sin(2 * pi * i / n)) for i in range(start, start + n)]
+
+
+def randomGraph(RouterCount, ConnectionCount, rng):
+    '''
+    Uniformly random graph with exactly ConnectionCount edges (or as many as fit). This is what the network always used
+    to build, minus silently dropping duplicate pairs.
+    '''
+    ConnectionCount = min(ConnectionCount, maxEdges(RouterCount))
+    edges = []
+    if ConnectionCount * 2 > maxEdges(RouterCount):
+        # Dense: it's cheaper to pick which pairs to leave out
+        pairs = [(R1, R2) for R1 in range(1, RouterCount + 1) for R2 in range(R1 + 1, RouterCount + 1)]
+        for R1, R2 in rng.sample(pairs, ConnectionCount):
+            edges.append((R1, R2, randomCost(rng)))
+    else:
+        # Sparse: random pairs are almost never already taken, so just retry the odd duplicate
+        taken = set()
+        while len(edges) < ConnectionCount:
+            R1 = rng.randint(1, RouterCount)
+            R2 = rng.randint(1, RouterCount)
+            if R1 == R2:
+                continue
+            pair = (min(R1, R2), max(R1, R2))
+            if pair not in taken:
+                taken.add(pair)
+                edges.append((pair[0], pair[1], randomCost(rng)))
+    return Topology(RouterCount, edges)
+
+
+def tree(RouterCount, ConnectionCount, rng, branching=2):
+    '''
+    Complete tree where every router has up to branching children. Router 1 is the root. Always RouterCount - 1 edges,
+    ConnectionCount is ignored.
+    '''
+    edges = [((x - 2) // branching + 1, x, randomCost(rng)) for x in range(2, RouterCount + 1)]
+
+    # Lay it out level by level, root at the top
+    levels, first, width = 1, 1, 1
+    while first + width <= RouterCount:
+        first += width
+        width *= branching
+        levels += 1
+    positions = []
+    level, first, width = 0, 1, 1
+    for x in range(1, RouterCount + 1):
+        if x >= first + width:
+            level += 1
+            first += width
+            width *= branching
+        positions.append(((x - first + 0.5) / width, (level + 0.5) / levels))
+    return Topology(RouterCount, edges, positions)
+
+
+def star(RouterCount, ConnectionCount, rng):
+    '''
+    Router 1 in the middle connected to everyone else. Always RouterCount - 1 edges, ConnectionCount is ignored.
+    '''
+    edges = [(1, x, randomCost(rng)) for x in range(2, RouterCount + 1)]
+    return Topology(RouterCount, edges, [(0.5, 0.5)] + circlePositions(RouterCount - 1))
+
+
+def ring(RouterCount, ConnectionCount, rng):
+    '''
+    Every router connected to the next one, and the last one back to the first. RouterCount edges (fewer for under 3
+    routers), ConnectionCount is ignored.
+    '''
+    edges = [(x, x + 1, randomCost(rng)) for x in range(1, RouterCount)]
+    if RouterCount > 2:
+        edges.append((1, RouterCount, randomCost(rng)))
+    return Topology(RouterCount, edges, circlePositions(RouterCount))
+
+
+def grid(RouterCount, ConnectionCount, rng):
+    '''
+    Routers filled into a square-ish grid row by row, each connected to the one right of it and the one below it.
+    ConnectionCount is ignored.
+    '''
+    width = max(1, ceil(sqrt(RouterCount)))
+    height = ceil(RouterCount / width)
+    edges = []
+    positions = []
+    for x in range(1, RouterCount + 1):
+        row, col = divmod(x - 1, width)
+        positions.append(((col + 0.5) / width, (row + 0.5) / height))
+        if col + 1 < width and x + 1 <= RouterCount:
+            edges.append((x, x + 1, randomCost(rng)))
+        if x + width <= RouterCount:
+            edges.append((x, x + width, randomCost(rng)))
+    return Topology(RouterCount, edges, positions)
+
+
+def waxman(RouterCount, ConnectionCount, rng, alpha=WAXMAN_ALPHA, beta=WAXMAN_BETA):
+    '''
+    Routers get dropped at random spots, and a pair gets connected with probability alpha * e^(-distance / (beta * L))
+    where L is the largest possible distance, so mostly nearby routers end up connected (like real networks built
+    around geography). Random pairs are drawn and kept with that probability until there are exactly ConnectionCount
+    edges, which keeps it O(E) instead of trying every pair.
+    '''
+    ConnectionCount = min(ConnectionCount, maxEdges(RouterCount))
+    positions = [(rng.random(), rng.random()) for _ in range(RouterCount)]
+    L = sqrt(2)
+    edges = []
+    taken = set()
+    # Past a point almost every remaining pair is a long shot, so stop being picky instead of spinning forever
+    patience = 1000 * max(1, ConnectionCount)
+    while len(edges) < ConnectionCount:
+        R1 = rng.randint(1, RouterCount)
+        R2 = rng.randint(1, RouterCount)
+        if R1 == R2:
+            continue
+        pair = (min(R1, R2), max(R1, R2))
+        if pair in taken:
+            continue
+        (x1, y1), (x2, y2) = positions[R1 - 1], positions[R2 - 1]
+        patience -= 1
+        if patience > 0 and rng.random() >= alpha * exp(-sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2) / (beta * L)):
+            continue
+        taken.add(pair)
+        edges.append((pair[0], pair[1], randomCost(rng)))
+    return Topology(RouterCount, edges, positions)
+
+
+def barabasiAlbert(RouterCount, ConnectionCount, rng):
+    '''
+    Preferential attachment: routers that already have lots of connections are more likely to get new ones, which gives
+    the few-big-hubs shape real networks have. The first k + 1 routers start fully connected, then every router after
+    that connects to k different existing routers. k is picked so the edge count comes out as close to
+    ConnectionCount as possible (BA_DEFAULT_LINKS if ConnectionCount is 0), and it's always exactly
+    k(k + 1) / 2 + (RouterCount - k - 1) * k.
+    '''
+    if ConnectionCount:
+        k = max(1, round(ConnectionCount / max(1, RouterCount)))
+    else:
+        k = BA_DEFAULT_LINKS
+    k = min(k, RouterCount - 1)
+    edges = []
+    # Every router shows up in here once per connection it has, so a uniform pick out of it is a pick weighted by degree
+    endpoints = []
+    for R1 in range(1, k + 2):
+        for R2 in range(R1 + 1, k + 2):
+            edges.append((R1, R2, randomCost(rng)))
+            endpoints += (R1, R2)
+    for x in range(k + 2, RouterCount + 1):
+        targets = set()
+        while len(targets) < k:
+            targets.add(endpoints[rng.randrange(len(endpoints))])
+        for target in sorted(targets):
+            edges.append((target, x, randomCost(rng)))
+            endpoints += (target, x)
+    return Topology(RouterCount, edges)
+
+
+def fatTree(RouterCount, ConnectionCount, rng):
+    '''
+    k-ary fat tree like in a data center (just the switches, no hosts): (k/2)^2 core routers, then k pods each with k/2
+    aggregation and k/2 edge routers. Every aggregation router connects to k/2 core routers and every edge router in its
+    pod. k is the biggest even number whose 5k^2/4 routers fit in RouterCount, so the network might come out smaller
+    than asked for, and under 5 routers (k = 2) there's no fat tree at all. Always k^3/2 edges, ConnectionCount is
+    ignored.
+    '''
+    if RouterCount < 5:
+        raise ValueError(f"A fat tree needs at least 5 routers, not {RouterCount}")
+    k = 2
+    while 5 * (k + 2) ** 2 // 4 <= RouterCount:
+        k += 2
+    half = k // 2
+    core = half * half
+    edges = []
+    positions = [((i + 0.5) / core, 0.1) for i in range(core)]
+
+    def aggregation(pod, i):
+        return core + pod * k + i + 1
+
+    def edge(pod, i):
+        return core + pod * k + half + i + 1
+
+    for pod in range(k):
+        for i in range(half):
+            positions.append(((pod * half + i + 0.5) / (k * half), 0.5))
+        for i in range(half):
+            positions.append(((pod * half + i + 0.5) / (k * half), 0.9))
+        for i in range(half):
+            # Aggregation router i in every pod goes up to core routers i * k/2 ... i * k/2 + k/2 - 1
+            for j in range(half):
+                edges.append((i * half + j + 1, aggregation(pod, i), randomCost(rng)))
+            for j in range(half):
+                edges.append((aggregation(pod, i), edge(pod, j), randomCost(rng)))
+    return Topology(core + k * k, edges, positions)
+
+
+def assignAreas(topology, AreaCount, rng):
+    '''
+    Splits topology's routers into AreaCount OSPF areas and returns [area ID for every router], with index 0 unused.
+    Area 0 is the backbone: the AreaCount-th of the routers closest to the best connected one, in one connected piece.
+    The rest get split around AreaCount - 1 random seeds right next to the backbone, every router going to whichever
+    seed it's the fewest hops from (without going through the backbone), so every area comes out in one piece and
+    touching the backbone. Anything no seed could reach goes in the backbone, which it has to be touching. Every area
+    ends up hanging off one backbone, so no virtual links needed.
+    '''
+    size = topology.size
+    areas = [0] * (size + 1)
+    if AreaCount <= 1 or size == 0:
+        return areas
+    adjacent = [[] for _ in range(size + 1)]
+    for R1, R2, _ in topology.edges:
+        adjacent[R1].append(R2)
+        adjacent[R2].append(R1)
+
+    # The backbone is the first size / AreaCount routers a breadth first search from the best connected router gets to
+    root = max(range(1, size + 1), key=lambda x: (len(adjacent[x]), -x))
+    backbone = {root}
+    order = [root]
+    want = ceil(size / AreaCount)
+    for node in order:
+        if len(backbone) >= want:
+            break
+        for adj in adjacent[node]:
+            if adj not in backbone and len(backbone) < want:
+                backbone.add(adj)
+                order.append(adj)
+
+    # Seeds right on the backbone's edge, otherwise one area could grow all the way around another one and cut it off
+    edge = [x for x in range(1, size + 1) if x not in backbone and any(adj in backbone for adj in adjacent[x])]
+    seeds = sorted(rng.sample(edge, min(AreaCount - 1, len(edge))))
+    assigned = set(backbone)
+    for area, seed in enumerate(seeds, 1):
+        areas[seed] = area
+        assigned.add(seed)
+    # Every area grows out from its seed one hop at a time, all together
+    frontier = seeds
+    while frontier:
+        grown = []
+        for node in frontier:
+            for adj in adjacent[node]:
+                if adj not in assigned:
+                    assigned.add(adj)
+                    areas[adj] = areas[node]
+                    grown.append(adj)
+        frontier = grown
+    return areas
+
+
+# Generators by name, for anything that picks a topology from a string (like a command line flag)
+TopologyGenerators = {
+    "random": randomGraph,
+    "tree": tree,
+    "star": star,
+    "ring": ring,
+    "grid": grid,
+    "waxman": waxman,
+    "ba": barabasiAlbert,
+    "fattree": fatTree
+}
@@ -0,0 +1,290 @@
+# Everything the viewer needs to cope with big networks that isn't actually drawing, so none of it needs pygame:
+# - Viewport, the zoom and pan between the world (where routers are, see Network.RouterPositions) and the screen
+# - GridIndex, a uniform grid over router positions, for finding the router under the mouse and the routers on screen
+#   without looking at all of them
+# - LinkIndex, the same thing for links, so only the links crossing the screen get drawn
+# - palette, as many different colors as there are routers (or areas)
+# - ForceLayout, a force directed layout that moves the routers a few steps at a time, so the viewer can keep drawing
+#   while it settles
+
+## IMPORTS ##
+from math import floor, sqrt
+from colorsys import hsv_to_rgb
+
+## CONSTANTS ##
+
+# World units per grid cell. Around the size of a router, so a cell only ever has a few in it.
+CELL_SIZE = 48
+
+# A link whose bounding box covers more cells than this doesn't get put in all of them, it's just always looked at
+LONG_LINK_CELLS = 64
+
+# How far in and out the viewport goes
+MIN_ZOOM = 0.01
+MAX_ZOOM = 8
+
+# Hue step between consecutive palette colors. The golden ratio never lines two nearby colors up with each other.
+GOLDEN_RATIO = 0.6180339887498949
+
+# Force directed layout: how far apart linked routers want to be, and how far a router can move in one step to start
+# with, as a fraction of that (it cools down a little every step)
+LAYOUT_DISTANCE = 60
+LAYOUT_TEMPERATURE = 0.5
+LAYOUT_COOLING = 0.97
+LAYOUT_MIN_TEMPERATURE = 0.5
+
+
+def palette(count, saturation=0.85, value=0.9):
+    '''
+    count colors as (r, g, b), all different enough to tell apart next to each other, for any count.
+    '''
+    colors = []
+    for i in range(count):
+        # Every dozen colors the brightness changes too, so a long list doesn't keep landing on near repeats
+        r, g, b = hsv_to_rgb((i * GOLDEN_RATIO) % 1, saturation, value * (1.0, 0.75, 0.55)[(i // 12) % 3])
+        colors.append((round(r * 255), round(g * 255), round(b * 255)))
+    return colors
+
+
+class Viewport:
+    '''
+    Which part of the world is on screen. (x, y) is the world point at the top left corner of the screen and zoom is
+    screen pixels per world unit.
+    '''
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.x = 0.0
+        self.y = 0.0
+        self.zoom = 1.0
+
+    def key(self):
+        # Changes whenever anything on screen would move, for keying caches of what got drawn
+        return (self.x, self.y, self.zoom)
+
+    def toScreen(self, x, y):
+        return (round((x - self.x) * self.zoom), round((y - self.y) * self.zoom))
+
+    def toWorld(self, sx, sy):
+        return (self.x + sx / self.zoom, self.y + sy / self.zoom)
+
+    def worldRect(self, margin=0):
+        '''
+        (left, top, right, bottom) of the world on screen, grown by margin screen pixels on every side.
+        '''
+        grow = margin / self.zoom
+        return (self.x - grow, self.y - grow,
+                self.x + self.width / self.zoom + grow, self.y + self.height / self.zoom + grow)
+
+    def pan(self, dx, dy):
+        # Moves what's on screen by (dx, dy) screen pixels
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+
+    def zoomAt(self, sx, sy, factor):
+        '''
+        Zooms in by factor (out, under 1) keeping the world point under screen point (sx, sy) where it is.
+        '''
+        wx, wy = self.toWorld(sx, sy)
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        self.x = wx - sx / self.zoom
+        self.y = wy - sy / self.zoom
+
+    def fit(self, positions, margin=30):
+        '''
+        Zooms and pans so every position fits on screen, with margin screen pixels to spare.
+        '''
+        if not positions:
+            return None
+        xs = [p[0] for p in positions]
+        ys = [p[1] for p in positions]
+        spanX = max(max(xs) - min(xs), 1)
+        spanY = max(max(ys) - min(ys), 1)
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, min((self.width - 2 * margin) / spanX,
+                                                    (self.height - 2 * margin) / spanY)))
+        self.x = (min(xs) + max(xs)) / 2 - self.width / 2 / self.zoom
+        self.y = (min(ys) + max(ys)) / 2 - self.height / 2 / self.zoom
+
+
+class GridIndex:
+    '''
+    Routers bucketed by the CELL_SIZE square of the world they're in. positions is Network.RouterPositions, router ID
+    x at index x - 1.
+    '''
+
+    def __init__(self, positions, cellSize=CELL_SIZE):
+        self.cellSize = cellSize
+        self.positions = positions
+        self.cells = {}  # (cell x, cell y) : [router ID, ...]
+        for ID, (x, y) in enumerate(positions, 1):
+            self.cells.setdefault(self.cellOf(x, y), []).append(ID)
+
+    def cellOf(self, x, y):
+        return (floor(x / self.cellSize), floor(y / self.cellSize))
+
+    def inRect(self, left, top, right, bottom):
+        '''
+        Every router inside the world rect, as a list of IDs.
+        '''
+        x0, y0 = self.cellOf(left, top)
+        x1, y1 = self.cellOf(right, bottom)
+        found = []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # Zoomed out far enough that going through the cells that exist is less work than the ones on screen
+            cells = (routers for (cx, cy), routers in self.cells.items() if x0 <= cx <= x1 and y0 <= cy <= y1)
+        else:
+            cells = (self.cells.get((cx, cy), ()) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+        positions = self.positions
+        for routers in cells:
+            for ID in routers:
+                x, y = positions[ID - 1]
+                if left <= x <= right and top <= y <= bottom:
+                    found.append(ID)
+        return found
+
+    def nearest(self, x, y, radius):
+        '''
+        The router closest to world point (x, y), or None if there isn't one within radius.
+        '''
+        best = None
+        bestDistance = radius * radius
+        for ID in self.inRect(x - radius, y - radius, x + radius, y + radius):
+            px, py = self.positions[ID - 1]
+            distance = (px - x) ** 2 + (py - y) ** 2
+            if distance <= bestDistance:
+                best, bestDistance = ID, distance
+        return best
+
+
+class LinkIndex:
+    '''
+    Link slots bucketed by every CELL_SIZE square their bounding box covers, so a link crossing the screen gets found
+    even if neither of its routers is on it. Links too long for that are kept in one list that always gets looked at.
+    '''
+
+    def __init__(self, links, positions, cellSize=CELL_SIZE):
+        self.cellSize = cellSize
+        self.cells = {}  # (cell x, cell y) : [slot, ...]
+        self.long = []
+        for slot, link in enumerate(links.slots):
+            if link is None:
+                continue
+            x1, y1 = positions[link.R1 - 1]
+            x2, y2 = positions[link.R2 - 1]
+            cx0, cx1 = sorted((floor(x1 / cellSize), floor(x2 / cellSize)))
+            cy0, cy1 = sorted((floor(y1 / cellSize), floor(y2 / cellSize)))
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > LONG_LINK_CELLS:
+                self.long.append(slot)
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(slot)
+
+    def inRect(self, left, top, right, bottom):
+        '''
+        Every slot whose link might cross the world rect (its bounding box does), as a set.
+        '''
+        x0, y0 = floor(left / self.cellSize), floor(top / self.cellSize)
+        x1, y1 = floor(right / self.cellSize), floor(bottom / self.cellSize)
+        found = set(self.long)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            for (cx, cy), slots in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    found.update(slots)
+        else:
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    found.update(self.cells.get((cx, cy), ()))
+        return found
+
+
+class ForceLayout:
+    '''
+    Fruchterman-Reingold over network's routers, run a few steps at a time with step(). Linked routers pull together,
+    every router pushes away the ones close to it (only the ones within a couple of LAYOUT_DISTANCEs, found with a
+    GridIndex, so a step is O(V + E) instead of O(V^2)). Every step moves routers a little less than the last, and
+    writes the new positions straight into the network, so whatever draws it just has to notice version went up.
+    Routers packed in tighter than distance apart get spread out around their middle before the first step, so they
+    don't start off all pushing each other (a big network would take ages to untangle, and every router would have
+    hundreds of others within reach).
+    '''
+
+    def __init__(self, network, distance=LAYOUT_DISTANCE):
+        self.network = network
+        self.positions = [[float(x), float(y)] for x, y in network.RouterPositions]
+        xs = [p[0] for p in self.positions] or [0]
+        ys = [p[1] for p in self.positions] or [0]
+        area = max(max(xs) - min(xs), 1) * max(max(ys) - min(ys), 1)
+        spacing = sqrt(area / max(len(self.positions), 1))
+        self.distance = distance
+        self.temperature = LAYOUT_TEMPERATURE * distance
+        self.version = 0
+        if spacing < distance:
+            scale = distance / spacing
+            middleX = (min(xs) + max(xs)) / 2
+            middleY = (min(ys) + max(ys)) / 2
+            for position in self.positions:
+                position[0] = middleX + (position[0] - middleX) * scale
+                position[1] = middleY + (position[1] - middleY) * scale
+            self.writeBack()
+
+    def settled(self):
+        return self.temperature < LAYOUT_MIN_TEMPERATURE
+
+    def step(self, steps=1):
+        '''
+        Moves every router steps times. Returns False once the layout has settled and there's nothing left to do.
+        '''
+        if self.settled():
+            return False
+        k = self.distance
+        reach = 2 * k
+        positions = self.positions
+        size = len(positions)
+        for _ in range(steps):
+            grid = GridIndex(positions, reach)
+            shift = [[0.0, 0.0] for _ in range(size)]
+            for ID in range(1, size + 1):
+                x, y = positions[ID - 1]
+                push = shift[ID - 1]
+                for other in grid.inRect(x - reach, y - reach, x + reach, y + reach):
+                    if other == ID:
+                        continue
+                    dx = x - positions[other - 1][0]
+                    dy = y - positions[other - 1][1]
+                    distance2 = dx * dx + dy * dy
+                    if distance2 == 0:
+                        # Right on top of each other, split them up in a direction that's the same every run
+                        dx, dy, distance2 = (0.01 if ID > other else -0.01), 0.0, 0.0001
+                    force = k * k / distance2
+                    push[0] += dx * force
+                    push[1] += dy * force
+            for link in self.network.links.slots:
+                if link is None:
+                    continue
+                a = positions[link.R1 - 1]
+                b = positions[link.R2 - 1]
+                dx = a[0] - b[0]
+                dy = a[1] - b[1]
+                distance = sqrt(dx * dx + dy * dy) or 0.01
+                pull = distance / k
+                shift[link.R1 - 1][0] -= dx * pull
+                shift[link.R1 - 1][1] -= dy * pull
+                shift[link.R2 - 1][0] += dx * pull
+                shift[link.R2 - 1][1] += dy * pull
+            for position, (dx, dy) in zip(positions, shift):
+                length = sqrt(dx * dx + dy * dy)
+                if length > 0:
+                    scale = min(length, self.temperature) / length
+                    position[0] += dx * scale
+                    position[1] += dy * scale
+            self.temperature *= LAYOUT_COOLING
+        self.writeBack()
+        return True
+
+    def writeBack(self):
+        network = self.network
+        network.RouterPositions = [(round(x), round(y)) for x, y in self.positions]
+        network.RITTP = {ID: (x - 9, y - 22) for ID, (x, y) in enumerate(network.RouterPositions, 1)}
+        self.version += 1
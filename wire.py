@@ -0,0 +1,106 @@
+# Binary encoding for messages that have to leave the process they were sent in.
+# Every record is packed straight into whatever buffer it's headed for (a shared memory block, a datagram) with
+# struct.pack_into, and read back out of a memoryview with struct.unpack_from, so nothing gets pickled or copied
+# into a temporary bytes object on the way.
+
+## IMPORTS ##
+import struct
+
+from simulation import LSP, EVENT_DELIVER, portName, portNumber
+
+## FORMATS ##
+# All little endian. Every record starts with the event it turns back into:
+# delivery tick, target router, origin router, origin's counter, sending port, recieving port, message type
+HEADER = struct.Struct("<qIIQIIB")
+HELLO = struct.Struct("<II")  # router ID saying hello, router it has heard on that link (0 for nobody yet)
+LSP_HEADER = struct.Struct("<IIhI")  # sequence number, originator ID, age, neighbor count
+LSP_NEIGHBOR = struct.Struct("<III")  # port, router ID, cost
+LSACK_HEADER = struct.Struct("<I")  # how many LSPs it acks
+LSACK_ENTRY = struct.Struct("<II")  # originator ID, sequence number
+
+# Port names the decoder hands out, so every record naming port A shares the same string
+PORT_NAMES = [portName(x) for x in range(256)]
+
+
+def decodePort(number):
+    if number < len(PORT_NAMES):
+        return PORT_NAMES[number]
+    return portName(number)
+
+
+def recordSize(args):
+    '''
+    How many bytes encodeInto will write for a message with these EVENT_DELIVER args.
+    '''
+    messageType, data = args[2], args[3]
+    if messageType < 2:
+        return HEADER.size + HELLO.size
+    if messageType == 2:
+        return HEADER.size + LSP_HEADER.size + LSP_NEIGHBOR.size * len(data[0][1])
+    if messageType == 3:
+        return HEADER.size + LSACK_HEADER.size + LSACK_ENTRY.size * len(data)
+    return HEADER.size
+
+
+def encodeInto(buffer, offset, time, target, origin, counter, args):
+    '''
+    Packs one EVENT_DELIVER event into buffer at offset. Returns the offset right after it.
+    '''
+    fromPort, toPort, messageType, data = args
+    HEADER.pack_into(buffer, offset, time, target, origin, counter,
+                     portNumber(fromPort), portNumber(toPort), messageType)
+    offset += HEADER.size
+    if messageType < 2:
+        HELLO.pack_into(buffer, offset, *data)
+        offset += HELLO.size
+    elif messageType == 2:
+        ThisLSP, age = data
+        SeqN, NeighborData, SenderID = ThisLSP
+        LSP_HEADER.pack_into(buffer, offset, SeqN, SenderID, age, len(NeighborData))
+        offset += LSP_HEADER.size
+        for port, adj, cost in NeighborData:
+            LSP_NEIGHBOR.pack_into(buffer, offset, portNumber(port), adj, cost)
+            offset += LSP_NEIGHBOR.size
+    elif messageType == 3:
+        LSACK_HEADER.pack_into(buffer, offset, len(data))
+        offset += LSACK_HEADER.size
+        for origin, SeqN in data:
+            LSACK_ENTRY.pack_into(buffer, offset, origin, SeqN)
+            offset += LSACK_ENTRY.size
+    return offset
+
+
+def decode(buffer, offset, end, lsps):
+    '''
+    Yields every event packed into buffer between offset and end as (time, target, origin, counter, event type, args),
+    ready to go back in an event queue.
+    lsps is originator ID : the last LSP decoded from that router. A record holding the same LSP gets that same object
+    back, so one LSP still only sits in memory once no matter how many times it crossed over.
+    '''
+    while offset < end:
+        time, target, origin, counter, fromPort, toPort, messageType = HEADER.unpack_from(buffer, offset)
+        offset += HEADER.size
+        if messageType < 2:
+            data = HELLO.unpack_from(buffer, offset)
+            offset += HELLO.size
+        elif messageType == 2:
+            SeqN, SenderID, age, count = LSP_HEADER.unpack_from(buffer, offset)
+            offset += LSP_HEADER.size
+            neighbors = []
+            for _ in range(count):
+                port, adj, cost = LSP_NEIGHBOR.unpack_from(buffer, offset)
+                offset += LSP_NEIGHBOR.size
+                neighbors.append((decodePort(port), adj, cost))
+            neighbors = tuple(neighbors)
+            ThisLSP = lsps.get(SenderID)
+            if ThisLSP is None or ThisLSP[0] != SeqN or ThisLSP[1] != neighbors:
+                ThisLSP = lsps[SenderID] = LSP(SenderID, neighbors, SeqN)
+            data = (ThisLSP, age)
+        elif messageType == 3:
+            count = LSACK_HEADER.unpack_from(buffer, offset)[0]
+            offset += LSACK_HEADER.size
+            data = tuple(LSACK_ENTRY.iter_unpack(buffer[offset:offset + LSACK_ENTRY.size * count]))
+            offset += LSACK_ENTRY.size * count
+        else:
+            data = None
+        yield time, target, origin, counter, EVENT_DELIVER, (decodePort(fromPort), decodePort(toPort), messageType, data)